@@ -0,0 +1,500 @@
+# ComfyUI-Usgromana-Gallery/backend/catalog.py
+# Persistent on-disk image catalog (SQLite) so listings don't walk the output tree
+
+import bisect
+import os
+import uuid
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, List, Optional
+
+from .files import GalleryImage, _is_image_file
+
+
+class CatalogStore:
+    """
+    SQLite-backed catalog of relpath/size/mtime/folder for the gallery root.
+
+    The catalog is loaded at startup and reconciled against disk by the
+    BackgroundScanner, so /list can be answered with a single indexed query
+    instead of an os.walk of the whole output tree.
+    """
+
+    SCHEMA_VERSION = "1"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS catalog_info (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            row = self._conn.execute(
+                "SELECT value FROM catalog_info WHERE key = 'schema_version'"
+            ).fetchone()
+            if row and row[0] != self.SCHEMA_VERSION:
+                # Catalog is only a cache of the filesystem; rebuild on schema change
+                self._conn.execute("DROP TABLE IF EXISTS images")
+                self._conn.execute("DELETE FROM catalog_info")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS images (
+                    relpath  TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    folder   TEXT NOT NULL,
+                    size     INTEGER NOT NULL,
+                    mtime    REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS images_mtime ON images (mtime DESC)"
+            )
+            self._set_info("schema_version", self.SCHEMA_VERSION)
+
+    def _get_info(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT value FROM catalog_info WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_info(self, key: str, value: str):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO catalog_info (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def bind_root(self, root: str) -> bool:
+        """
+        Associate the catalog with a gallery root directory.
+        If the root changed since the catalog was written, its contents are discarded.
+
+        Returns True if the catalog holds a completed scan of this root.
+        """
+        root = os.path.abspath(root)
+        with self._lock, self._conn:
+            if self._get_info("root") != root:
+                self._conn.execute("DELETE FROM images")
+                self._conn.execute("DELETE FROM catalog_info WHERE key = 'reconciled_at'")
+                self._set_info("root", root)
+                return False
+            return self._get_info("reconciled_at") is not None
+
+    @property
+    def reconciled_at(self) -> Optional[float]:
+        with self._lock:
+            value = self._get_info("reconciled_at")
+        return float(value) if value else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def list_images(self, limit: int | None = None, extensions: set[str] | None = None) -> List[GalleryImage]:
+        """Return catalogued images, most recent first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT filename, relpath, size, mtime, folder FROM images ORDER BY mtime DESC"
+            ).fetchall()
+
+        items: List[GalleryImage] = []
+        for filename, relpath, size, mtime, folder in rows:
+            if extensions and not _is_image_file(filename, extensions):
+                continue
+            items.append(GalleryImage(filename=filename, relpath=relpath, size=size, mtime=mtime, folder=folder))
+            if limit is not None and len(items) >= limit:
+                break
+        return items
+
+    def reconcile(self, images: Iterable[GalleryImage]) -> dict:
+        """
+        Bring the catalog in line with a fresh scan of the gallery root.
+        Only rows that actually changed are written.
+
+        Returns counts of added/updated/removed rows.
+        """
+        with self._lock:
+            existing = {
+                relpath: (size, mtime)
+                for relpath, size, mtime in self._conn.execute("SELECT relpath, size, mtime FROM images")
+            }
+            upserts = []
+            added = updated = 0
+            for img in images:
+                prev = existing.pop(img.relpath, None)
+                if prev is None:
+                    added += 1
+                elif prev != (img.size, img.mtime):
+                    updated += 1
+                else:
+                    continue
+                upserts.append((img.relpath, img.filename, img.folder, img.size, img.mtime))
+
+            with self._conn:
+                if upserts:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO images (relpath, filename, folder, size, mtime) VALUES (?, ?, ?, ?, ?)",
+                        upserts,
+                    )
+                if existing:
+                    self._conn.executemany(
+                        "DELETE FROM images WHERE relpath = ?", [(relpath,) for relpath in existing]
+                    )
+                self._set_info("reconciled_at", str(time.time()))
+
+        return {"added": added, "updated": updated, "removed": len(existing)}
+
+    def upsert(self, image: GalleryImage):
+        """Insert or update a single image row."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images (relpath, filename, folder, size, mtime) VALUES (?, ?, ?, ?, ?)",
+                (image.relpath, image.filename, image.folder, image.size, image.mtime),
+            )
+
+    def remove(self, relpath: str):
+        """Remove a single image row."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM images WHERE relpath = ?", (relpath,))
+
+    def apply_changes(self, upserts: Iterable[GalleryImage], removals: Iterable[str]):
+        """Write a batch of upserts and removals in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO images (relpath, filename, folder, size, mtime) VALUES (?, ?, ?, ?, ?)",
+                [(img.relpath, img.filename, img.folder, img.size, img.mtime) for img in upserts],
+            )
+            self._conn.executemany(
+                "DELETE FROM images WHERE relpath = ?", [(relpath,) for relpath in removals]
+            )
+
+    def remove_prefix(self, folder: str):
+        """Remove every image under a folder (e.g. after the folder was deleted or moved)."""
+        prefix = folder.rstrip("/") + "/"
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM images WHERE substr(relpath, 1, ?) = ?", (len(prefix), prefix)
+            )
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+
+class LiveCatalog:
+    """
+    Sorted in-memory catalog of GalleryImage records (newest first).
+
+    Kept current by applying file monitor deltas incrementally instead of
+    rescanning: inserts use bisect.insort on a (-mtime, relpath) key list and
+    removals locate their slot by binary search. Every change bumps a
+    monotonically increasing generation counter.
+
+    If a CatalogStore is given, changes are written through so the catalog
+    survives restarts.
+
+    Recent changes are kept in a bounded change log keyed by generation so
+    clients can sync with changes_since() instead of refetching everything.
+    The epoch identifies this process's generation sequence.
+
+    Listeners registered with add_listener() are called with the new
+    generation after every change, from whichever thread made it; they must
+    not block (e.g. hand off with loop.call_soon_threadsafe).
+    """
+
+    def __init__(self, store: Optional[CatalogStore] = None, change_log_size: int = 20000):
+        self._store = store
+        self._lock = threading.RLock()
+        self._keys: list[tuple[float, str]] = []
+        self._images: dict[str, GalleryImage] = {}
+        self._folder_counts: dict[str, int] = {}
+        # relpath -> generation that last inserted or replaced the record (see apply_scan)
+        self._touched: dict[str, int] = {}
+        self.generation = 0
+        self.epoch = uuid.uuid4().hex[:12]
+        self.root: Optional[str] = None
+        # (generation, op, image) with op in "added" / "modified" / "removed"
+        self._changes: deque[tuple[int, str, GalleryImage]] = deque(maxlen=change_log_size)
+        self._log_floor = 0  # Oldest generation changes_since() can still answer from
+        self._listeners: list[Callable[[int], None]] = []
+
+    @staticmethod
+    def _key(image: GalleryImage) -> tuple[float, str]:
+        return (-image.mtime, image.relpath)
+
+    @property
+    def loaded(self) -> bool:
+        return self.root is not None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _insert(self, image: GalleryImage):
+        bisect.insort(self._keys, self._key(image))
+        self._images[image.relpath] = image
+        # Every caller bumps the generation once after its inserts
+        self._touched[image.relpath] = self.generation + 1
+        self._folder_counts[image.folder] = self._folder_counts.get(image.folder, 0) + 1
+
+    def _delete(self, relpath: str) -> Optional[GalleryImage]:
+        image = self._images.pop(relpath, None)
+        if image is None:
+            return None
+        self._touched.pop(relpath, None)
+        key = self._key(image)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+        count = self._folder_counts.get(image.folder, 0) - 1
+        if count > 0:
+            self._folder_counts[image.folder] = count
+        else:
+            self._folder_counts.pop(image.folder, None)
+        return image
+
+    def add_listener(self, listener: Callable[[int], None]):
+        """Call listener(generation) after every change."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int], None]):
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def _notify(self):
+        for listener in list(self._listeners):
+            try:
+                listener(self.generation)
+            except Exception as e:
+                print(f"[Usgromana-Gallery] Catalog listener error: {e}")
+
+    def _log(self, op: str, image: GalleryImage):
+        if len(self._changes) == self._changes.maxlen:
+            self._log_floor = max(self._log_floor, self._changes[0][0])
+        self._changes.append((self.generation, op, image))
+
+    def load(self, images: Iterable[GalleryImage], root: str):
+        """Replace the whole catalog (startup or root change)."""
+        with self._lock:
+            self._keys = []
+            self._images = {}
+            self._folder_counts = {}
+            for image in images:
+                if image.relpath in self._images:
+                    continue
+                self._images[image.relpath] = image
+                self._keys.append(self._key(image))
+                self._folder_counts[image.folder] = self._folder_counts.get(image.folder, 0) + 1
+            self._keys.sort()
+            self.root = os.path.abspath(root)
+            self.generation += 1
+            self._touched = dict.fromkeys(self._images, self.generation)
+            # Everything changed at once; clients older than this must resync
+            self._changes.clear()
+            self._log_floor = self.generation
+            self._notify()
+
+    def upsert(self, image: GalleryImage) -> bool:
+        """Insert or update one image. Returns True if anything changed."""
+        with self._lock:
+            prev = self._images.get(image.relpath)
+            if prev is not None and (prev.size, prev.mtime) == (image.size, image.mtime):
+                return False
+            if prev is not None:
+                self._delete(image.relpath)
+            self._insert(image)
+            self.generation += 1
+            self._log("added" if prev is None else "modified", image)
+            if self._store is not None:
+                self._store.upsert(image)
+            self._notify()
+            return True
+
+    def remove(self, relpath: str) -> bool:
+        """Remove one image. Returns True if it was catalogued."""
+        with self._lock:
+            image = self._delete(relpath)
+            if image is None:
+                return False
+            self.generation += 1
+            self._log("removed", image)
+            if self._store is not None:
+                self._store.remove(relpath)
+            self._notify()
+            return True
+
+    def apply_changes(self, upserts: Iterable[GalleryImage], removals: Iterable[str]) -> int:
+        """
+        Apply a batch of upserts and removals as a single generation (one
+        store transaction, one listener notification). Returns the number of
+        records that actually changed.
+        """
+        with self._lock:
+            changes: list[tuple[str, GalleryImage]] = []
+            for relpath in removals:
+                image = self._delete(relpath)
+                if image is not None:
+                    changes.append(("removed", image))
+            for image in upserts:
+                prev = self._images.get(image.relpath)
+                if prev is not None and (prev.size, prev.mtime) == (image.size, image.mtime):
+                    continue
+                if prev is not None:
+                    self._delete(image.relpath)
+                self._insert(image)
+                changes.append(("added" if prev is None else "modified", image))
+            if not changes:
+                return 0
+            self.generation += 1
+            for op, image in changes:
+                self._log(op, image)
+            if self._store is not None:
+                self._store.apply_changes(
+                    [image for op, image in changes if op != "removed"],
+                    [image.relpath for op, image in changes if op == "removed"],
+                )
+            self._notify()
+            return len(changes)
+
+    def remove_prefix(self, folder: str) -> int:
+        """Remove every image under a folder. Returns the number removed."""
+        prefix = folder.rstrip("/") + "/"
+        with self._lock:
+            doomed = [relpath for relpath in self._images if relpath.startswith(prefix)]
+            removed = [self._delete(relpath) for relpath in doomed]
+            if doomed:
+                self.generation += 1
+                for image in removed:
+                    self._log("removed", image)
+                if self._store is not None:
+                    self._store.remove_prefix(folder)
+                self._notify()
+            return len(doomed)
+
+    def apply_scan(self, images: Iterable[GalleryImage], since_generation: Optional[int] = None) -> dict:
+        """
+        Reconcile with a full scan result, touching only records that differ.
+        Records inserted or replaced after since_generation (the catalog
+        generation when the scan started, i.e. applied from live events while
+        it was running) are kept even if the scan missed them. This goes by
+        generation, not file mtime: a file moved into the tree keeps its old
+        mtime.
+
+        Returns counts of added/updated/removed records.
+        """
+        images = list(images)
+        with self._lock:
+            seen = set()
+            changes: list[tuple[str, GalleryImage]] = []
+            for image in images:
+                seen.add(image.relpath)
+                prev = self._images.get(image.relpath)
+                if prev is not None and (prev.size, prev.mtime) == (image.size, image.mtime):
+                    continue
+                if prev is not None:
+                    self._delete(image.relpath)
+                self._insert(image)
+                changes.append(("added" if prev is None else "modified", image))
+            missing = [
+                relpath for relpath in self._images
+                if relpath not in seen
+                and (since_generation is None or self._touched.get(relpath, 0) <= since_generation)
+            ]
+            for relpath in missing:
+                changes.append(("removed", self._delete(relpath)))
+            if changes:
+                self.generation += 1
+                for op, image in changes:
+                    self._log(op, image)
+            if self._store is not None:
+                # Persist the merged state: the scan result plus the records kept above
+                self._store.reconcile(list(self._images.values()))
+            if changes:
+                self._notify()
+        ops = [op for op, _ in changes]
+        return {"added": ops.count("added"), "updated": ops.count("modified"), "removed": ops.count("removed")}
+
+    def page(self, after: Optional[tuple[float, str]] = None, limit: int = 100,
+             predicate: Optional[Callable[[GalleryImage], bool]] = None) -> tuple[List[GalleryImage], Optional[tuple[float, str]]]:
+        """
+        Keyset pagination over the catalog order (newest first, relpath as tiebreak).
+
+        after is the (mtime, relpath) cursor of the last record the caller saw.
+        Returns up to limit matching images and the cursor to continue from,
+        or None once the end of the catalog is reached.
+        """
+        with self._lock:
+            keys = self._keys
+            i = bisect.bisect_right(keys, (-after[0], after[1])) if after else 0
+            items: List[GalleryImage] = []
+            while i < len(keys) and len(items) < limit:
+                image = self._images[keys[i][1]]
+                i += 1
+                if predicate is None or predicate(image):
+                    items.append(image)
+            if i >= len(keys):
+                return items, None
+            neg_mtime, relpath = keys[i - 1]
+            return items, (-neg_mtime, relpath)
+
+    def changes_since(self, generation: int) -> Optional[dict]:
+        """
+        Net changes after the given generation, collapsed per relpath:
+        { "generation": int, "added": [GalleryImage], "modified": [GalleryImage],
+          "removed": [GalleryImage] } (removed entries carry the last known record).
+
+        Returns None if the change log no longer reaches back that far (or the
+        generation is from the future), in which case the caller must resync.
+        """
+        with self._lock:
+            if generation < self._log_floor or generation > self.generation:
+                return None
+            first_op: dict[str, str] = {}
+            last_seen: dict[str, GalleryImage] = {}
+            for gen, op, image in reversed(self._changes):
+                if gen <= generation:
+                    break
+                # Walking backwards: the last assignment is the earliest change
+                first_op[image.relpath] = op
+                last_seen.setdefault(image.relpath, image)
+
+            result = {"generation": self.generation, "added": [], "modified": [], "removed": []}
+            for relpath, op in first_op.items():
+                current = self._images.get(relpath)
+                if current is None:
+                    if op != "added":
+                        result["removed"].append(last_seen[relpath])
+                elif op == "added":
+                    result["added"].append(current)
+                else:
+                    result["modified"].append(current)
+        for key in ("added", "modified"):
+            result[key].sort(key=self._key)
+        return result
+
+    def get(self, relpath: str) -> Optional[GalleryImage]:
+        return self._images.get(relpath)
+
+    def snapshot(self, extensions: set[str] | None = None) -> List[GalleryImage]:
+        """Return the catalogued images, most recent first."""
+        with self._lock:
+            images = [self._images[relpath] for _, relpath in self._keys]
+        if extensions:
+            images = [img for img in images if _is_image_file(img.filename, extensions)]
+        return images
+
+    def folder_counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._folder_counts)
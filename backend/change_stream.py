@@ -0,0 +1,81 @@
+# ComfyUI-Usgromana-Gallery/backend/change_stream.py
+# Server-Sent Events fan-out of catalog changes to connected gallery clients
+
+import asyncio
+import json
+from typing import Optional
+
+
+def format_sse(data: dict, event: Optional[str] = None, event_id: Optional[str] = None) -> bytes:
+    """Encode one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def format_resume_token(epoch: str, generation: int) -> str:
+    return f"{epoch}:{generation}"
+
+
+def parse_resume_token(token: Optional[str]) -> Optional[tuple[str, int]]:
+    """Parse an "<epoch>:<generation>" token. Returns None if malformed."""
+    if not token:
+        return None
+    epoch, sep, generation = token.rpartition(":")
+    if not sep or not epoch:
+        return None
+    try:
+        return epoch, int(generation)
+    except ValueError:
+        return None
+
+
+class ChangeStream:
+    """
+    Wakes connected stream handlers when the catalog changes.
+
+    notify() may be called from any thread (file monitor, scanner, request
+    handlers); it hops onto the event loop with call_soon_threadsafe and sets
+    each subscriber's asyncio.Event. Subscribers then read the coalesced
+    delta from LiveCatalog.changes_since(), so a burst of file events costs
+    one message per client instead of one per file.
+    """
+
+    def __init__(self, coalesce_window: float = 0.25, heartbeat_interval: float = 15.0):
+        self.coalesce_window = coalesce_window
+        self.heartbeat_interval = heartbeat_interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: set[asyncio.Event] = set()
+
+    @property
+    def client_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Event:
+        """Register a subscriber. Must be called on the event loop."""
+        self._loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        self._subscribers.add(wake)
+        return wake
+
+    def unsubscribe(self, wake: asyncio.Event):
+        self._subscribers.discard(wake)
+
+    def notify(self, generation: Optional[int] = None):
+        """Thread-safe: wake every subscriber on the event loop."""
+        loop = self._loop
+        if loop is None or not self._subscribers or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake_all)
+        except RuntimeError:
+            # Loop shut down between the check and the call
+            pass
+
+    def _wake_all(self):
+        for wake in self._subscribers:
+            wake.set()
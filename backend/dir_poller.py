@@ -0,0 +1,174 @@
+# ComfyUI-Usgromana-Gallery/backend/dir_poller.py
+# Lightweight polling file monitor based on directory mtime snapshots
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from .tree_scan import default_skip_dir
+
+# Directories modified this recently are re-listed on the next poll too, in
+# case more changes land within the filesystem's timestamp granularity
+# (NFS and FAT can be as coarse as 1-2 seconds).
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+class _DirSnapshot:
+    __slots__ = ("mtime_ns", "files", "subdirs")
+
+    def __init__(self, mtime_ns: int, files: Dict[str, Tuple[int, int]], subdirs: set):
+        self.mtime_ns = mtime_ns
+        self.files = files      # name -> (size, mtime_ns) for relevant files
+        self.subdirs = subdirs  # child directory names
+
+
+class DirectoryPoller:
+    """
+    Polls a directory tree for changes without re-stating every file.
+
+    Each poll stats only the directories. Creating, deleting or renaming an
+    entry bumps its parent directory's mtime, so only directories whose own
+    mtime changed since the last snapshot are re-listed and diffed. The same
+    callback(event_type, full_path) events as GalleryFileHandler are emitted
+    ("created" / "deleted" / "modified").
+
+    In-place rewrites of an existing file don't touch the directory mtime and
+    are only seen when that directory is next re-listed; the background
+    scanner's periodic reconciliation covers those.
+    """
+
+    def __init__(self, root: str, callback: Callable[[str, str], None], extensions: set[str],
+                 interval: float = 2.0, skip_dir: Callable[[str], bool] = default_skip_dir):
+        self.root = os.path.abspath(root)
+        self.callback = callback
+        self.extensions = {ext.lower() for ext in extensions}
+        self.interval = interval
+        self.skip_dir = skip_dir
+        self._snapshots: Dict[str, _DirSnapshot] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.polls = 0
+        self.dirs_relisted = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _is_relevant_file(self, name: str) -> bool:
+        return os.path.splitext(name)[1].lower() in self.extensions
+
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll_worker, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _poll_worker(self):
+        # Baseline snapshot: the initial contents are not reported as events
+        self._snapshot_tree(self.root, emit=False)
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[Usgromana-Gallery] Directory poll error: {e}")
+
+    def _list_dir(self, path: str) -> Optional[_DirSnapshot]:
+        """Take a fresh snapshot of one directory (not recursive)."""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            files: Dict[str, Tuple[int, int]] = {}
+            subdirs = set()
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self.skip_dir(entry.name):
+                                subdirs.add(entry.name)
+                        elif self._is_relevant_file(entry.name):
+                            st = entry.stat()
+                            files[entry.name] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return _DirSnapshot(mtime_ns, files, subdirs)
+
+    def _snapshot_tree(self, path: str, emit: bool):
+        """Snapshot a directory and everything below it, optionally reporting files as created."""
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            snap = self._list_dir(current)
+            if snap is None:
+                continue
+            self._snapshots[current] = snap
+            if emit:
+                for name in snap.files:
+                    self.callback("created", os.path.join(current, name))
+            stack.extend(os.path.join(current, name) for name in snap.subdirs)
+
+    def _forget_tree(self, path: str):
+        """Drop a vanished directory (and its children), reporting its files as deleted."""
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            snap = self._snapshots.pop(current, None)
+            if snap is None:
+                continue
+            for name in snap.files:
+                self.callback("deleted", os.path.join(current, name))
+            stack.extend(os.path.join(current, name) for name in snap.subdirs)
+
+    def poll(self):
+        """Check every known directory once and emit events for what changed."""
+        self.polls += 1
+        now_ns = time.time_ns()
+        for path in list(self._snapshots):
+            old = self._snapshots.get(path)
+            if old is None:
+                continue  # Forgotten earlier in this poll with its parent
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                self._forget_tree(path)
+                continue
+            if mtime_ns == old.mtime_ns and now_ns - mtime_ns > _RACY_WINDOW_NS:
+                continue
+
+            new = self._list_dir(path)
+            if new is None:
+                self._forget_tree(path)
+                continue
+            self.dirs_relisted += 1
+            self._snapshots[path] = new
+
+            for name, stat_key in new.files.items():
+                prev = old.files.get(name)
+                if prev is None:
+                    self.callback("created", os.path.join(path, name))
+                elif prev != stat_key:
+                    self.callback("modified", os.path.join(path, name))
+            for name in old.files.keys() - new.files.keys():
+                self.callback("deleted", os.path.join(path, name))
+
+            for name in new.subdirs - old.subdirs:
+                self._snapshot_tree(os.path.join(path, name), emit=True)
+            for name in old.subdirs - new.subdirs:
+                self._forget_tree(os.path.join(path, name))
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "directories": len(self._snapshots),
+            "polls": self.polls,
+            "dirs_relisted": self.dirs_relisted,
+        }
@@ -0,0 +1,173 @@
+# ComfyUI-Usgromana-Gallery/backend/event_queue.py
+# Coalescing queue between watchdog callbacks and gallery consumers
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+# (event_type, path) with event_type in "created" / "modified" / "deleted"
+FileEvent = Tuple[str, str]
+
+
+def merge_event(previous: Optional[str], current: str) -> str:
+    """
+    Collapse two events for the same path into the one a consumer needs to see.
+
+    created + modified  -> created   (file still being written)
+    deleted + created   -> modified  (replaced in place, e.g. atomic save)
+    anything + deleted  -> deleted
+    """
+    if previous is None or current == "deleted":
+        return current
+    if previous == "created":
+        return "created"
+    if previous == "deleted":
+        return "modified"
+    return current
+
+
+class CoalescingEventQueue:
+    """
+    Buffers file events from the observer thread and delivers them in batches.
+
+    put() is cheap and never blocks the observer: events are merged per path
+    in an ordered dict, so a ComfyUI save (created + several modified) or a
+    move (deleted + created) reaches consumers as one entry per path. A
+    flusher thread waits until the queue has been quiet for `window` seconds
+    (or `max_delay` has passed since the first pending event) and hands the
+    whole batch to `callback` in one call.
+
+    When more than `max_pending` distinct paths are waiting, new paths are
+    dropped and `on_overflow` is called once per batch so the owner can fall
+    back to a full rescan.
+    """
+
+    def __init__(self, callback: Callable[[List[FileEvent]], None], window: float = 0.2,
+                 max_delay: float = 1.0, max_pending: int = 10000,
+                 on_overflow: Optional[Callable[[], None]] = None):
+        self.callback = callback
+        self.window = window
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.on_overflow = on_overflow
+
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[str, str]" = OrderedDict()
+        self._first_at = 0.0
+        self._last_at = 0.0
+        self._overflowed = False
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.received = 0
+        self.merged = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.batches = 0
+        self.overflows = 0
+        self.max_depth = 0
+        self.last_batch_size = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_worker, daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True):
+        """Stop the flusher, delivering anything still pending unless flush=False."""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        if flush:
+            self._flush()
+
+    def put(self, event_type: str, path: str):
+        """Queue one event (called from the observer thread)."""
+        now = time.monotonic()
+        with self._lock:
+            self.received += 1
+            previous = self._pending.get(path)
+            if previous is None:
+                if len(self._pending) >= self.max_pending:
+                    self.dropped += 1
+                    self._overflowed = True
+                    return
+                if not self._pending:
+                    self._first_at = now
+                self._pending[path] = event_type
+                self.max_depth = max(self.max_depth, len(self._pending))
+            else:
+                self.merged += 1
+                self._pending[path] = merge_event(previous, event_type)
+            self._last_at = now
+        self._wakeup.set()
+
+    def _flush_worker(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait()
+            if self._stop_event.is_set():
+                break
+            # Debounce: wait for a quiet period, but never longer than max_delay
+            while not self._stop_event.is_set():
+                with self._lock:
+                    now = time.monotonic()
+                    remaining = min(self._last_at + self.window, self._first_at + self.max_delay) - now
+                if remaining <= 0:
+                    break
+                self._stop_event.wait(remaining)
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            batch = list(self._pending.items())
+            self._pending = OrderedDict()
+            overflowed, self._overflowed = self._overflowed, False
+            self._wakeup.clear()
+        if overflowed:
+            self.overflows += 1
+            if self.on_overflow is not None:
+                try:
+                    self.on_overflow()
+                except Exception as e:
+                    print(f"[Usgromana-Gallery] Event queue overflow handler error: {e}")
+        if not batch:
+            return
+        self.batches += 1
+        self.delivered += len(batch)
+        self.last_batch_size = len(batch)
+        try:
+            self.callback([(event_type, path) for path, event_type in batch])
+        except Exception as e:
+            print(f"[Usgromana-Gallery] Event queue consumer error: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            depth = len(self._pending)
+        return {
+            "running": self.running,
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "max_pending": self.max_pending,
+            "window": self.window,
+            "received": self.received,
+            "merged": self.merged,
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "overflows": self.overflows,
+        }
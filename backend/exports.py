@@ -0,0 +1,230 @@
+# ComfyUI-Usgromana-Gallery/backend/exports.py
+# Background export jobs: ZIP archives built off-request and downloaded later
+
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from .zip_stream import write_zip
+
+DEFAULT_EXPORT_TTL = 24 * 3600.0
+# Finished archives are checked for expiry at most this often
+_CLEANUP_INTERVAL = 300.0
+
+TERMINAL_STATES = ("done", "failed", "cancelled")
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJob:
+    """One archive being built (or ready) for a user."""
+
+    def __init__(self, job_id: str, owner: Optional[str], name: str, entries: List[Tuple[str, str]]):
+        self.id = job_id
+        self.owner = owner
+        self.name = name
+        self.entries = entries
+        self.state = "queued"  # queued -> running -> done | failed | cancelled
+        self.error: Optional[str] = None
+        self.total_files = len(entries)
+        self.total_bytes = 0
+        self.done_files = 0
+        self.done_bytes = 0
+        self.size = 0  # Archive size once done
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.version = 0  # Bumped on every change (progress streams compare it)
+        self.cancel_requested = False
+
+    @property
+    def terminal(self) -> bool:
+        return self.state in TERMINAL_STATES
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "error": self.error,
+            "total_files": self.total_files,
+            "total_bytes": self.total_bytes,
+            "done_files": self.done_files,
+            "done_bytes": self.done_bytes,
+            "size": self.size,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+class ExportManager:
+    """
+    Builds export archives on a worker thread into <directory>/<id>.zip
+    (written as .part and renamed when complete) and keeps them for `ttl`
+    seconds after they finish. A small JSON sidecar per finished archive lets
+    downloads survive a restart. Jobs run one at a time so a large export
+    doesn't starve thumbnail rendering of disk bandwidth.
+    """
+
+    def __init__(self, directory: str, ttl: float = DEFAULT_EXPORT_TTL, max_workers: int = 1):
+        self.directory = directory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._jobs: dict[str, ExportJob] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="usg-export")
+        self._last_cleanup = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self._load_finished()
+
+    def archive_path(self, job: ExportJob) -> str:
+        return os.path.join(self.directory, f"{job.id}.zip")
+
+    def _sidecar_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _load_finished(self):
+        """Pick up archives finished before a restart; drop partial ones."""
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".part"):
+                _remove(path)
+            elif name.endswith(".json"):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    job = ExportJob(data["id"], data.get("owner"), data.get("name", ""), [])
+                    for key in ("total_files", "total_bytes", "done_files", "done_bytes", "size", "created", "finished"):
+                        setattr(job, key, data.get(key, getattr(job, key)))
+                    job.state = "done"
+                    if os.path.isfile(self.archive_path(job)):
+                        self._jobs[job.id] = job
+                    else:
+                        _remove(path)
+                except Exception as e:
+                    print(f"[Usgromana-Gallery] Ignoring unreadable export record '{name}': {e}")
+                    _remove(path)
+        self.cleanup()
+
+    def create(self, entries: List[Tuple[str, str]], owner: Optional[str], name: str = "") -> ExportJob:
+        job = ExportJob(secrets.token_hex(8), owner, name or "gallery_export", entries)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        self.cleanup()
+        return job
+
+    def get(self, job_id: str, owner: Optional[str]) -> Optional[ExportJob]:
+        """A job, if it exists and belongs to owner (an unknown owner, None, sees none)."""
+        if owner is None:
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None and job.owner == owner else None
+
+    def jobs(self, owner: Optional[str]) -> List[ExportJob]:
+        if owner is None:
+            return []
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def _update(self, job: ExportJob, **changes):
+        with self._lock:
+            for key, value in changes.items():
+                setattr(job, key, value)
+            job.version += 1
+
+    def cancel(self, job: ExportJob):
+        """Cancel a queued/running job, or delete a finished archive."""
+        with self._lock:
+            job.cancel_requested = True
+            queued = job.state == "queued"
+            finished = job.terminal
+        if queued:
+            self._update(job, state="cancelled", finished=time.time())
+        if finished or queued:
+            self._discard(job)
+
+    def _discard(self, job: ExportJob):
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        _remove(self.archive_path(job))
+        _remove(self.archive_path(job) + ".part")
+        _remove(self._sidecar_path(job.id))
+
+    def _run(self, job: ExportJob):
+        if job.cancel_requested:
+            return
+        total_bytes = 0
+        for path, _ in job.entries:
+            try:
+                total_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+        self._update(job, state="running", total_bytes=total_bytes)
+
+        def progress(files: int, done_bytes: int):
+            if job.cancel_requested:
+                raise ExportCancelled()
+            self._update(job, done_files=files, done_bytes=done_bytes)
+
+        final = self.archive_path(job)
+        part = final + ".part"
+        try:
+            with open(part, "wb") as f:
+                written = write_zip(f, job.entries, progress)
+            os.replace(part, final)
+            job.entries = []
+            self._update(job, state="done", done_files=written, size=os.path.getsize(final),
+                         finished=time.time())
+            self._write_sidecar(job)
+        except ExportCancelled:
+            self._update(job, state="cancelled", finished=time.time())
+            self._discard(job)
+        except Exception as e:
+            print(f"[Usgromana-Gallery] Export {job.id} failed: {e}")
+            _remove(part)
+            self._update(job, state="failed", error=str(e), finished=time.time())
+
+    def _write_sidecar(self, job: ExportJob):
+        try:
+            with open(self._sidecar_path(job.id), "w", encoding="utf-8") as f:
+                json.dump({**job.to_dict(), "owner": job.owner}, f)
+        except OSError as e:
+            print(f"[Usgromana-Gallery] Warning: Failed to record export {job.id}: {e}")
+
+    def expired(self, job: ExportJob) -> bool:
+        """Whether a finished job is past its TTL (cleanup() may not have dropped it yet)."""
+        return job.terminal and job.finished is not None and time.time() - job.finished > self.ttl
+
+    def cleanup(self, force: bool = False):
+        """Drop finished jobs (and their archives) older than the TTL."""
+        now = time.time()
+        if not force and now - self._last_cleanup < _CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        with self._lock:
+            expired = [job for job in self._jobs.values() if self.expired(job)]
+        for job in expired:
+            self._discard(job)
+
+    def stats(self) -> dict:
+        with self._lock:
+            states: dict[str, int] = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+        return {"jobs": states, "ttl": self.ttl}
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"[Usgromana-Gallery] Warning: Failed to remove export file '{path}': {e}")
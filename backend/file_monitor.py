@@ -6,6 +6,8 @@ import threading
 from typing import Callable, Optional
 from pathlib import Path
 
+from .dir_poller import DirectoryPoller
+
 try:
     from watchdog.observers import Observer
     from watchdog.events import FileSystemEventHandler, FileSystemEvent
@@ -13,7 +15,8 @@ try:
 except ImportError:
     WATCHDOG_AVAILABLE = False
     Observer = None
-    FileSystemEventHandler = None
+    FileSystemEventHandler = object  # Keep GalleryFileHandler importable
+    FileSystemEvent = None
 
 
 class GalleryFileHandler(FileSystemEventHandler):
@@ -52,36 +55,51 @@ class GalleryFileHandler(FileSystemEventHandler):
 
 
 class FileMonitor:
-    """Manages file system monitoring for the gallery."""
+    """
+    Manages file system monitoring for the gallery.
+
+    Uses watchdog's native observer by default. In polling mode (or when
+    watchdog isn't installed) a DirectoryPoller is used instead, which only
+    re-lists directories whose mtime changed rather than re-stating every
+    file like watchdog's PollingObserver.
+    """
     
-    def __init__(self, watch_path: str, callback: Callable[[str, str], None], extensions: set[str]):
+    def __init__(self, watch_path: str, callback: Callable[[str, str], None], extensions: set[str],
+                 poll_interval: float = 2.0):
         self.watch_path = watch_path
         self.callback = callback
         self.extensions = extensions
+        self.poll_interval = poll_interval
         self.observer: Optional[Observer] = None
         self.handler: Optional[GalleryFileHandler] = None
+        self.poller: Optional[DirectoryPoller] = None
         self.running = False
         self.use_polling = False  # Can be toggled via settings
     
     def start(self, use_polling: bool = False):
         """Start monitoring the directory."""
-        if not WATCHDOG_AVAILABLE:
-            print("[Usgromana-Gallery] Watchdog not available. Install with: pip install watchdog")
-            return False
-        
         if self.running:
             return True
         
+        if not use_polling and not WATCHDOG_AVAILABLE:
+            print("[Usgromana-Gallery] Watchdog not available, falling back to polling. Install with: pip install watchdog")
+            use_polling = True
+        
         try:
             self.use_polling = use_polling
-            self.handler = GalleryFileHandler(self.callback, self.extensions)
-            self.observer = Observer()
             
-            # Use polling observer if requested (better compatibility)
+            # Polling mode (better compatibility, e.g. network shares without inotify)
             if use_polling:
-                from watchdog.observers.polling import PollingObserver
-                self.observer = PollingObserver(timeout=1.0)
+                self.poller = DirectoryPoller(
+                    self.watch_path, self.callback, self.extensions, interval=self.poll_interval
+                )
+                self.poller.start()
+                self.running = True
+                print(f"[Usgromana-Gallery] File monitoring started (polling={use_polling}, interval={self.poll_interval}s)")
+                return True
             
+            self.handler = GalleryFileHandler(self.callback, self.extensions)
+            self.observer = Observer()
             self.observer.schedule(self.handler, self.watch_path, recursive=True)
             self.observer.start()
             self.running = True
@@ -93,6 +111,12 @@ class FileMonitor:
     
     def stop(self):
         """Stop monitoring."""
+        if self.poller and self.running:
+            self.poller.stop()
+            self.poller = None
+            self.running = False
+            print("[Usgromana-Gallery] File monitoring stopped")
+            return
         if self.observer and self.running:
             try:
                 self.observer.stop()
@@ -107,6 +131,8 @@ class FileMonitor:
         self.extensions = extensions
         if self.handler:
             self.handler.extensions = {ext.lower() for ext in extensions}
+        if self.poller:
+            self.poller.extensions = {ext.lower() for ext in extensions}
     
     def update_polling(self, use_polling: bool):
         """Update polling mode (requires restart)."""
@@ -117,4 +143,10 @@ class FileMonitor:
             self.use_polling = use_polling
             if was_running:
                 self.start(use_polling)
+    
+    def update_poll_interval(self, interval: float):
+        """Update the polling interval (takes effect on the next poll)."""
+        self.poll_interval = interval
+        if self.poller:
+            self.poller.interval = interval
 
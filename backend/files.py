@@ -3,15 +3,22 @@
 import os
 import time
 from dataclasses import dataclass, asdict
-from typing import List
+from typing import Callable, List
 
 import folder_paths
 
+from .tree_scan import scan_tree, default_skip_dir
+
 # Basic image extensions (matches frontend constants)
 # Can be overridden via settings
 IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"}
 
 
+def image_version(size: int, mtime: float) -> str:
+    """Short token that changes whenever a file is rewritten (used as the v= URL parameter)."""
+    return f"{int(mtime * 1000):x}-{size:x}"
+
+
 @dataclass
 class GalleryImage:
     filename: str          # just the file name, e.g. "image.png"
@@ -25,9 +32,14 @@ class GalleryImage:
         # simple ISO-ish format; frontend doesn't care much beyond "sortable"
         return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.mtime))
 
+    @property
+    def version(self) -> str:
+        return image_version(self.size, self.mtime)
+
     def to_dict(self) -> dict:
         d = asdict(self)
         d["mtime_iso"] = self.mtime_iso
+        d["version"] = self.version
         return d
 
 
@@ -71,7 +83,25 @@ def _is_image_file(name: str, extensions: set[str] | None = None) -> bool:
     return ext.lower() in exts
 
 
-def list_output_images(limit: int | None = None, extensions: set[str] | None = None) -> List[GalleryImage]:
+def _is_thumb_name(name: str) -> bool:
+    """Check if a filename looks like a generated thumbnail."""
+    return name.startswith("thumb_") or "_thumb" in name.lower()
+
+
+def is_gallery_relpath(relpath: str, extensions: set[str] | None = None) -> bool:
+    """
+    Check if a relpath (relative to the gallery root) is something the gallery lists:
+    an image outside the _thumbs cache (and hidden directories) that isn't
+    itself a thumbnail.
+    """
+    parts = relpath.replace("\\", "/").split("/")
+    if any(default_skip_dir(part) for part in parts[:-1]):
+        return False
+    return _is_image_file(parts[-1], extensions) and not _is_thumb_name(parts[-1])
+
+
+def list_output_images(limit: int | None = None, extensions: set[str] | None = None,
+                       progress: Callable[[List[GalleryImage]], None] | None = None) -> List[GalleryImage]:
     """
     Scan the output directory (recursive) and return image metadata.
     Most recent first.
@@ -79,50 +109,36 @@ def list_output_images(limit: int | None = None, extensions: set[str] | None = N
     Args:
         limit: Maximum number of images to return
         extensions: Set of file extensions to include (defaults to IMAGE_EXTENSIONS)
+        progress: Called with each directory's images as the scan reaches them
     """
     root = get_gallery_root_dir()
     if not os.path.isdir(root):
         return []
 
-    items: List[GalleryImage] = []
     exts = extensions or IMAGE_EXTENSIONS
 
-    for dirpath, dirnames, filenames in os.walk(root):
-        # Skip thumbnail directories
-        if "_thumbs" in dirpath:
-            continue
-            
-        for fname in filenames:
-            if not _is_image_file(fname, exts):
-                continue
-            
-            # Skip thumbnail files (they're in _thumbs directory, but also skip if filename suggests it's a thumb)
-            # Thumbnails are served separately and shouldn't appear in main gallery
-            if fname.startswith("thumb_") or "_thumb" in fname.lower():
-                continue
-
-            full_path = os.path.join(dirpath, fname)
-            try:
-                stat = os.stat(full_path)
-            except FileNotFoundError:
-                # File disappeared between scandir and stat; ignore
-                continue
-
-            relpath = os.path.relpath(full_path, root)
-            relpath_norm = relpath.replace("\\", "/")
-
-            rel_dir = os.path.dirname(relpath_norm)
-            folder = rel_dir if rel_dir and rel_dir != "." else ""
-
-            items.append(
-                GalleryImage(
-                    filename=fname,
-                    relpath=relpath_norm,
-                    size=stat.st_size,
-                    mtime=stat.st_mtime,
-                    folder=folder,
-                )
+    # Thumbnails are served separately and shouldn't appear in main gallery;
+    # _thumbs (and hidden) directories are pruned before descending
+    def to_images(entries) -> List[GalleryImage]:
+        return [
+            GalleryImage(
+                filename=entry.name,
+                relpath=entry.relpath,
+                size=entry.size,
+                mtime=entry.mtime,
+                folder=entry.folder,
             )
+            for entry in entries
+        ]
+
+    on_dir = None
+    if progress is not None:
+        on_dir = lambda entries: progress(to_images(entries))
+
+    entries = scan_tree(
+        root, lambda name: _is_image_file(name, exts) and not _is_thumb_name(name), on_dir=on_dir
+    )
+    items = to_images(entries)
 
     # newest first
     items.sort(key=lambda x: x.mtime, reverse=True)
@@ -131,3 +147,30 @@ def list_output_images(limit: int | None = None, extensions: set[str] | None = N
         items = items[:limit]
 
     return items
+
+
+def image_from_path(full_path: str, root: str | None = None) -> GalleryImage | None:
+    """
+    Build a GalleryImage for a single file under the gallery root.
+    Returns None if the file is missing or outside the root.
+    """
+    root = os.path.abspath(root or get_gallery_root_dir())
+    full_path = os.path.abspath(full_path)
+    if not full_path.startswith(root + os.sep):
+        return None
+
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        return None
+
+    relpath_norm = os.path.relpath(full_path, root).replace("\\", "/")
+    rel_dir = os.path.dirname(relpath_norm)
+
+    return GalleryImage(
+        filename=os.path.basename(full_path),
+        relpath=relpath_norm,
+        size=stat.st_size,
+        mtime=stat.st_mtime,
+        folder=rel_dir if rel_dir and rel_dir != "." else "",
+    )
@@ -0,0 +1,271 @@
+# ComfyUI-Usgromana-Gallery/backend/journal_store.py
+# In-memory key/value store persisted as a JSON snapshot plus an append-only journal
+
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+# Pending edits are written this long after the first one (bursts share one write)
+DEFAULT_FLUSH_DELAY = 0.5
+# Fold the journal into the snapshot once it holds this many records or bytes...
+DEFAULT_COMPACT_RECORDS = 2000
+DEFAULT_COMPACT_BYTES = 1024 * 1024
+# ...or once it has held any records for this long (seconds), so quiet installs compact too
+DEFAULT_COMPACT_INTERVAL = 3600.0
+
+
+class JournalStore:
+    """
+    Dict-like store for small per-image records (ratings, user metadata).
+
+    The whole map lives in memory. Edits update it immediately and are queued
+    as journal records ({"k": key, "v": value} or {"k": key, "d": 1} for a
+    delete) that a background thread appends to <snapshot>.journal in
+    batches, so an edit costs O(1) instead of rewriting the whole file. Once
+    the journal has grown past compact_records or compact_bytes, or
+    compact_interval after the last compaction (a journal left by the
+    previous run is folded in shortly after load), the map is written to the
+    snapshot file (temp file + rename) and the journal is truncated.
+
+    On load the snapshot is read and the journal replayed over it. Records
+    hold absolute values, so replaying one that is already in the snapshot
+    (a crash between rename and truncate) is harmless, and a torn last line
+    from a crash mid-append is skipped. Edits made within flush_delay of a
+    crash are lost; call flush() where that matters.
+
+    The snapshot keeps the original indented JSON format, so existing
+    ratings.json / metadata.json files load unchanged and stay hand-editable
+    (edits made while the server runs are overwritten by the next compaction).
+    """
+
+    def __init__(self, snapshot_path: str, flush_delay: float = DEFAULT_FLUSH_DELAY,
+                 compact_records: int = DEFAULT_COMPACT_RECORDS, compact_bytes: int = DEFAULT_COMPACT_BYTES,
+                 compact_interval: float = DEFAULT_COMPACT_INTERVAL):
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + ".journal"
+        self.flush_delay = flush_delay
+        self.compact_records = compact_records
+        self.compact_bytes = compact_bytes
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()     # Guards _data, _pending, generation
+        self._io_lock = threading.Lock()  # Serializes journal appends and compaction
+        self._data: Dict[str, Any] = {}
+        self._pending: list = []
+        self._journal_records = 0
+        self._journal_bytes = 0
+        self._compact_due = time.monotonic() + compact_interval  # Time-based compaction deadline
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # (epoch, generation) identifies the store's state: generation is bumped on
+        # every edit and epoch changes on restart, when generation starts over
+        self.epoch = uuid.uuid4().hex[:12]
+        self.generation = 0
+        self.flushes = 0
+        self.compactions = 0
+        self._load()
+        if self._journal_records:
+            # Left over from the previous run: compact soon rather than replay it again next time
+            self._compact_due = 0.0
+            self._schedule()
+        atexit.register(self.flush)
+
+    # --- Loading -----------------------------------------------------
+
+    def _load(self):
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._data = data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[Usgromana-Gallery] Warning: Failed to read '{os.path.basename(self.snapshot_path)}': {e}")
+
+        try:
+            with open(self.journal_path, "rb+") as f:
+                raw = f.read()
+                complete = raw.rfind(b"\n") + 1
+                if complete < len(raw):
+                    # Torn write from a crash: cut it off so new records start on a fresh line
+                    f.truncate(complete)
+            for line in raw[:complete].splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(record)
+                self._journal_records += 1
+            self._journal_bytes = complete
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[Usgromana-Gallery] Warning: Failed to replay '{os.path.basename(self.journal_path)}': {e}")
+
+    def _apply(self, record: dict):
+        key = record.get("k")
+        if not isinstance(key, str):
+            return
+        if record.get("d"):
+            self._data.pop(key, None)
+        else:
+            self._data[key] = record.get("v")
+
+    # --- Reads -------------------------------------------------------
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Shallow copy of the whole map. Values are replaced, never mutated, so it stays consistent."""
+        with self._lock:
+            return dict(self._data)
+
+    # --- Edits -------------------------------------------------------
+
+    def _record(self, record: dict):
+        # Caller holds self._lock
+        self._apply(record)
+        self._pending.append(record)
+        self.generation += 1
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._record({"k": key, "v": value})
+        self._schedule()
+
+    def merge(self, key: str, updates: dict) -> dict:
+        """Shallow-merge updates into a dict value (replacing a non-dict one). Returns the new value."""
+        with self._lock:
+            existing = self._data.get(key)
+            value = {**existing, **updates} if isinstance(existing, dict) else dict(updates)
+            self._record({"k": key, "v": value})
+        self._schedule()
+        return value
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._record({"k": key, "d": 1})
+        self._schedule()
+        return True
+
+    def rename(self, old_key: str, new_key: str) -> bool:
+        """Move a value to a new key. Returns False if old_key has none."""
+        with self._lock:
+            if old_key not in self._data:
+                return False
+            self._record({"k": new_key, "v": self._data[old_key]})
+            self._record({"k": old_key, "d": 1})
+        self._schedule()
+        return True
+
+    # --- Persistence -------------------------------------------------
+
+    def _schedule(self):
+        self._wake.set()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            # Sleep until the next edit, or until time-based compaction is due
+            timeout = max(self._compact_due - time.monotonic(), 0.0) if self._journal_records else None
+            self._wake.wait(timeout)
+            self._wake.clear()
+            time.sleep(self.flush_delay)  # Let a burst of edits accumulate
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[Usgromana-Gallery] Error saving '{os.path.basename(self.snapshot_path)}': {e}")
+
+    def flush(self):
+        """Write pending edits to the journal now (blocking), compacting if it has grown large."""
+        with self._io_lock:
+            self._append_pending()
+            if self._compaction_due():
+                self._compact()
+
+    def compact(self):
+        """Fold the journal into the snapshot now (blocking)."""
+        with self._io_lock:
+            self._append_pending()
+            self._compact()
+
+    def _compaction_due(self) -> bool:
+        # Caller holds self._io_lock
+        if not self._journal_records:
+            return False
+        return (self._journal_records >= self.compact_records
+                or self._journal_bytes >= self.compact_bytes
+                or time.monotonic() >= self._compact_due)
+
+    def _append_pending(self):
+        # Caller holds self._io_lock
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        lines = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in pending).encode("utf-8")
+        try:
+            with open(self.journal_path, "ab") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            # Keep the edits for the next attempt rather than dropping them
+            with self._lock:
+                self._pending = pending + self._pending
+            raise
+        self._journal_records += len(pending)
+        self._journal_bytes += len(lines)
+        self.flushes += 1
+
+    def _compact(self):
+        # Caller holds self._io_lock and has just flushed. Edits made since are
+        # in the copy too and will be journaled again on the next flush, which
+        # is harmless (records are absolute values).
+        with self._lock:
+            data = dict(self._data)
+        self._write_snapshot(data)
+
+    def _write_snapshot(self, data: dict):
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        # Only now is it safe to drop the journal
+        with open(self.journal_path, "w", encoding="utf-8"):
+            pass
+        self._journal_records = 0
+        self._journal_bytes = 0
+        self._compact_due = time.monotonic() + self.compact_interval
+        self.compactions += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "generation": self.generation,
+            "pending": len(self._pending),
+            "journal_records": self._journal_records,
+            "journal_bytes": self._journal_bytes,
+            "flushes": self.flushes,
+            "compactions": self.compactions,
+        }
@@ -0,0 +1,433 @@
+# ComfyUI-Usgromana-Gallery/backend/meta_index.py
+# Persistent index of generation metadata for server-side faceted filtering and full-text search
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Facets a query can filter on / count. tags and lora are multi-valued.
+FACET_FIELDS = ("rating", "tags", "model", "sampler", "scheduler", "lora")
+_MULTI_VALUED = ("tags", "lora")
+
+# Images extracted (and committed) per batch; the index generation moves once per batch
+_BATCH_SIZE = 64
+# Minimum pause between passes, so a burst of catalog changes shares one pass
+_PASS_GAP = 2.0
+# Retry delay while the catalog isn't complete yet
+_NOT_READY_RETRY = 30.0
+
+# Full-text columns and their bm25 weights: a hit in the name counts far more than one in a prompt
+SEARCH_COLUMNS = ("filename", "display_name", "tags", "model", "positive", "negative")
+_SEARCH_WEIGHTS = (10.0, 8.0, 6.0, 4.0, 2.0, 0.5)
+# Extracted text that goes to the search table only (not mirrored in memory)
+_TEXT_FIELDS = ("positive", "negative")
+
+
+def extract_index_fields(image_path: str) -> dict:
+    """Facet values and prompt text embedded in an image file (blocking: opens and parses it)."""
+    from .metadata_extractor import extract_image_metadata
+
+    meta = extract_image_metadata(image_path)
+    structured = meta.get("structured_prompts") or {}
+    params = structured.get("parameters") or {}
+    loras = [lora.get("name") for lora in params.get("loras") or [] if isinstance(lora, dict)]
+    rating = meta.get("rating")
+    return {
+        "rating": rating if isinstance(rating, int) and 0 <= rating <= 5 else None,
+        "tags": [str(tag) for tag in meta.get("tags") or [] if tag],
+        "model": str(params["model"]) if params.get("model") else None,
+        "sampler": str(params["sampler"]) if params.get("sampler") else None,
+        "scheduler": str(params["scheduler"]) if params.get("scheduler") else None,
+        "lora": [str(name) for name in loras if name],
+        "positive": structured.get("positive") or "",
+        "negative": structured.get("negative") or "",
+    }
+
+
+def search_terms(text: str) -> List[str]:
+    """Words of a search string, split the way the FTS tokenizer splits indexed text."""
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+class MetadataIndex:
+    """
+    SQLite-backed map of image relpath -> facet values extracted from the file
+    (model, sampler, scheduler, LoRAs, and embedded rating/tags), plus a
+    full-text table over file names, display names, tags, model/LoRA names
+    and positive/negative prompts. The text table is SQLite FTS5 (ranked
+    with bm25) where available, otherwise a plain table searched with LIKE.
+    annotations(relpath) supplies the gallery's own display name and tags;
+    call annotate() when they change.
+
+    Extraction means opening and parsing every image, so it happens on a
+    daemon thread: each pass compares the catalog (sources() returns
+    (relpath, path, version) for every image, or None while the catalog is
+    incomplete) against the stored versions, extracts new and rewritten
+    images, and drops rows for images that are gone. All rows are mirrored in
+    memory, so filtering never touches the database.
+
+    Passes run when request() is called (catalog changes) and every
+    `interval` seconds as a safety net.
+    """
+
+    SCHEMA_VERSION = "2"
+
+    def __init__(self, db_path: str, sources: Callable[[], Optional[List[Tuple[str, str, str]]]],
+                 root: Callable[[], str], extract: Callable[[str], dict] = extract_index_fields,
+                 annotations: Optional[Callable[[str], Tuple[str, List[str]]]] = None,
+                 interval: float = 3600.0):
+        self.db_path = db_path
+        self.sources = sources
+        self.root_fn = root
+        self.extract = extract
+        self.annotations = annotations
+        self.interval = interval
+        self.fts = False
+        self.root: Optional[str] = None
+        self._lock = threading.RLock()
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._entries: Dict[str, Tuple[str, dict]] = {}
+        self._init_schema()
+
+        self._stop_event = threading.Event()
+        self._request_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.generation = 0  # Bumped whenever indexed values change
+        self.pending = 0     # Images still waiting for extraction in the current pass
+        self.running = False
+        self.indexed_total = 0
+        self.failures = 0
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta_info (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            row = self._conn.execute(
+                "SELECT value FROM meta_info WHERE key = 'schema_version'"
+            ).fetchone()
+            if row and row[0] != self.SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS facets")
+                self._conn.execute("DROP TABLE IF EXISTS search")
+                self._conn.execute("DELETE FROM meta_info")
+            # Rows keep their rowid across updates: it keys the matching search row
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS facets (
+                    id      INTEGER PRIMARY KEY,
+                    relpath TEXT NOT NULL UNIQUE,
+                    version TEXT NOT NULL,
+                    data    TEXT NOT NULL
+                )
+                """
+            )
+            columns = ", ".join(SEARCH_COLUMNS)
+            try:
+                self._conn.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5({columns}, tokenize='unicode61')"
+                )
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS search (rowid INTEGER PRIMARY KEY, {columns})"
+                )
+            # The table may predate an SQLite upgrade, so ask what it actually is
+            row = self._conn.execute("SELECT sql FROM sqlite_master WHERE name = 'search'").fetchone()
+            self.fts = bool(row and "fts5" in row[0].lower())
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta_info (key, value) VALUES ('schema_version', ?)",
+                (self.SCHEMA_VERSION,),
+            )
+
+    def bind_root(self, root: str):
+        """Use the index for a gallery root, discarding it if it was written for another root."""
+        root = os.path.abspath(root)
+        with self._lock:
+            if self.root == root:
+                return
+            with self._conn:
+                row = self._conn.execute("SELECT value FROM meta_info WHERE key = 'root'").fetchone()
+                if not row or row[0] != root:
+                    self._conn.execute("DELETE FROM facets")
+                    self._conn.execute("DELETE FROM search")
+                    self._conn.execute("INSERT OR REPLACE INTO meta_info (key, value) VALUES ('root', ?)", (root,))
+            entries = {}
+            for relpath, version, data in self._conn.execute("SELECT relpath, version, data FROM facets"):
+                try:
+                    entries[relpath] = (version, json.loads(data))
+                except ValueError:
+                    continue
+            self._entries = entries
+            self.root = root
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, relpath: str) -> Optional[dict]:
+        """Extracted facet values, or None if the image hasn't been indexed (yet)."""
+        entry = self._entries.get(relpath)
+        return entry[1] if entry is not None else None
+
+    # --- Background passes -------------------------------------------
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._request_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def request(self, *_):
+        """Run a pass soon (usable as a catalog listener)."""
+        self._request_event.set()
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            self._request_event.clear()
+            delay = self.interval
+            try:
+                if self.refresh() is None:
+                    delay = min(self.interval, _NOT_READY_RETRY)
+            except Exception as e:
+                print(f"[Usgromana-Gallery] Metadata index error: {e}")
+            self._stop_event.wait(_PASS_GAP)
+            self._request_event.wait(timeout=delay)
+
+    def refresh(self) -> Optional[int]:
+        """Index new/changed images and drop removed ones (blocking). Returns how many were extracted, or None if skipped."""
+        self.bind_root(self.root_fn())
+        sources = self.sources()
+        if sources is None:
+            return None
+
+        live = {relpath for relpath, _, _ in sources}
+        with self._lock:
+            gone = [relpath for relpath in self._entries if relpath not in live]
+            if gone:
+                for relpath in gone:
+                    del self._entries[relpath]
+                with self._conn:
+                    self._conn.executemany(
+                        "DELETE FROM search WHERE rowid = (SELECT id FROM facets WHERE relpath = ?)",
+                        [(r,) for r in gone],
+                    )
+                    self._conn.executemany("DELETE FROM facets WHERE relpath = ?", [(r,) for r in gone])
+                self.generation += 1
+        stale = [(relpath, path, version) for relpath, path, version in sources
+                 if self._entries.get(relpath, (None,))[0] != version]
+        if not stale:
+            return 0
+
+        self.running = True
+        self.pending = len(stale)
+        extracted = 0
+        started = time.time()
+        try:
+            for i in range(0, len(stale), _BATCH_SIZE):
+                if self._stop_event.is_set():
+                    break
+                rows = []
+                for relpath, path, version in stale[i:i + _BATCH_SIZE]:
+                    try:
+                        values = self.extract(path)
+                    except FileNotFoundError:
+                        continue
+                    except Exception as e:
+                        # Unreadable metadata: index it as empty rather than retrying every pass
+                        self.failures += 1
+                        print(f"[Usgromana-Gallery] Could not index metadata of '{relpath}': {e}")
+                        values = {}
+                    rows.append((relpath, version, values))
+                with self._lock:
+                    if self.root != os.path.abspath(self.root_fn()):
+                        break  # Root changed mid-pass; the next pass starts over
+                    with self._conn:
+                        for relpath, version, values in rows:
+                            text = {field: values.pop(field, "") for field in _TEXT_FIELDS}
+                            self._entries[relpath] = (version, values)
+                            self._conn.execute(
+                                "INSERT INTO facets (relpath, version, data) VALUES (?, ?, ?) "
+                                "ON CONFLICT(relpath) DO UPDATE SET version = excluded.version, data = excluded.data",
+                                (relpath, version, json.dumps(values)),
+                            )
+                            self._write_search_row(relpath, values, text)
+                    self.generation += 1
+                extracted += len(rows)
+                self.pending = max(0, len(stale) - i - _BATCH_SIZE)
+        finally:
+            self.running = False
+            self.pending = 0
+        self.indexed_total += extracted
+        if extracted:
+            print(f"[Usgromana-Gallery] Indexed metadata of {extracted} images in {time.time() - started:.1f}s")
+        return extracted
+
+    # --- Full-text search --------------------------------------------
+
+    def _write_search_row(self, relpath: str, values: dict, text: Optional[dict] = None):
+        # Caller holds self._lock inside a transaction
+        row = self._conn.execute("SELECT id FROM facets WHERE relpath = ?", (relpath,)).fetchone()
+        if row is None:
+            return
+        display_name, user_tags = self.annotations(relpath) if self.annotations else ("", [])
+        if text is None:
+            # Keep the extracted prompts; only the gallery's own fields changed
+            previous = self._conn.execute(
+                "SELECT positive, negative FROM search WHERE rowid = ?", (row[0],)
+            ).fetchone()
+            text = dict(zip(_TEXT_FIELDS, previous or ("", "")))
+        tags = list(dict.fromkeys([*(values.get("tags") or []), *user_tags]))
+        models = [values.get("model") or "", *(values.get("lora") or [])]
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO search (rowid, {', '.join(SEARCH_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (row[0], relpath, display_name or "", " ".join(tags), " ".join(m for m in models if m),
+             text.get("positive") or "", text.get("negative") or ""),
+        )
+
+    def annotate(self, relpath: str):
+        """The gallery's display name or tags for an image changed: refresh its search row."""
+        with self._lock:
+            entry = self._entries.get(relpath)
+            if entry is None:
+                return  # Not indexed yet; the pass that indexes it picks them up
+            with self._conn:
+                self._write_search_row(relpath, entry[1])
+            self.generation += 1
+
+    def search(self, text: str, limit: int = 1000) -> List[Tuple[str, float]]:
+        """
+        (relpath, score) of indexed images matching every word of text (as a
+        prefix), best match first. Without FTS5 every match scores 0 and
+        comes in no particular order.
+        """
+        terms = search_terms(text)
+        if not terms:
+            return []
+        with self._lock:
+            if self.fts:
+                match = " ".join(f'"{term}"*' for term in terms)
+                weights = ", ".join(str(w) for w in _SEARCH_WEIGHTS)
+                rows = self._conn.execute(
+                    f"SELECT f.relpath, bm25(search, {weights}) AS rank FROM search "
+                    f"JOIN facets f ON f.id = search.rowid WHERE search MATCH ? ORDER BY rank LIMIT ?",
+                    (match, limit),
+                ).fetchall()
+                return [(relpath, round(-rank, 4)) for relpath, rank in rows]
+            haystack = " || ' ' || ".join(f"coalesce(s.{column}, '')" for column in SEARCH_COLUMNS)
+            where = " AND ".join(f"({haystack}) LIKE ?" for _ in terms)
+            rows = self._conn.execute(
+                f"SELECT f.relpath FROM search s JOIN facets f ON f.id = s.rowid WHERE {where} LIMIT ?",
+                (*[f"%{term}%" for term in terms], limit),
+            ).fetchall()
+            return [(relpath, 0.0) for relpath, in rows]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "full_text": "fts5" if self.fts else "like",
+            "generation": self.generation,
+            "running": self.running,
+            "pending": self.pending,
+            "indexed_total": self.indexed_total,
+            "failures": self.failures,
+        }
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+
+class FacetQuery:
+    """
+    Filters parsed from a query string:
+      - rating_min=<0-5>                 → rating at least n
+      - rating=<n> (repeatable)          → rating is one of the values
+      - model= / sampler= / scheduler=   → value is one of the given values (repeatable)
+      - tag= / lora= (repeatable)        → image has every given tag / LoRA
+    Values are matched case-insensitively.
+    """
+
+    def __init__(self, rating_min: int = 0, any_of: Optional[Dict[str, set]] = None,
+                 all_of: Optional[Dict[str, set]] = None):
+        self.rating_min = rating_min
+        self.any_of = any_of or {}
+        self.all_of = all_of or {}
+
+    @classmethod
+    def from_query(cls, query) -> "FacetQuery":
+        """Parse an aiohttp request.query (a MultiDict). Raises ValueError on a bad rating."""
+        rating_min = int(query.get("rating_min", 0) or 0)
+        any_of: Dict[str, set] = {}
+        ratings = {str(int(value)) for value in query.getall("rating", [])}
+        if ratings:
+            any_of["rating"] = ratings
+        for field in ("model", "sampler", "scheduler"):
+            values = {value.lower() for value in query.getall(field, []) if value}
+            if values:
+                any_of[field] = values
+        all_of: Dict[str, set] = {}
+        for param, field in (("tag", "tags"), ("lora", "lora")):
+            values = {value.lower() for value in query.getall(param, []) if value}
+            if values:
+                all_of[field] = values
+        return cls(rating_min, any_of, all_of)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.rating_min or self.any_of or self.all_of)
+
+    def key(self) -> tuple:
+        """Hashable form (cache keys / ETags)."""
+        return (self.rating_min,
+                tuple(sorted((f, tuple(sorted(v))) for f, v in self.any_of.items())),
+                tuple(sorted((f, tuple(sorted(v))) for f, v in self.all_of.items())))
+
+    def matches(self, facets: dict) -> bool:
+        if (facets.get("rating") or 0) < self.rating_min:
+            return False
+        for field, wanted in self.any_of.items():
+            value = facets.get(field)
+            if value is None or str(value).lower() not in wanted:
+                return False
+        for field, wanted in self.all_of.items():
+            if not wanted <= {str(value).lower() for value in facets.get(field) or ()}:
+                return False
+        return True
+
+
+def count_facets(facet_values: Iterable[dict], limit: int = 50) -> Dict[str, Dict[str, int]]:
+    """
+    Value counts per facet over a set of images (the `limit` most common
+    values per facet, most common first). Images without a value are not counted.
+    """
+    counters = {field: Counter() for field in FACET_FIELDS}
+    for facets in facet_values:
+        for field in FACET_FIELDS:
+            value = facets.get(field)
+            if value is None:
+                continue
+            if field in _MULTI_VALUED:
+                counters[field].update(set(value))
+            else:
+                counters[field][str(value)] += 1
+    return {field: dict(counter.most_common(limit)) for field, counter in counters.items()}
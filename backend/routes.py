@@ -3,17 +3,42 @@
 import os
 import sys
 import json
+import asyncio
+import hashlib
+import secrets
+import time
+import threading
 import urllib.parse
+from email.utils import formatdate
 from typing import Set, Callable, Optional
 
 from PIL import Image
+import aiohttp
 from aiohttp import web
 from server import PromptServer
 
-from .files import get_output_dir, get_gallery_root_dir, list_output_images, IMAGE_EXTENSIONS
+from .files import (
+    get_output_dir, get_gallery_root_dir, list_output_images, image_from_path, is_gallery_relpath, image_version,
+    IMAGE_EXTENSIONS,
+)
 from folder_paths import get_output_directory
 from .file_monitor import FileMonitor
+from .event_queue import CoalescingEventQueue
 from .scanner import BackgroundScanner
+from .catalog import CatalogStore, LiveCatalog
+from .thumbnails import (
+    ThumbnailService, RENDITION_TIERS, THUMBS_DIR_NAME, rendition_spec, rendition_path_for, rendition_paths,
+    legacy_thumb_paths, remove_files, source_fingerprint, stale_thumbnails, touch_rendition, ACCESS_RESOLUTION,
+)
+from .thumb_index import ThumbIndex
+from .thumb_pack import ThumbPack, PackSliceResponse, PackEntryUnavailable, PACKS_DIR_NAME, rendition_key
+from .thumb_memory import ThumbMemoryCache
+from .zip_stream import stream_zip
+from .exports import ExportManager
+from .journal_store import JournalStore
+from .meta_index import MetadataIndex, FacetQuery, count_facets
+from .thumb_gc import ThumbnailCollector
+from .change_stream import ChangeStream, format_sse, format_resume_token, parse_resume_token
 from .. import ASSETS_DIR  # from root __init__.py
 
 # Get extension directory for storing data files
@@ -287,11 +312,50 @@ _background_scanner: BackgroundScanner | None = None
 _file_change_callbacks: list[Callable] = []
 _current_extensions: Set[str] = IMAGE_EXTENSIONS.copy()
 
+# Live in-memory image catalog, persisted to data/catalog.db and kept current
+# by file monitor events plus periodic background reconciliation
+_CATALOG_FILE = os.path.join(_DATA_DIR, "catalog.db")
+_catalog_rescan_interval = 300.0  # Seconds between background reconciliations
+try:
+    _catalog_store: CatalogStore | None = CatalogStore(_CATALOG_FILE)
+except Exception as e:
+    print(f"[Usgromana-Gallery] Persistent image catalog unavailable: {e}")
+    _catalog_store = None
+_catalog = LiveCatalog(_catalog_store)
+_catalog_load_lock = threading.Lock()
+# True while the catalog is being filled from a running background scan
+_catalog_partial = False
+
+# Thumbnails are rendered in a worker pool (threads unless thumbnailWorkerProcesses
+# is set); grid requests jump the warm-up queue
+_thumbnail_service = ThumbnailService()
+# Rendition encoding and storage from settings (renditionFormat / renditionQuality /
+# thumbnailStorage); None = reload
+_rendition_options: dict | None = None
+# Pack-file rendition store for the current root (thumbnailStorage = "pack")
+_thumb_pack: ThumbPack | None = None
+_thumb_pack_lock = threading.Lock()
+# Hot renditions kept in RAM (thumbnailMemoryCacheMB); hits skip the disk cache entirely
+_thumb_memory = ThumbMemoryCache()
+# Renditions are named by source fingerprint; this index remembers which one each
+# image uses so deletes can clean up after the source is gone (data/thumb_index.db)
+_THUMB_INDEX_FILE = os.path.join(_DATA_DIR, "thumb_index.db")
+try:
+    _thumb_index = ThumbIndex(_THUMB_INDEX_FILE)
+except Exception as e:
+    print(f"[Usgromana-Gallery] Persistent thumbnail index unavailable, keeping it in memory: {e}")
+    _thumb_index = ThumbIndex(":memory:")
+
+# Push channel for /watch: wakes connected SSE clients whenever the catalog changes
+_change_stream = ChangeStream()
+_catalog.add_listener(_change_stream.notify)
+
 # NSFW check cache to avoid re-checking the same images repeatedly
 # Format: {image_path: (is_nsfw, timestamp)}
 _nsfw_cache: dict[str, tuple[bool, float]] = {}
 _nsfw_cache_max_age = 3600  # Cache for 1 hour
 _nsfw_cache_max_size = 1000  # Limit cache size
+_nsfw_generation = 0  # Bumped when an image's NSFW status is changed through the gallery
 
 # Request-level cache to avoid re-filtering identical requests
 # Format: {(username, image_count_hash): (filtered_images, timestamp)}
@@ -310,6 +374,61 @@ def _json(data: dict, status: int = 200) -> web.Response:
     return web.json_response(data, status=status)
 
 
+def _make_etag(*parts) -> str:
+    """Build a strong ETag from the values a response was derived from."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:24]
+    return f'"{digest}"'
+
+
+def _etag_matches(request: web.Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _not_modified(etag: str, headers: dict | None = None) -> web.Response:
+    return web.Response(status=304, headers=headers or {"ETag": etag, "Cache-Control": "no-cache"})
+
+
+# /image responses whose URL carries the image's version (v=) never change
+_IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def _image_cache_control(request: web.Request) -> str:
+    """Versioned image URLs are cached for good; unversioned ones revalidate every time."""
+    return _IMMUTABLE_CACHE_CONTROL if request.query.get("v") else "no-cache"
+
+
+def _modified_since(request: web.Request, etag: str, mtime: float) -> bool:
+    """
+    Evaluate conditional headers for a response validated by (etag, mtime).
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 9110.
+    """
+    if request.headers.get("If-None-Match"):
+        return not _etag_matches(request, etag)
+    since = request.if_modified_since
+    return since is None or int(mtime) > since.timestamp()
+
+
+def _json_etag(data, etag: str | None) -> web.Response:
+    """JSON response carrying an ETag; clients must revalidate before reuse."""
+    if etag is None:
+        return web.json_response(data)
+    return web.json_response(data, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _file_fingerprint(path: str) -> tuple:
+    """(mtime_ns, size) of a file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
 def _safe_join_output(filename: str) -> str | None:
     """
     Safely join a filename or relpath to the output directory and ensure
@@ -350,6 +469,295 @@ def _safe_join_output(filename: str) -> str | None:
     return candidate
 
 
+def _ensure_catalog_loaded():
+    """
+    Make sure the live catalog reflects the current gallery root.
+    Loads from the persistent store when it holds a completed scan of the root.
+    Otherwise, if the background scanner is already on it, serves its partial
+    results as they arrive; as a last resort scans the directory synchronously.
+    """
+    root = os.path.abspath(get_gallery_root_dir())
+    if _catalog.root == root:
+        return
+
+    with _catalog_load_lock:
+        if _catalog.root == root:
+            return
+        if _catalog_store is not None and _catalog_store.bind_root(root):
+            _catalog.load(_catalog_store.list_images(), root)
+            return
+
+        if _background_scanner is not None and _background_scanner.busy:
+            _begin_partial_catalog(root)
+            return
+
+        images = list_output_images(extensions=_current_extensions)
+        _catalog.load(images, root)
+        if _catalog_store is not None:
+            _catalog_store.reconcile(images)
+
+
+def _begin_partial_catalog(root: str):
+    """
+    Start serving the catalog for root before its first scan has finished.
+    Whatever the store already holds (e.g. from an interrupted scan) is shown
+    right away; the background scan adds the rest through _on_scan_partial.
+    Caller holds _catalog_load_lock.
+    """
+    global _catalog_partial
+    images = []
+    if _catalog_store is not None:
+        _catalog_store.bind_root(root)
+        images = _catalog_store.list_images()
+    _catalog.load(images, root)
+    _catalog_partial = True
+    print(f"[Usgromana-Gallery] Serving partial catalog ({len(images)} images) while the background scan runs")
+
+
+def _on_scan_partial(images: list):
+    """Background scanner progress: publish newly found images while filling the catalog."""
+    if not _catalog_partial or _background_scanner is None:
+        return
+    if _background_scanner.scan_root != _catalog.root:
+        return  # Scan of a previous root; its results don't belong here
+    _catalog.apply_changes(images, [])
+
+
+def _on_scan_complete(images: list):
+    """Reconcile the live (and persistent) catalog with what is actually on disk."""
+    global _catalog_partial
+    try:
+        root = os.path.abspath(get_gallery_root_dir())
+        if _background_scanner.scan_root != root:
+            # Root changed mid-scan; the rescan requested by the settings save covers it
+            return
+        with _catalog_load_lock:
+            if _catalog.root != root:
+                _catalog.load(images, root)
+                if _catalog_store is not None:
+                    _catalog_store.bind_root(root)
+                    _catalog_store.reconcile(images)
+                _catalog_partial = False
+                return
+        changes = _catalog.apply_scan(images, since_generation=_background_scanner.last_scan_marker)
+        if _catalog_partial:
+            _catalog_partial = False
+            print(f"[Usgromana-Gallery] Catalog warmed by background scan: {len(_catalog)} images")
+        elif any(changes.values()):
+            print(f"[Usgromana-Gallery] Catalog reconciled: {changes}")
+    except Exception as e:
+        print(f"[Usgromana-Gallery] Catalog reconcile error: {e}")
+
+
+def _rendition_settings() -> dict:
+    global _rendition_options
+    if _rendition_options is None:
+        settings = _load_settings()
+        _rendition_options = {
+            "format": settings.get("renditionFormat"),
+            "quality": settings.get("renditionQuality"),
+            "storage": "pack" if settings.get("thumbnailStorage") == "pack" else "files",
+        }
+    return _rendition_options
+
+
+def _rendition_spec_for(tier: str):
+    """RenditionSpec for a tier using the configured format and quality (None if unknown tier)."""
+    options = _rendition_settings()
+    return rendition_spec(tier, options["format"], options["quality"])
+
+
+def _active_thumb_pack() -> ThumbPack | None:
+    """
+    The pack store under <root>/_thumbs/packs when thumbnailStorage is "pack",
+    else None. Opened lazily and reopened when the gallery root changes.
+    """
+    global _thumb_pack
+    with _thumb_pack_lock:
+        directory = None
+        if _rendition_settings()["storage"] == "pack":
+            directory = os.path.join(os.path.abspath(get_gallery_root_dir()), THUMBS_DIR_NAME, PACKS_DIR_NAME)
+        if _thumb_pack is not None and _thumb_pack.directory != directory:
+            _thumb_pack.close()
+            _thumb_pack = None
+        if directory is not None and _thumb_pack is None:
+            try:
+                _thumb_pack = ThumbPack(directory)
+            except Exception as e:
+                print(f"[Usgromana-Gallery] Thumbnail pack store unavailable, using files: {e}")
+                return None
+        return _thumb_pack
+
+
+def _pack_warmed(thumb_path: str, spec):
+    """ThumbnailService hook: move each warmed-up rendition into the pack store in pack mode."""
+    pack = _active_thumb_pack()
+    if pack is not None:
+        key, fingerprint = rendition_key(thumb_path)
+        asyncio.get_running_loop().run_in_executor(None, pack.add_file, key, thumb_path, spec.content_type, fingerprint)
+
+
+_thumbnail_service.on_warmed = _pack_warmed
+
+
+def _list_gallery_images() -> list:
+    """
+    Return gallery images from the live catalog, most recent first.
+    Falls back to a directory scan if the catalog cannot be loaded.
+    """
+    try:
+        _ensure_catalog_loaded()
+        return _catalog.snapshot(extensions=_current_extensions)
+    except Exception as e:
+        print(f"[Usgromana-Gallery] Catalog error, scanning directory instead: {e}")
+        return list_output_images(extensions=_current_extensions)
+
+
+def _catalog_remove(full_path: str):
+    """Drop a file the gallery itself deleted/moved away from the catalog."""
+    try:
+        root = os.path.abspath(get_gallery_root_dir())
+        _catalog.remove(os.path.relpath(os.path.abspath(full_path), root).replace("\\", "/"))
+    except Exception as e:
+        print(f"[Usgromana-Gallery] Catalog update error: {e}")
+
+
+def _catalog_add(full_path: str):
+    """Record a file the gallery itself created/moved into place in the catalog."""
+    try:
+        image = image_from_path(full_path)
+        if image is not None:
+            _catalog.upsert(image)
+    except Exception as e:
+        print(f"[Usgromana-Gallery] Catalog update error: {e}")
+
+
+def _catalog_folder_changed(old_folder_path: str | None = None):
+    """
+    A whole folder was deleted, renamed or moved. Drop its old records right away
+    and let the background scanner pick up the new location.
+    """
+    try:
+        if old_folder_path:
+            root = os.path.abspath(get_gallery_root_dir())
+            _catalog.remove_prefix(os.path.relpath(os.path.abspath(old_folder_path), root).replace("\\", "/"))
+        if _background_scanner:
+            _background_scanner.start_scan()
+    except Exception as e:
+        print(f"[Usgromana-Gallery] Catalog update error: {e}")
+
+
+def _gallery_relpath(full_path: str) -> str:
+    root = os.path.abspath(get_gallery_root_dir())
+    return os.path.relpath(os.path.abspath(full_path), root).replace("\\", "/")
+
+
+def _bound_thumb_index() -> ThumbIndex:
+    _thumb_index.bind_root(get_gallery_root_dir())
+    return _thumb_index
+
+
+def _rendition_path(safe_path: str, spec, st: os.stat_result | None = None) -> str:
+    """Cache path of a rendition of safe_path, recording its fingerprint in the thumbnail index."""
+    fingerprint = source_fingerprint(st or os.stat(safe_path))
+    _bound_thumb_index().record(_gallery_relpath(safe_path), fingerprint)
+    return rendition_path_for(get_gallery_root_dir(), fingerprint, spec)
+
+
+def _thumbs_deleted(full_path: str, folder: bool = False) -> list:
+    """
+    A file (or whole folder) the gallery deleted: remove its renditions, unless
+    another path (a hard link) still shares them, plus any legacy thumbnails.
+    Returns the removed paths.
+    """
+    try:
+        root = get_gallery_root_dir()
+        relpath = _gallery_relpath(full_path)
+        index = _bound_thumb_index()
+        if folder:
+            paths = []
+            fingerprints = index.forget_prefix(relpath)
+        else:
+            paths = legacy_thumb_paths(root, relpath)
+            fingerprints = index.forget(relpath)
+        for fingerprint in fingerprints:
+            paths.extend(rendition_paths(root, fingerprint))
+        pack = _active_thumb_pack()
+        if pack is not None:
+            pack.remove_fingerprints(fingerprints)
+        _thumb_memory.discard_fingerprints(fingerprints)
+        return remove_files(paths)
+    except Exception as e:
+        print(f"[Usgromana-Gallery] Thumbnail cleanup error: {e}")
+        return []
+
+
+def _thumbs_moved(old_path: str, new_path: str, folder: bool = False):
+    """A file or folder was moved/renamed; its renditions keep their fingerprint names."""
+    try:
+        index = _bound_thumb_index()
+        if folder:
+            index.move_prefix(_gallery_relpath(old_path), _gallery_relpath(new_path))
+        else:
+            index.move(_gallery_relpath(old_path), _gallery_relpath(new_path))
+    except Exception as e:
+        print(f"[Usgromana-Gallery] Thumbnail index update error: {e}")
+
+
+def _live_thumbnail_fingerprints(root: str) -> set | None:
+    """
+    Fingerprints of every catalogued image (blocking: stats each one), pruning
+    index rows for images that are gone. None until the catalog holds a
+    complete scan of root, so the collector never mistakes a partial
+    catalog for orphaned thumbnails.
+    """
+    if _catalog_partial or _catalog.root != root:
+        return None
+    fingerprints = set()
+    relpaths = set()
+    for image in _catalog.snapshot():
+        try:
+            st = os.stat(os.path.join(root, image.relpath))
+        except OSError:
+            continue
+        relpaths.add(image.relpath)
+        fingerprints.add(source_fingerprint(st))
+    _bound_thumb_index().retain(relpaths)
+    return fingerprints
+
+
+# Removes orphaned renditions and keeps _thumbs under the thumbnailCacheMB budget
+_thumb_collector = ThumbnailCollector(_live_thumbnail_fingerprints, get_gallery_root_dir, pack=_active_thumb_pack)
+
+
+def _metadata_sources() -> list | None:
+    """(relpath, path, version) of every catalogued image, or None until the catalog holds a complete scan."""
+    root = _catalog.root
+    if _catalog_partial or root is None or root != os.path.abspath(get_gallery_root_dir()):
+        return None
+    return [(img.relpath, os.path.join(root, img.relpath), img.version) for img in _catalog.snapshot()]
+
+
+def _search_annotations(relpath: str) -> tuple:
+    """The gallery's own display name and tags for an image (searched along with its file metadata)."""
+    meta = _meta_store.get(relpath)
+    if meta is None:
+        meta = _meta_store.get(os.path.basename(relpath))
+    if not isinstance(meta, dict):
+        return "", []
+    tags = meta.get("tags")
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(",") if t.strip()]
+    return str(meta.get("display_name") or ""), [str(t) for t in tags or [] if t]
+
+
+# Generation metadata (model, sampler, LoRAs, prompts, ...) for server-side filtering
+# and full-text search; filled in the background
+_metadata_index = MetadataIndex(os.path.join(_DATA_DIR, "meta_index.db"), _metadata_sources,
+                                get_gallery_root_dir, annotations=_search_annotations)
+_catalog.add_listener(_metadata_index.request)
+
+
 def _get_username_from_request(request: web.Request) -> Optional[str]:
     """
     Try to extract username from the request.
@@ -656,6 +1064,178 @@ PromptServer.instance.app.router.add_static(
 
 _GALLERY_BASE_PERM = "settings_usgromanagallery"
 
+# Keyset pagination limits for /list?limit=...
+_LIST_PAGE_DEFAULT = 200
+_LIST_PAGE_MAX = 1000
+# Ranked matches /search considers before visibility filtering and paging
+_SEARCH_MAX_RESULTS = 5000
+
+
+def _user_scope_predicate(request: web.Request, has_view_all: bool) -> Optional[Callable]:
+    """
+    Return a predicate restricting images to what the caller may see,
+    or None if every image is visible.
+    """
+    if has_view_all:
+        return None
+    # Scope to the requesting user's subfolder
+    user_id = get_request_user_id(request)
+    if user_id:
+        prefix = user_id + "/"
+        return lambda img: img.relpath.startswith(prefix)
+    if _USGROMANA_API_AVAILABLE:
+        # API loaded but user unidentifiable — show nothing
+        return lambda img: False
+    # API not available — fail open, return all images
+    return None
+
+
+def _visibility_predicate(request: web.Request, has_view_all: bool) -> Callable:
+    """Predicate for catalog records the caller may list (extension + user scope)."""
+    scope = _user_scope_predicate(request, has_view_all)
+    extensions = set(_current_extensions)
+
+    def visible(img) -> bool:
+        if os.path.splitext(img.filename)[1].lower() not in extensions:
+            return False
+        return scope is None or scope(img)
+
+    return visible
+
+
+# Facet values per relpath, valid while the index, ratings and metadata are
+# unchanged (see _facet_state); saves rebuilding them on every filtered request
+_facet_cache: dict[str, dict] = {}
+_facet_cache_state = None
+_facet_cache_lock = threading.Lock()
+
+
+def _facet_state() -> tuple:
+    """Changes whenever any image's facet values may have changed."""
+    return (_metadata_index.generation, _ratings_store.epoch, _ratings_store.generation,
+            _meta_store.epoch, _meta_store.generation)
+
+
+def _image_facets(img) -> dict:
+    """Facet values of a catalog image (cached; callers must not modify the dict)."""
+    global _facet_cache_state
+    state = _facet_state()
+    with _facet_cache_lock:
+        if state != _facet_cache_state:
+            _facet_cache.clear()
+            _facet_cache_state = state
+        facets = _facet_cache.get(img.relpath)
+    if facets is None:
+        facets = _build_image_facets(img)
+        with _facet_cache_lock:
+            if _facet_cache_state == state:
+                _facet_cache[img.relpath] = facets
+    return facets
+
+
+def _build_image_facets(img) -> dict:
+    """
+    Facet values of a catalog image: what the metadata index extracted from
+    the file, overridden by the gallery's own rating and tags (metadata store
+    first, then the legacy ratings store, keyed by relpath or bare filename,
+    matching what the grid looks up).
+    """
+    facets = dict(_metadata_index.get(img.relpath) or {})
+    meta = _meta_store.get(img.relpath)
+    if meta is None:
+        meta = _meta_store.get(img.filename)
+    meta = meta if isinstance(meta, dict) else {}
+
+    rating = meta.get("rating")
+    if not isinstance(rating, (int, float)) or not 0 <= rating <= 5:
+        rating = _ratings_store.get(img.relpath)
+        if rating is None:
+            rating = _ratings_store.get(img.filename)
+    if isinstance(rating, (int, float)) and 0 <= rating <= 5:
+        facets["rating"] = int(rating)
+    elif facets.get("rating") is None:
+        facets["rating"] = 0
+
+    tags = meta.get("tags")
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(",") if t.strip()]
+    if isinstance(tags, list):
+        facets["tags"] = [str(t) for t in tags if t]
+    return facets
+
+
+def _facet_query(request: web.Request) -> FacetQuery:
+    """Facet filters of a /list or /facets request (ValueError if malformed)."""
+    return FacetQuery.from_query(request.query)
+
+
+def _facet_predicate(query: FacetQuery, visible: Callable) -> Callable:
+    if not query.active:
+        return visible
+    return lambda img: visible(img) and query.matches(_image_facets(img))
+
+
+def _image_payload(img) -> dict:
+    """Serialize a GalleryImage for the frontend."""
+    d = img.to_dict()
+    d["url"] = f"{ROUTE_PREFIX}/image?filename={urllib.parse.quote(img.relpath)}&v={d['version']}"
+    return d
+
+
+def _folder_summary(images) -> list[dict]:
+    """Build the folder list (path/name/count) for a set of images."""
+    counts: dict[str, int] = {}
+    for img in images:
+        folder = img.folder or ""
+        counts[folder] = counts.get(folder, 0) + 1
+    return _folder_list_from_counts(counts)
+
+
+def _folder_list_from_counts(counts: dict[str, int]) -> list[dict]:
+    return [
+        {"path": folder, "name": folder or "Output", "count": counts[folder]}
+        for folder in sorted(counts, key=lambda f: (0 if f == "" else 1, f))
+    ]
+
+
+def _encode_list_cursor(cursor: tuple[float, str] | None) -> str | None:
+    if cursor is None:
+        return None
+    mtime, relpath = cursor
+    return f"{mtime!r},{relpath}"
+
+
+def _decode_list_cursor(token: str) -> tuple[float, str]:
+    mtime, relpath = token.split(",", 1)
+    return float(mtime), relpath
+
+
+def _list_etag(request: web.Request, has_view_all: bool) -> str | None:
+    """
+    ETag for /list and /folders: the catalog generation plus everything else
+    the response depends on (query, root, extensions, caller identity).
+    """
+    try:
+        _ensure_catalog_loaded()
+        identity = None
+        nsfw_state = None
+        if _USGROMANA_API_AVAILABLE:
+            identity = (_get_username_from_request(request), None if has_view_all else get_request_user_id(request))
+            # Untagged images are re-checked once the request cache expires
+            nsfw_state = (_nsfw_generation, int(time.time() // _request_cache_max_age))
+        facet_state = None
+        if _facet_query(request).active or request.path.endswith(("/facets", "/search")):
+            # Filtered results also change with ratings, tags and indexing progress
+            facet_state = _facet_state()
+        return _make_etag(
+            request.path, request.query_string, _catalog.root, _catalog.generation,
+            sorted(_current_extensions), has_view_all, identity, nsfw_state, facet_state,
+        )
+    except Exception as e:
+        print(f"[Usgromana-Gallery] Could not compute list ETag: {e}")
+        return None
+
+
 @PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/list")
 async def gallery_list(request: web.Request) -> web.Response:
     """
@@ -665,6 +1245,26 @@ async def gallery_list(request: web.Request) -> web.Response:
       - UsgromanaGallery.ViewAll granted → return all images
       - UsgromanaGallery granted (but not ViewAll) → return only the user's own images
       - Neither granted → 403
+
+    Optional query (keyset pagination, newest first):
+      - limit=<n>                → return at most n images plus a "next" cursor
+      - after=<mtime>,<relpath>  → continue after the cursor returned by the previous page
+    Paginated responses omit "folders"; fetch them from /folders instead.
+
+    Optional query (delta sync):
+      - since=<generation>&epoch=<epoch> → only images added/modified/removed since
+        that catalog generation, or { reset: true } if the client must refetch.
+
+    Optional query (filters, see meta_index.FacetQuery; combine with the above):
+      - rating_min=<n>, rating=<n>, model=, sampler=, scheduler=, tag=, lora=
+    Filters on file metadata only match images the metadata index has reached;
+    "index_pending" > 0 means it is still working through the gallery.
+
+    Responses carry an ETag derived from the catalog generation; a matching
+    If-None-Match is answered with 304 without building the list.
+
+    "partial": true means the startup scan is still filling the catalog; the
+    rest arrives through /watch or /list?since= (see /scan-status).
     """
     has_view_all = request_has_permission(request, _GALLERY_VIEW_ALL_PERM)
     has_base = request_has_permission(request, _GALLERY_BASE_PERM)
@@ -673,56 +1273,317 @@ async def gallery_list(request: web.Request) -> web.Response:
         return web.Response(status=403, text="Access denied")
 
     try:
-        images = list_output_images(extensions=_current_extensions)
+        query = _facet_query(request)
+    except ValueError:
+        return _json({"ok": False, "error": "Invalid rating filter"}, status=400)
+
+    etag = _list_etag(request, has_view_all)
+    if etag and _etag_matches(request, etag):
+        return _not_modified(etag)
+
+    if "since" in request.query:
+        return _gallery_list_changes(request, has_view_all, etag)
+
+    if "limit" in request.query or "after" in request.query:
+        return await _gallery_list_page(request, has_view_all, etag, query)
+
+    try:
+        generation = _catalog.generation
+        images = _list_gallery_images()
+        if query.active:
+            # A pass over the whole catalog; keep it off the loop
+            images = await asyncio.to_thread(
+                lambda: [img for img in images if query.matches(_image_facets(img))]
+            )
         images = _apply_nsfw_filter(request, images)
 
-        if not has_view_all:
-            # Scope to the requesting user's subfolder
-            user_id = get_request_user_id(request)
-            if user_id:
-                prefix = user_id + "/"
-                images = [img for img in images if img.relpath.startswith(prefix)]
-            elif _USGROMANA_API_AVAILABLE:
-                # API loaded but user unidentifiable — show nothing
-                images = []
-            # else: API not available — fail open, return all images
-
-        base_url = f"{ROUTE_PREFIX}/image"
-        payload_images = []
-        folders_map: dict[str, dict] = {}
+        scope = _user_scope_predicate(request, has_view_all)
+        if scope is not None:
+            images = [img for img in images if scope(img)]
 
-        for img in images:
-            d = img.to_dict()
-            d["url"] = f"{base_url}?filename={urllib.parse.quote(img.relpath)}"
-            payload_images.append(d)
-
-            folder = img.folder or ""
-            if folder not in folders_map:
-                folders_map[folder] = {
-                    "path": folder,
-                    "name": folder or "Output",
-                    "count": 0,
-                }
-            folders_map[folder]["count"] += 1
-
-        folder_list = sorted(
-            folders_map.values(),
-            key=lambda f: (0 if f["path"] == "" else 1, f["path"]),
-        )
+        payload_images = [_image_payload(img) for img in images]
+        payload = {
+            "ok": True,
+            "images": payload_images,
+            "folders": _folder_summary(images),
+            "generation": generation,
+            "epoch": _catalog.epoch,
+            "partial": _catalog_partial,
+        }
+        if query.active:
+            payload["index_pending"] = _metadata_index.pending
+        return _json_etag(payload, etag)
+    except Exception as e:
+        print(f"[Usgromana-Gallery] /list: error: {e}")
+        return _json({"ok": False, "error": str(e)}, status=500)
+
+
+async def _gallery_list_page(request: web.Request, has_view_all: bool, etag: str | None,
+                             query: FacetQuery) -> web.Response:
+    """Serve one keyset-paginated page of /list."""
+    try:
+        limit = int(request.query.get("limit", _LIST_PAGE_DEFAULT))
+        after_token = request.query.get("after")
+        cursor = _decode_list_cursor(after_token) if after_token else None
+    except ValueError:
+        return _json({"ok": False, "error": "Invalid limit or after cursor"}, status=400)
+    limit = max(1, min(limit, _LIST_PAGE_MAX))
+
+    try:
+        _ensure_catalog_loaded()
+        generation = _catalog.generation
+        visible = _facet_predicate(query, _visibility_predicate(request, has_view_all))
+
+        # Keep pulling from the catalog until NSFW filtering leaves a full page
+        images = []
+        while len(images) < limit:
+            if query.active:
+                # Few matches can mean walking most of the catalog; keep it off the loop
+                chunk, cursor = await asyncio.to_thread(
+                    _catalog.page, after=cursor, limit=limit - len(images), predicate=visible
+                )
+            else:
+                chunk, cursor = _catalog.page(after=cursor, limit=limit - len(images), predicate=visible)
+            images.extend(_apply_nsfw_filter(request, chunk))
+            if cursor is None:
+                break
+
+        payload = {
+            "ok": True,
+            "images": [_image_payload(img) for img in images],
+            "next": _encode_list_cursor(cursor),
+            "generation": generation,
+            "epoch": _catalog.epoch,
+            "partial": _catalog_partial,
+        }
+        if query.active:
+            payload["index_pending"] = _metadata_index.pending
+        return _json_etag(payload, etag)
+    except Exception as e:
+        print(f"[Usgromana-Gallery] /list: error: {e}")
+        return _json({"ok": False, "error": str(e)}, status=500)
+
+
+def _gallery_list_changes(request: web.Request, has_view_all: bool, etag: str | None) -> web.Response:
+    """Serve /list?since=<generation>: only what changed since the client's last sync."""
+    try:
+        since = int(request.query["since"])
+    except ValueError:
+        return _json({"ok": False, "error": "Invalid since generation"}, status=400)
 
-        return _json({"ok": True, "images": payload_images, "folders": folder_list})
+    try:
+        return _json_etag(_changes_payload(request, has_view_all, since, request.query.get("epoch")), etag)
     except Exception as e:
         print(f"[Usgromana-Gallery] /list: error: {e}")
         return _json({"ok": False, "error": str(e)}, status=500)
 
 
+def _changes_payload(request: web.Request, has_view_all: bool, since: int, epoch: str | None) -> dict:
+    """
+    Build the delta body shared by /list?since= and the /watch stream:
+    images added/modified/removed since a generation, filtered for the caller,
+    or { reset: true } if the change log can't answer.
+    """
+    _ensure_catalog_loaded()
+    changes = None
+    if not epoch or epoch == _catalog.epoch:
+        changes = _catalog.changes_since(since)
+    if changes is None:
+        # Change log doesn't reach back that far (or server restarted): full refetch
+        return {
+            "ok": True,
+            "reset": True,
+            "generation": _catalog.generation,
+            "epoch": _catalog.epoch,
+        }
+
+    visible = _visibility_predicate(request, has_view_all)
+    added = _apply_nsfw_filter(request, [img for img in changes["added"] if visible(img)])
+    modified = _apply_nsfw_filter(request, [img for img in changes["modified"] if visible(img)])
+    removed = [img.relpath for img in changes["removed"] if visible(img)]
+
+    return {
+        "ok": True,
+        "reset": False,
+        "generation": changes["generation"],
+        "epoch": _catalog.epoch,
+        "added": [_image_payload(img) for img in added],
+        "modified": [_image_payload(img) for img in modified],
+        "removed": removed,
+    }
+
+
+@PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/facets")
+async def gallery_facets(request: web.Request) -> web.Response:
+    """
+    Facet counts for the images the caller may see that match the filters in
+    the query (same parameters as /list):
+    { ok, total, facets: { rating: {"5": n, ...}, tags: {...}, model: {...},
+      sampler, scheduler, lora }, index_pending }
+    Each facet lists its 50 most common values.
+    """
+    has_view_all = request_has_permission(request, _GALLERY_VIEW_ALL_PERM)
+    if not has_view_all and not request_has_permission(request, _GALLERY_BASE_PERM):
+        return web.Response(status=403, text="Access denied")
+    try:
+        query = _facet_query(request)
+    except ValueError:
+        return _json({"ok": False, "error": "Invalid rating filter"}, status=400)
+
+    etag = _list_etag(request, has_view_all)
+    if etag and _etag_matches(request, etag):
+        return _not_modified(etag)
+
+    try:
+        _ensure_catalog_loaded()
+        visible = _visibility_predicate(request, has_view_all)
+
+        def match():
+            matched = []
+            for img in _catalog.snapshot():
+                if not visible(img):
+                    continue
+                facets = _image_facets(img)
+                if query.matches(facets):
+                    matched.append((img, facets))
+            return matched
+
+        matched = await asyncio.to_thread(match)
+        allowed = {img.relpath for img in _apply_nsfw_filter(request, [img for img, _ in matched])}
+        matched = [facets for img, facets in matched if img.relpath in allowed]
+        return _json_etag({
+            "ok": True,
+            "total": len(matched),
+            "facets": count_facets(matched),
+            "index_pending": _metadata_index.pending,
+        }, etag)
+    except Exception as e:
+        print(f"[Usgromana-Gallery] /facets: error: {e}")
+        return _json({"ok": False, "error": str(e)}, status=500)
+
+
+@PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/search")
+async def gallery_search(request: web.Request) -> web.Response:
+    """
+    Full-text search over file names, display names, tags, model/LoRA names
+    and positive/negative prompts: every word of q must match (as a prefix).
+    Query: q=<text>, limit=<n>, after=<cursor from "next">, plus /list filters.
+    Returns { ok, images (best match first, each with a "score"), total,
+    next, index_pending }. Only images the metadata index has reached can match.
+
+    Pages are keyset-paginated on (score, relpath) like /list, so images
+    added or reindexed between page fetches don't shift later pages. An
+    image whose score changes meanwhile (bm25 weighs terms by how common
+    they are across the index) can still move across the cursor and be
+    skipped or repeated.
+    """
+    has_view_all = request_has_permission(request, _GALLERY_VIEW_ALL_PERM)
+    if not has_view_all and not request_has_permission(request, _GALLERY_BASE_PERM):
+        return web.Response(status=403, text="Access denied")
+    try:
+        query = _facet_query(request)
+        limit = max(1, min(int(request.query.get("limit", _LIST_PAGE_DEFAULT)), _LIST_PAGE_MAX))
+        after_token = request.query.get("after")
+        cursor = _decode_list_cursor(after_token) if after_token else None
+    except ValueError:
+        return _json({"ok": False, "error": "Invalid limit, after cursor or rating filter"}, status=400)
+    text = request.query.get("q", "").strip()
+    if not text:
+        return _json({"ok": False, "error": "Missing q"}, status=400)
+
+    etag = _list_etag(request, has_view_all)
+    if etag and _etag_matches(request, etag):
+        return _not_modified(etag)
+
+    try:
+        _ensure_catalog_loaded()
+        visible = _facet_predicate(query, _visibility_predicate(request, has_view_all))
+
+        def match():
+            scores = {}
+            images = []
+            for relpath, score in _metadata_index.search(text, _SEARCH_MAX_RESULTS):
+                img = _catalog.get(relpath)
+                if img is not None and visible(img):
+                    images.append(img)
+                    scores[relpath] = score
+            return images, scores
+
+        images, scores = await asyncio.to_thread(match)
+        images = _apply_nsfw_filter(request, images)
+        # Best match first, ties by relpath: a total order the cursor can resume from
+        images = sorted(images, key=lambda img: (-scores.get(img.relpath, 0.0), img.relpath))
+        start = 0
+        if cursor is not None:
+            after_key = (-cursor[0], cursor[1])
+            start = next((i for i, img in enumerate(images)
+                          if (-scores.get(img.relpath, 0.0), img.relpath) > after_key), len(images))
+        page = images[start:start + limit]
+        payload_images = []
+        for img in page:
+            item = _image_payload(img)
+            item["score"] = scores.get(img.relpath, 0.0)
+            payload_images.append(item)
+        return _json_etag({
+            "ok": True,
+            "images": payload_images,
+            "total": len(images),
+            "next": (_encode_list_cursor((scores.get(page[-1].relpath, 0.0), page[-1].relpath))
+                     if start + limit < len(images) else None),
+            "index_pending": _metadata_index.pending,
+        }, etag)
+    except Exception as e:
+        print(f"[Usgromana-Gallery] /search: error: {e}")
+        return _json({"ok": False, "error": str(e)}, status=500)
+
+
+@PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/folders")
+async def gallery_folders(request: web.Request) -> web.Response:
+    """
+    Return the folder summary for /list: [{ path, name, count }, ...].
+    Served separately so paginated grids can render before it is computed.
+    """
+    has_view_all = request_has_permission(request, _GALLERY_VIEW_ALL_PERM)
+    has_base = request_has_permission(request, _GALLERY_BASE_PERM)
+
+    if not has_view_all and not has_base:
+        return web.Response(status=403, text="Access denied")
+
+    etag = _list_etag(request, has_view_all)
+    if etag and _etag_matches(request, etag):
+        return _not_modified(etag)
+
+    try:
+        _ensure_catalog_loaded()
+        if has_view_all and not _USGROMANA_API_AVAILABLE:
+            # Nothing to filter: the catalog maintains folder counts incrementally
+            return _json_etag({"ok": True, "folders": _folder_list_from_counts(_catalog.folder_counts())}, etag)
+
+        images = _apply_nsfw_filter(request, _list_gallery_images())
+        scope = _user_scope_predicate(request, has_view_all)
+        if scope is not None:
+            images = [img for img in images if scope(img)]
+        return _json_etag({"ok": True, "folders": _folder_summary(images)}, etag)
+    except Exception as e:
+        print(f"[Usgromana-Gallery] /folders: error: {e}")
+        return _json({"ok": False, "error": str(e)}, status=500)
+
+
 @PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/image")
 async def gallery_image(request: web.Request) -> web.StreamResponse:
     """
     Serve an image from the output directory.
 
     Optional query:
-      - size=thumb   → return a cached thumbnail (max ~512px on the long side)
+      - size=thumb   → cached 256px rendition (grid)
+      - size=large   → cached 512px rendition (large / high-DPI grid)
+      - size=preview → cached 1600px rendition (details view)
+      - v=<version>  → the image's version from /list; the response may then be
+                       cached for good (Cache-Control: immutable). Without it
+                       clients revalidate (ETag / Last-Modified, answered with 304).
+    Renditions are encoded as WebP or JPEG (renditionFormat / renditionQuality
+    settings) and cached under <root>/_thumbs/<tier>/; recently served ones are
+    also kept in memory (thumbnailMemoryCacheMB).
     
     This endpoint enforces NSFW restrictions using ComfyUI-Usgromana NSFW API.
     """
@@ -771,29 +1632,10 @@ async def gallery_image(request: web.Request) -> web.StreamResponse:
             import traceback
             traceback.print_exc()
 
+    cache_control = _image_cache_control(request)
     size = request.query.get("size")
-    if size == "thumb":
-        # Thumbnails live under <output>/_thumbs/<filename>
-        base_output = get_gallery_root_dir()
-        thumbs_dir = os.path.join(base_output, "_thumbs")
-        os.makedirs(thumbs_dir, exist_ok=True)
-
-        # Use a unique identifier for thumbnails to avoid collisions
-        # CRITICAL FIX: Use relpath hash to prevent same-filename collisions across folders
-        # If filename is just a basename, use it directly (backward compatible)
-        # If filename is a relpath, create a hash-based name to avoid collisions
-        import hashlib
-        if "/" in filename or "\\" in filename:
-            # It's a relpath - create unique hash-based name
-            # Use first 16 chars of MD5 hash + original extension
-            relpath_hash = hashlib.md5(filename.encode('utf-8')).hexdigest()[:16]
-            original_ext = os.path.splitext(os.path.basename(filename))[1] or ".png"
-            thumb_name = f"{relpath_hash}{original_ext}"
-        else:
-            # Just a filename, use it directly (backward compatible for root-level images)
-            thumb_name = os.path.basename(filename)
-        thumb_path = os.path.join(thumbs_dir, thumb_name)
-
+    spec = _rendition_spec_for(size) if size in RENDITION_TIERS else None
+    if spec is not None:
         # Check NSFW before serving or generating thumbnail
         if _USGROMANA_API_AVAILABLE:
             try:
@@ -825,28 +1667,162 @@ async def gallery_image(request: web.Request) -> web.StreamResponse:
                 traceback.print_exc()
 
         try:
-            # Rebuild thumb if missing or older than source
-            needs_regen = (
-                not os.path.isfile(thumb_path)
-                or os.path.getmtime(thumb_path) < os.path.getmtime(safe_path)
+            # Renditions live under <root>/_thumbs/<tier>/<fingerprint>, so a renamed or
+            # moved image reuses them; a rewritten one gets a new name
+            st = os.stat(safe_path)
+            thumb_path = _rendition_path(safe_path, spec, st)
+            # Validated by the source: same fingerprint, same rendition bytes
+            headers = {
+                "ETag": '"%s"' % rendition_key(thumb_path)[0].replace("/", "-"),
+                "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+                "Cache-Control": cache_control,
+            }
+            if not _modified_since(request, headers["ETag"], st.st_mtime):
+                return _not_modified(headers["ETag"], headers)
+            # Hot renditions come straight from memory (the path embeds the source
+            # fingerprint, so a changed image misses)
+            cached = _thumb_memory.get(thumb_path)
+            if cached is not None:
+                if time.time() - cached.touched > ACCESS_RESOLUTION:
+                    _touch_rendition_access(thumb_path)
+                return web.Response(body=cached.data, headers={**headers, "Content-Type": cached.content_type})
+            pack = _active_thumb_pack()
+            if pack is not None:
+                resp = await _serve_packed_rendition(request, pack, safe_path, thumb_path, spec, headers)
+                if resp is not None:
+                    return resp
+            # Render if missing (visible priority); cache hits refresh the LRU clock
+            if not await _thumbnail_service.ensure(safe_path, thumb_path, spec):
+                touch_rendition(thumb_path)
+            data = await asyncio.to_thread(
+                _thumb_memory.load, thumb_path, thumb_path, spec.content_type, rendition_key(thumb_path)[1]
             )
+            if data is not None:
+                return web.Response(body=data, headers={**headers, "Content-Type": spec.content_type})
+            # FileResponse substitutes the rendition file's own validators, which is still consistent
+            return web.FileResponse(path=thumb_path, headers={**headers, "Content-Type": spec.content_type})
+        except Exception as e:
+            # Fall back to full image if thumb generation fails (never cached as the rendition)
+            print("[Usgromana-Gallery] Thumbnail error:", e)
+            return web.FileResponse(path=safe_path, headers={"Cache-Control": "no-store"})
+
+    # Default: serve original full-size image (FileResponse answers
+    # If-None-Match / If-Modified-Since from the file's own stat)
+    return web.FileResponse(path=safe_path, headers={"Cache-Control": cache_control})
 
-            if needs_regen:
-                with Image.open(safe_path) as im:
-                    # Reduce thumbnail size for faster loading (256px instead of 512px)
-                    # This significantly reduces file size and generation time
-                    im.thumbnail((256, 256), Image.Resampling.LANCZOS)
-                    # Save as PNG regardless of original type
-                    im.save(thumb_path, format="PNG", optimize=True)
 
-            return web.FileResponse(path=thumb_path)
+def _touch_rendition_access(thumb_path: str):
+    """Pass a memory-cache hit on to the disk cache's LRU clock (throttled by the caller)."""
+    pack = _active_thumb_pack()
+    if pack is not None:
+        pack.touch(rendition_key(thumb_path)[0])
+    else:
+        touch_rendition(thumb_path)
+    _thumb_memory.mark_touched(thumb_path)
+
+
+async def _serve_packed_rendition(request: web.Request, pack: ThumbPack, safe_path: str, thumb_path: str, spec,
+                                  headers: dict | None = None):
+    """
+    Serve a rendition from its pack file, rendering and packing it first if
+    needed. Entries small enough for the memory cache are read into it; larger
+    ones are sent as a byte range of the pack. Returns the response, or None to
+    serve the loose file instead. An entry whose bytes were lost (crash,
+    deleted pack) is dropped and rendered again.
+    """
+    key, fingerprint = rendition_key(thumb_path)
+    for _ in range(2):
+        entry = pack.get(key)
+        if entry is None:
+            await _thumbnail_service.ensure(safe_path, thumb_path, spec)
+            entry = await asyncio.to_thread(pack.add_file, key, thumb_path, spec.content_type, fingerprint)
+            if entry is None:
+                return None
+        else:
+            pack.touch(key)
+        try:
+            if _thumb_memory.cacheable(entry.length):
+                data = await asyncio.to_thread(pack.read, entry)
+                _thumb_memory.put(thumb_path, data, entry.content_type, fingerprint)
+                return web.Response(body=data, headers={**(headers or {}), "Content-Type": entry.content_type})
+            resp = PackSliceResponse(pack.pack_path(entry.pack), entry, headers=headers)
+            await resp.prepare(request)
+            return resp
+        except PackEntryUnavailable as e:
+            print(f"[Usgromana-Gallery] Dropping unreadable packed thumbnail '{key}': {e}")
+            pack.remove([key])
+    return None
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _rendition_bytes(safe_path: str, spec) -> bytes | None:
+    """
+    Encoded bytes of a rendition, rendering it first if needed (visible
+    priority). Goes through the memory cache like gallery_image; None if a
+    packed entry turned out to be unreadable (it is dropped and re-rendered
+    on the next request).
+    """
+    thumb_path = _rendition_path(safe_path, spec)
+    cached = _thumb_memory.get(thumb_path)
+    if cached is not None:
+        if time.time() - cached.touched > ACCESS_RESOLUTION:
+            _touch_rendition_access(thumb_path)
+        return cached.data
+    key, fingerprint = rendition_key(thumb_path)
+    pack = _active_thumb_pack()
+    if pack is not None:
+        entry = pack.get(key)
+        if entry is None:
+            await _thumbnail_service.ensure(safe_path, thumb_path, spec)
+            entry = await asyncio.to_thread(pack.add_file, key, thumb_path, spec.content_type, fingerprint)
+            if entry is None:
+                return None
+        else:
+            pack.touch(key)
+        try:
+            data = await asyncio.to_thread(pack.read, entry)
+        except PackEntryUnavailable as e:
+            print(f"[Usgromana-Gallery] Dropping unreadable packed thumbnail '{key}': {e}")
+            pack.remove([key])
+            return None
+    else:
+        if not await _thumbnail_service.ensure(safe_path, thumb_path, spec):
+            touch_rendition(thumb_path)
+        data = await asyncio.to_thread(_read_bytes, thumb_path)
+    _thumb_memory.put(thumb_path, data, spec.content_type, fingerprint)
+    return data
+
+
+def _nsfw_filter(request: web.Request) -> Callable[[str], bool]:
+    """
+    Resolve the requesting user's NSFW restrictions once and return a
+    predicate telling whether an image must be withheld (the same checks
+    gallery_image makes per request). Fails open, like gallery_image.
+    """
+    if not _USGROMANA_API_AVAILABLE:
+        return lambda path: False
+    try:
+        username = _get_username_from_request(request)
+        if username != get_current_user():
+            set_user_context(username or None)
+        if username and not is_sfw_enforced_for_user(username):
+            return lambda path: False
+    except Exception as e:
+        print(f"[Usgromana-Gallery] Error resolving NSFW restrictions: {e}")
+        return lambda path: False
+
+    def blocked(path: str) -> bool:
+        try:
+            return bool(check_image_path_nsfw(path, username))
         except Exception as e:
-            # Fall back to full image if thumb generation fails
-            print("[Usgromana-Gallery] Thumbnail error:", e)
-            return web.FileResponse(path=safe_path)
+            print(f"[Usgromana-Gallery] Error checking NSFW for image '{path}': {e}")
+            return False
 
-    # Default: serve original full-size image
-    return web.FileResponse(path=safe_path)
+    return blocked
 
 
 # --- Batch operations ---------------------------------------------
@@ -882,89 +1858,12 @@ async def gallery_batch_delete(request: web.Request) -> web.Response:
                 # Delete the main image file
                 if os.path.isfile(safe_path):
                     os.remove(safe_path)
+                    _catalog_remove(safe_path)
                     deleted.append(filename)
                     
-                    # CRITICAL: Also delete the corresponding thumbnail
-                    # Use the same naming logic as thumbnail generation
-                    # For root-level images, try both basename and hash-based name (in case thumbnails were generated with different logic)
-                    # Initialize variables in case of exception
-                    thumb_name = os.path.basename(filename)  # Default fallback
-                    thumb_path = os.path.join(thumbs_dir, thumb_name)
-                    thumb_found = None
-                    thumb_candidates = [thumb_name]
-                    
-                    try:
-                        import hashlib
-                        thumb_candidates = []  # List of possible thumbnail names to try
-                        
-                        if "/" in filename or "\\" in filename:
-                            # It's a relpath - create unique hash-based name
-                            relpath_hash = hashlib.md5(filename.encode('utf-8')).hexdigest()[:16]
-                            original_ext = os.path.splitext(os.path.basename(filename))[1] or ".png"
-                            thumb_name = f"{relpath_hash}{original_ext}"
-                            thumb_candidates.append(thumb_name)
-                        else:
-                            # Root-level image: try both basename and hash-based name
-                            # First try basename (current logic)
-                            thumb_name_basename = os.path.basename(filename)
-                            thumb_candidates.append(thumb_name_basename)
-                            
-                            # Also try hash-based name (in case thumbnail was generated with hash)
-                            relpath_hash = hashlib.md5(filename.encode('utf-8')).hexdigest()[:16]
-                            original_ext = os.path.splitext(os.path.basename(filename))[1] or ".png"
-                            thumb_name_hash = f"{relpath_hash}{original_ext}"
-                            thumb_candidates.append(thumb_name_hash)
-                            
-                            # Use basename as primary (for logging)
-                            thumb_name = thumb_name_basename
-                        
-                        # Try each candidate until we find the thumbnail
-                        thumb_path = None
-                        thumb_found = None
-                        for candidate in thumb_candidates:
-                            candidate_path = os.path.join(thumbs_dir, candidate)
-                            if os.path.isfile(candidate_path):
-                                thumb_path = candidate_path
-                                thumb_found = candidate
-                                break
-                        
-                        # If not found, use the first candidate as default (for logging)
-                        if thumb_path is None:
-                            thumb_path = os.path.join(thumbs_dir, thumb_candidates[0])
-                            thumb_found = None
-                        else:
-                            # Update thumb_name to the found one for logging
-                            thumb_name = thumb_found
-                    except Exception as thumb_name_err:
-                        # Fallback: use basename if calculation fails
-                        thumb_name = os.path.basename(filename)
-                        thumb_path = os.path.join(thumbs_dir, thumb_name)
-                        thumb_found = None
-                        thumb_candidates = [thumb_name]
-                        print(f"[Usgromana-Gallery] Warning: Error calculating thumbnail name for '{filename}': {thumb_name_err}")
-                    
-                    # Try to delete thumbnail if it exists
-                    # thumb_found is set above - if None, thumbnail wasn't found in candidates
-                    thumb_exists = thumb_found is not None
-                    if not thumb_exists and os.path.isdir(thumbs_dir):
-                            # Try case-insensitive search in thumbs directory (Windows)
-                            try:
-                                for existing_thumb in os.listdir(thumbs_dir):
-                                    if existing_thumb.lower() == thumb_name.lower():
-                                        thumb_path = os.path.join(thumbs_dir, existing_thumb)
-                                        thumb_exists = True
-                                        break
-                            except OSError:
-                                pass
-                    
-                    # Delete thumbnail if it exists (either found at expected path or via case-insensitive search)
-                    if thumb_exists or os.path.isfile(thumb_path):
-                            try:
-                                os.remove(thumb_path)
-                                deleted_thumbs.append(thumb_name)
-                            except OSError as thumb_err:
-                                # Non-fatal - log but don't fail the deletion
-                                print(f"[Usgromana-Gallery] Warning: Failed to delete thumbnail '{thumb_name}': {thumb_err}")
+                    # CRITICAL: Also delete the corresponding renditions (and legacy thumbnails)
+                    for rendition in _thumbs_deleted(safe_path):
+                        deleted_thumbs.append(os.path.relpath(rendition, thumbs_dir).replace("\\", "/"))
             except OSError as e:
                 errors.append(f"{filename}: {str(e)}")
         
@@ -980,18 +1879,19 @@ async def gallery_batch_delete(request: web.Request) -> web.Response:
 
 
 @PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/batch/download")
-async def gallery_batch_download(request: web.Request) -> web.Response:
+async def gallery_batch_download(request: web.Request) -> web.StreamResponse:
     """
     Download multiple files as ZIP. Query: ?filenames=path1,path2,path3
     
+    The archive is streamed while it is written (see zip_stream.stream_zip), so
+    large selections neither sit in memory nor keep the client waiting. Files
+    keep their folder structure (relpaths) so same-named images from different
+    folders don't collide; PNG/JPEG/WebP/GIF are stored, not deflated.
+    
     This endpoint enforces NSFW restrictions - NSFW images are excluded from the ZIP
     for users who have SFW restrictions enabled.
     """
     try:
-        import zipfile
-        import tempfile
-        from io import BytesIO
-        
         filenames_str = request.query.get("filenames", "")
         if not filenames_str:
             return _json({"ok": False, "error": "Missing filenames"}, status=400)
@@ -1000,87 +1900,226 @@ async def gallery_batch_download(request: web.Request) -> web.Response:
         if not filenames:
             return _json({"ok": False, "error": "No valid filenames"}, status=400)
         
-        # Get username for NSFW checks
-        username = None
-        if _USGROMANA_API_AVAILABLE:
-            try:
-                username = _get_username_from_request(request)
-                # Set user context (only if different from current)
-                current_user = get_current_user()
-                if username != current_user:
-                    if username:
-                        set_user_context(username)
-                    else:
-                        set_user_context(None)
-            except Exception as e:
-                print(f"[Usgromana-Gallery] Error setting user context for batch download: {e}")
-        
-        output_dir = get_gallery_root_dir()
-        
-        # Create ZIP in memory
-        zip_buffer = BytesIO()
-        added_count = 0
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for filename in filenames:
-                safe_path = _safe_join_output(filename)
-                if not safe_path or not os.path.isfile(safe_path):
-                    continue
-                
-                # Check NSFW restrictions
-                if _USGROMANA_API_AVAILABLE:
-                    try:
-                        should_block = check_image_path_nsfw(safe_path, username)
-                        if should_block:
-                            # Skip NSFW images for users with restrictions
-                            continue
-                    except Exception as e:
-                        # On error, include the file (fail open)
-                        print(f"[Usgromana-Gallery] Error checking NSFW for {filename}: {e}")
-                
-                # Add file to ZIP
-                arcname = os.path.basename(filename)  # Store just the filename in ZIP
-                zip_file.write(safe_path, arcname)
-                added_count += 1
-        
-        if added_count == 0:
+        # Resolve every entry before the response starts: an empty result must
+        # still be reportable as an error
+        entries = await asyncio.to_thread(_download_entries, filenames, _nsfw_filter(request))
+        if not entries:
             return _json({"ok": False, "error": "No files available for download (may be blocked by NSFW restrictions)"}, status=403)
-        
-        zip_buffer.seek(0)
-        
-        response = web.Response(
-            body=zip_buffer.read(),
-            headers={
-                "Content-Type": "application/zip",
-                "Content-Disposition": 'attachment; filename="gallery_images.zip"',
-            },
-        )
-        return response
     except Exception as e:
         return _json({"ok": False, "error": str(e)}, status=500)
+    
+    return await stream_zip(request, entries)
 
-# --- Ratings persistence ------------------------------------------
 
-RATINGS_FILE = os.path.join(_DATA_DIR, "ratings.json")
+def _download_entries(filenames: list, blocked: Callable[[str], bool]) -> list:
+    """(path, arcname) pairs for the files a user may download (blocking)."""
+    entries = []
+    seen = set()
+    for filename in filenames:
+        safe_path = _safe_join_output(filename)
+        if not safe_path or not os.path.isfile(safe_path) or safe_path in seen:
+            continue
+        # Skip NSFW images for users with restrictions
+        if blocked(safe_path):
+            continue
+        seen.add(safe_path)
+        entries.append((safe_path, _gallery_relpath(safe_path)))
+    return entries
+
+
+# --- Export jobs ---------------------------------------------------
+
+# Finished archives live in data/exports for a day (see exports.ExportManager)
+_export_manager = ExportManager(os.path.join(_DATA_DIR, "exports"))
+
+# Progress stream: check for updates this often, send a keep-alive comment this often
+_EXPORT_EVENT_INTERVAL = 0.5
+_EXPORT_KEEPALIVE = 15.0
+
+
+# Guests have no username; their exports belong to a random token kept in this cookie
+_EXPORT_GUEST_COOKIE = "usg_gallery_export"
 
 
-def _load_ratings() -> dict:
+def _export_guest_token(request: web.Request) -> Optional[str]:
+    token = request.cookies.get(_EXPORT_GUEST_COOKIE, "")
+    if 16 <= len(token) <= 64 and all(c.isalnum() or c in "-_" for c in token):
+        return token
+    return None
+
+
+def _export_owner(request: web.Request) -> Optional[str]:
+    """
+    Jobs are visible only to the user who created them: the username, or for
+    a guest the per-browser token from _EXPORT_GUEST_COOKIE. None (a guest
+    without the cookie) owns no jobs.
+    """
     try:
-        if not os.path.isfile(RATINGS_FILE):
-            return {}
-        with open(RATINGS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f) or {}
+        username = _get_username_from_request(request)
     except Exception:
-        return {}
+        username = None
+    if username:
+        return username
+    token = _export_guest_token(request)
+    return f"guest:{token}" if token else None
+
+
+def _export_download_name(name: str) -> str:
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name).strip("._")
+    return f"{safe or 'gallery_export'}.zip"
+
+
+def _export_job_payload(job) -> dict:
+    payload = job.to_dict()
+    if job.state == "done":
+        payload["download_url"] = f"{ROUTE_PREFIX}/exports/download?id={job.id}"
+    return payload
+
+
+@PromptServer.instance.routes.post(f"{ROUTE_PREFIX}/exports")
+async def gallery_create_export(request: web.Request) -> web.Response:
+    """
+    Start building a ZIP export in the background.
+    Body: { "filenames": ["path1", ...] } for a selection, or { "folder": "sub/dir" }
+    for every image in a folder and its subfolders ("" = whole gallery, limited
+    to what the caller may list). Optional "name" names the downloaded file.
+    Returns { ok, job }; follow it via /exports?id=, /exports/events?id= and
+    fetch the archive from job.download_url once its state is "done".
+    """
+    try:
+        body = await request.json()
+    except Exception:
+        return _json({"ok": False, "error": "Invalid JSON body"}, status=400)
+    try:
+        filenames = body.get("filenames")
+        folder = body.get("folder")
+        if filenames is None and folder is None:
+            return _json({"ok": False, "error": "Provide filenames or folder"}, status=400)
+        if filenames is None:
+            if not isinstance(folder, str):
+                return _json({"ok": False, "error": "Invalid folder"}, status=400)
+            visible = _visibility_predicate(request, request_has_permission(request, _GALLERY_VIEW_ALL_PERM))
+            prefix = folder.strip("/") + "/" if folder.strip("/") else ""
+            images = await asyncio.to_thread(_list_gallery_images)
+            filenames = [img.relpath for img in images if img.relpath.startswith(prefix) and visible(img)]
+        elif not isinstance(filenames, list):
+            return _json({"ok": False, "error": "Invalid filenames"}, status=400)
+        
+        filenames = [name for name in filenames if isinstance(name, str) and name]
+        entries = await asyncio.to_thread(_download_entries, filenames, _nsfw_filter(request))
+        if not entries:
+            return _json({"ok": False, "error": "No files available for export (may be blocked by NSFW restrictions)"}, status=403)
+        
+        name = body.get("name") if isinstance(body.get("name"), str) else ""
+        owner = _export_owner(request)
+        new_guest_token = None
+        if owner is None:
+            # First export from this guest browser: scope it to a fresh token
+            new_guest_token = secrets.token_urlsafe(24)
+            owner = f"guest:{new_guest_token}"
+        job = _export_manager.create(entries, owner, name)
+        response = _json({"ok": True, "job": _export_job_payload(job)})
+        if new_guest_token:
+            response.set_cookie(_EXPORT_GUEST_COOKIE, new_guest_token, path=ROUTE_PREFIX,
+                                max_age=int(_export_manager.ttl) * 2, httponly=True, samesite="Strict")
+        return response
+    except Exception as e:
+        return _json({"ok": False, "error": str(e)}, status=500)
+
 
+@PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/exports")
+async def gallery_exports(request: web.Request) -> web.Response:
+    """The caller's export jobs (newest first), or one job with ?id=<job id>."""
+    owner = _export_owner(request)
+    job_id = request.query.get("id")
+    if job_id:
+        job = _export_manager.get(job_id, owner)
+        if job is None:
+            return _json({"ok": False, "error": "Export not found"}, status=404)
+        return _json({"ok": True, "job": _export_job_payload(job)})
+    return _json({"ok": True, "jobs": [_export_job_payload(job) for job in _export_manager.jobs(owner)]})
 
-def _save_ratings(data: dict) -> None:
+
+@PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/exports/events")
+async def gallery_export_events(request: web.Request) -> web.StreamResponse:
+    """
+    Server-Sent Events for one export (?id=<job id>): a "progress" event with
+    the job on connect and whenever it changes, then a final "done", "failed"
+    or "cancelled" event, after which the stream ends.
+    """
+    job = _export_manager.get(request.query.get("id", ""), _export_owner(request))
+    if job is None:
+        return _json({"ok": False, "error": "Export not found"}, status=404)
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+    version = None
+    last_write = time.monotonic()
+    try:
+        while True:
+            if job.version != version:
+                version = job.version
+                event = job.state if job.terminal else "progress"
+                await response.write(format_sse(_export_job_payload(job), event=event))
+                last_write = time.monotonic()
+                if job.terminal:
+                    break
+            elif time.monotonic() - last_write > _EXPORT_KEEPALIVE:
+                await response.write(b": keep-alive\n\n")
+                last_write = time.monotonic()
+            await asyncio.sleep(_EXPORT_EVENT_INTERVAL)
+    except ConnectionResetError:
+        pass  # Client went away
+    return response
+
+
+@PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/exports/download")
+async def gallery_export_download(request: web.Request) -> web.StreamResponse:
+    """
+    Download a finished export (?id=<job id>). Supports Range / If-Range, so
+    interrupted downloads can resume.
+    """
+    job = _export_manager.get(request.query.get("id", ""), _export_owner(request))
+    if job is None:
+        return _json({"ok": False, "error": "Export not found"}, status=404)
+    if job.state != "done":
+        return _json({"ok": False, "error": f"Export is {job.state}"}, status=409)
+    if _export_manager.expired(job):
+        await asyncio.to_thread(_export_manager.cleanup, True)
+        return _json({"ok": False, "error": "Export has expired"}, status=410)
+    path = _export_manager.archive_path(job)
+    if not os.path.isfile(path):
+        return _json({"ok": False, "error": "Export has expired"}, status=410)
+    return web.FileResponse(path, headers={
+        "Content-Type": "application/zip",
+        "Content-Disposition": f'attachment; filename="{_export_download_name(job.name)}"',
+        "Cache-Control": "private, no-cache",
+    })
+
+
+@PromptServer.instance.routes.post(f"{ROUTE_PREFIX}/exports/cancel")
+async def gallery_cancel_export(request: web.Request) -> web.Response:
+    """Cancel a queued or running export, or delete a finished one. Body: { "id": "<job id>" }"""
     try:
-        os.makedirs(os.path.dirname(RATINGS_FILE), exist_ok=True)
-        with open(RATINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        body = await request.json()
     except Exception:
-        # Don't crash Comfy if disk write fails
-        pass
+        return _json({"ok": False, "error": "Invalid JSON body"}, status=400)
+    job = _export_manager.get(str(body.get("id", "")), _export_owner(request))
+    if job is None:
+        return _json({"ok": False, "error": "Export not found"}, status=404)
+    await asyncio.to_thread(_export_manager.cancel, job)
+    return _json({"ok": True})
+
+# --- Ratings persistence ------------------------------------------
+
+RATINGS_FILE = os.path.join(_DATA_DIR, "ratings.json")
+
+# Held in memory; edits are journaled in batches (see journal_store.JournalStore)
+_ratings_store = JournalStore(RATINGS_FILE)
 
 
 @PromptServer.instance.routes.post(f"{ROUTE_PREFIX}/mark-nsfw")
@@ -1089,6 +2128,7 @@ async def gallery_mark_nsfw(request: web.Request) -> web.Response:
     Mark an image as NSFW using the NSFW API.
     Body: { "filename": "..." }
     """
+    global _nsfw_generation
     if not _USGROMANA_API_AVAILABLE:
         return _json({"ok": False, "error": "NSFW API not available"}, status=503)
     
@@ -1126,6 +2166,7 @@ async def gallery_mark_nsfw(request: web.Request) -> web.Response:
                         del _nsfw_cache[safe_path]
                     # Also clear request cache
                     _request_cache.clear()
+                    _nsfw_generation += 1
                     print(f"[Usgromana-Gallery] Manually marked image '{filename}' as NSFW")
                     return _json({"ok": True, "message": "Image marked as NSFW. It will now be blocked for unauthorized users."})
                 else:
@@ -1162,9 +2203,7 @@ async def gallery_set_rating(request: web.Request) -> web.Response:
     if not filename or not isinstance(rating, (int, float)):
         return _json({"ok": False, "error": "Missing or invalid filename/rating"}, status=400)
 
-    ratings = _load_ratings()
-    ratings[filename] = int(rating)
-    _save_ratings(ratings)
+    _ratings_store.set(filename, int(rating))
 
     return _json({"ok": True})
 
@@ -1174,40 +2213,31 @@ async def gallery_get_ratings(request: web.Request) -> web.Response:
     """
     Return all stored ratings as { filename: rating, ... }.
     Includes ratings from both the legacy ratings file and metadata.
+    Honors If-None-Match (ETag derived from both stores' generations).
     """
-    ratings = _load_ratings()
+    etag = _make_etag(_ratings_store.epoch, _ratings_store.generation,
+                      _meta_store.epoch, _meta_store.generation)
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+
+    ratings = _ratings_store.snapshot()
     
     # Also include ratings from metadata (metadata takes precedence)
-    meta = _load_meta()
+    meta = _meta_store.snapshot()
     for filename, meta_data in meta.items():
         if isinstance(meta_data, dict) and "rating" in meta_data:
             rating_value = meta_data["rating"]
             if isinstance(rating_value, (int, float)) and 0 <= rating_value <= 5:
                 ratings[filename] = int(rating_value)
     
-    return web.json_response(ratings)
+    return _json_etag(ratings, etag)
 
 
 # --- Metadata persistence -----------------------------------------
 
 META_FILE = os.path.join(_DATA_DIR, "metadata.json")
 
-
-def _load_meta() -> dict:
-    if not os.path.exists(META_FILE):
-        return {}
-    try:
-        with open(META_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-
-def _save_meta(meta: dict) -> None:
-    tmp = META_FILE + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(meta, f, indent=2)
-    os.replace(tmp, META_FILE)
+_meta_store = JournalStore(META_FILE)
 
 
 @PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/meta")
@@ -1223,8 +2253,8 @@ async def gallery_get_meta(request: web.Request) -> web.Response:
         return _json({"ok": False, "error": "Missing filename"}, status=400)
 
     # Load stored metadata (user-edited fields like tags, display_name, rating)
-    meta = _load_meta()
-    result_meta = meta.get(filename, {})
+    stored = _meta_store.get(filename)
+    result_meta = dict(stored) if isinstance(stored, dict) else {}
     
     # Extract metadata from image file
     safe_path = _safe_join_output(filename)
@@ -1432,25 +2462,20 @@ async def gallery_set_meta(request: web.Request) -> web.Response:
     if not filename:
         return _json({"ok": False, "error": "Missing filename"}, status=400)
 
-    # Save to JSON metadata file (always)
+    # Save to the metadata store (always)
     # Merge with existing metadata instead of replacing
-    meta = _load_meta()
-    if filename in meta:
-        # Merge new payload with existing metadata
-        existing = meta[filename]
-        if isinstance(existing, dict) and isinstance(payload, dict):
-            meta[filename] = {**existing, **payload}
-        else:
-            meta[filename] = payload
+    if isinstance(payload, dict):
+        _meta_store.merge(filename, payload)
     else:
-        meta[filename] = payload
+        _meta_store.set(filename, payload)
     
     print(f"[Usgromana-Gallery] Saving metadata for '{filename}': {list(payload.keys())}")
-    _save_meta(meta)
     
     # Automatically write rating, display_name (title), and tags to image file (always, not just when write_to_image is True)
     # This ensures rating, title, and tags are persisted in the image metadata for Windows Properties compatibility
     safe_path = _safe_join_output(filename)
+    if safe_path and ("tags" in payload or "display_name" in payload):
+        _metadata_index.annotate(_gallery_relpath(safe_path))
     if safe_path and ("rating" in payload or "tags" in payload or "display_name" in payload):
         try:
             from .metadata_writer import write_metadata_to_image
@@ -1539,53 +2564,23 @@ async def gallery_rename_file(request: web.Request) -> web.Response:
     try:
         # Rename the file
         os.rename(old_path, new_path)
+        _catalog_remove(old_path)
+        _catalog_add(new_path)
+        _thumbs_moved(old_path, new_path)
         print(f"[Usgromana-Gallery] Rename: File renamed successfully from {old_path} to {new_path}")
         
         # Calculate new relpath for metadata/ratings update
         output_dir = os.path.abspath(get_gallery_root_dir())
         new_relpath = os.path.relpath(new_path, output_dir).replace("\\", "/")
         
-        # Update metadata if it exists (check both old_filename and old relpath)
-        meta = _load_meta()
-        metadata_updated = False
-        
-        # Try to find metadata by old_filename (could be relpath or just filename)
-        if old_filename in meta:
-            meta[new_relpath] = meta[old_filename]
-            del meta[old_filename]
-            metadata_updated = True
-            print(f"[Usgromana-Gallery] Rename: Updated metadata from key '{old_filename}' to '{new_relpath}'")
-        else:
-            # Try to find by relpath if old_filename was just a filename
-            old_relpath = os.path.relpath(old_path, output_dir).replace("\\", "/")
-            if old_relpath in meta:
-                meta[new_relpath] = meta[old_relpath]
-                del meta[old_relpath]
-                metadata_updated = True
-                print(f"[Usgromana-Gallery] Rename: Updated metadata from key '{old_relpath}' to '{new_relpath}'")
-        
-        if metadata_updated:
-            _save_meta(meta)
-        
-        # Update ratings if they exist (same logic as metadata)
-        ratings = _load_ratings()
-        ratings_updated = False
-        
-        if old_filename in ratings:
-            ratings[new_relpath] = ratings[old_filename]
-            del ratings[old_filename]
-            ratings_updated = True
-            print(f"[Usgromana-Gallery] Rename: Updated ratings from key '{old_filename}' to '{new_relpath}'")
-        else:
-            old_relpath = os.path.relpath(old_path, output_dir).replace("\\", "/")
-            if old_relpath in ratings:
-                ratings[new_relpath] = ratings[old_relpath]
-                del ratings[old_relpath]
-                ratings_updated = True
-                print(f"[Usgromana-Gallery] Rename: Updated ratings from key '{old_relpath}' to '{new_relpath}'")
-        
-        if ratings_updated:
-            _save_ratings(ratings)
+        # Move metadata and ratings to the new key (stored under old_filename,
+        # which could be a relpath or just a filename, or under the old relpath)
+        old_relpath = os.path.relpath(old_path, output_dir).replace("\\", "/")
+        for label, store in (("metadata", _meta_store), ("ratings", _ratings_store)):
+            for old_key in (old_filename, old_relpath):
+                if store.rename(old_key, new_relpath):
+                    print(f"[Usgromana-Gallery] Rename: Updated {label} from key '{old_key}' to '{new_relpath}'")
+                    break
         
         return _json({"ok": True, "message": "File renamed successfully", "new_filename": new_relpath})
     except OSError as e:
@@ -1611,25 +2606,107 @@ async def gallery_log(request: web.Request) -> web.Response:
 
 # --- File monitoring and real-time updates -------------------------
 
-def _on_file_change(event_type: str, file_path: str):
-    """Handle file system change events."""
+def _on_file_changes(events: list[tuple[str, str]]):
+    """Handle a coalesced batch of file system change events."""
     try:
         output_dir = get_gallery_root_dir()
-        if not file_path.startswith(output_dir):
+        relevents = [
+            (event_type, os.path.relpath(file_path, output_dir).replace("\\", "/"))
+            for event_type, file_path in events
+            if file_path.startswith(output_dir)
+        ]
+        if not relevents:
             return
-        
-        relpath = os.path.relpath(file_path, output_dir).replace("\\", "/")
-        
+
+        _apply_file_events_to_catalog(relevents)
+
         # Notify all registered callbacks
-        for callback in _file_change_callbacks:
-            try:
-                callback(event_type, relpath)
-            except Exception as e:
-                print(f"[Usgromana-Gallery] File change callback error: {e}")
+        for event_type, relpath in relevents:
+            for callback in _file_change_callbacks:
+                try:
+                    callback(event_type, relpath)
+                except Exception as e:
+                    print(f"[Usgromana-Gallery] File change callback error: {e}")
     except Exception as e:
         print(f"[Usgromana-Gallery] File change handler error: {e}")
 
 
+def _apply_file_events_to_catalog(events: list[tuple[str, str]]):
+    """Apply a batch of file monitor deltas to the live catalog as one generation."""
+    if not _catalog.loaded:
+        return
+
+    upserts = []
+    removals = []
+    for event_type, relpath in events:
+        if not is_gallery_relpath(relpath, _current_extensions):
+            continue
+        if event_type == "deleted":
+            removals.append(relpath)
+            continue
+        image = image_from_path(os.path.join(_catalog.root, relpath), _catalog.root)
+        if image is None:
+            # Created and removed again before we got to it
+            removals.append(relpath)
+        else:
+            upserts.append(image)
+    _catalog.apply_changes(upserts, removals)
+
+
+def _on_file_event_overflow():
+    """Too many events to track individually; reconcile with a full scan instead."""
+    print("[Usgromana-Gallery] File event queue overflowed; scheduling a rescan")
+    if _background_scanner is not None:
+        _background_scanner.request_rescan()
+
+
+# Watchdog callbacks land here; bursts are merged per path and delivered in batches
+_file_event_queue = CoalescingEventQueue(_on_file_changes, on_overflow=_on_file_event_overflow)
+
+
+def _load_settings() -> dict:
+    """Read data/settings.json (empty if missing or unreadable)."""
+    try:
+        with open(os.path.join(_DATA_DIR, "settings.json"), "r", encoding="utf-8") as f:
+            return json.load(f) or {}
+    except (OSError, ValueError):
+        return {}
+
+
+_POLL_INTERVAL_DEFAULT = 2.0
+
+
+def _poll_interval_setting(settings: dict) -> float:
+    """Polling interval in seconds from settings, clamped to something sane."""
+    try:
+        interval = float(settings.get("pollingInterval", _POLL_INTERVAL_DEFAULT))
+    except (TypeError, ValueError):
+        interval = _POLL_INTERVAL_DEFAULT
+    return min(max(interval, 0.5), 60.0)
+
+
+_THUMB_CACHE_MB_DEFAULT = 2048
+_THUMB_MEMORY_MB_DEFAULT = 64
+
+
+def _megabytes_setting(settings: dict, key: str, default: float) -> int:
+    try:
+        megabytes = float(settings.get(key, default))
+    except (TypeError, ValueError):
+        megabytes = default
+    return int(max(megabytes, 0) * 1024 * 1024)
+
+
+def _thumb_cache_budget_setting(settings: dict) -> int:
+    """Thumbnail cache budget in bytes from settings (0 = unlimited)."""
+    return _megabytes_setting(settings, "thumbnailCacheMB", _THUMB_CACHE_MB_DEFAULT)
+
+
+def _thumb_memory_budget_setting(settings: dict) -> int:
+    """In-memory thumbnail cache size in bytes from settings (0 = disabled)."""
+    return _megabytes_setting(settings, "thumbnailMemoryCacheMB", _THUMB_MEMORY_MB_DEFAULT)
+
+
 def _init_file_monitoring():
     """Initialize file monitoring system."""
     global _file_monitor, _background_scanner
@@ -1639,37 +2716,177 @@ def _init_file_monitoring():
         if not os.path.isdir(output_dir):
             return
         
-        # Initialize background scanner
-        def on_scan_complete(images):
-            # This will be called when background scan completes
-            # The frontend will poll for updates, so we don't need to push here
-            pass
+        # Initialize background scanner; it fills (or reconciles) the shared catalog
+        _background_scanner = BackgroundScanner(
+            _on_scan_complete, _current_extensions, rescan_interval=_catalog_rescan_interval,
+            on_partial=_on_scan_partial, start_marker=lambda: _catalog.generation,
+        )
+        
+        # Serve the first /list from the persisted catalog when it has a completed
+        # scan, otherwise from the startup scan's partial results as they arrive
+        with _catalog_load_lock:
+            if _catalog_store is not None and _catalog_store.bind_root(output_dir):
+                _catalog.load(_catalog_store.list_images(), os.path.abspath(output_dir))
+            else:
+                _begin_partial_catalog(os.path.abspath(output_dir))
         
-        _background_scanner = BackgroundScanner(on_scan_complete, _current_extensions)
         _background_scanner.start_scan()
         
         # Initialize file monitor
-        _file_monitor = FileMonitor(output_dir, _on_file_change, _current_extensions)
-        _file_monitor.start(use_polling=False)  # Can be configured via settings
+        settings = _load_settings()
+        _file_event_queue.start()
+        _file_monitor = FileMonitor(
+            output_dir, _file_event_queue.put, _current_extensions,
+            poll_interval=_poll_interval_setting(settings),
+        )
+        _file_monitor.start(use_polling=bool(settings.get("usePollingObserver", False)))
+        
+        # Thumbnail cache cleanup (first pass once the catalog is complete)
+        _thumb_collector.budget_bytes = _thumb_cache_budget_setting(settings)
+        _thumb_collector.start()
+        _thumb_memory.resize(_thumb_memory_budget_setting(settings))
+        _thumbnail_service.use_processes = bool(settings.get("thumbnailWorkerProcesses", False))
+        _metadata_index.start()
         
     except Exception as e:
         print(f"[Usgromana-Gallery] Failed to initialize file monitoring: {e}")
 
 
 @PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/watch")
-async def gallery_watch(request: web.Request) -> web.Response:
+async def gallery_watch(request: web.Request) -> web.StreamResponse:
     """
-    WebSocket-like endpoint for file change notifications.
-    Returns current state and can be polled for updates.
+    File change notifications.
+
+    With Accept: text/event-stream (EventSource) this is a Server-Sent Events
+    stream of coalesced catalog deltas, in the same shape as /list?since=:
+      - event "changes": { generation, epoch, added, modified, removed }
+      - event "reset":   the client must refetch /list
+      - event "sync":    sent on connect; carries the current resume token
+    Each message id is "<epoch>:<generation>". Clients resume with the
+    Last-Event-ID header (sent automatically by EventSource on reconnect) or
+    ?since=<generation>&epoch=<epoch> on the first connect.
+
+    Otherwise returns the monitoring status as JSON.
     """
-    # For now, return a simple endpoint that can be polled
-    # In the future, this could be upgraded to WebSocket
-    return _json({"ok": True, "monitoring": _file_monitor.running if _file_monitor else False})
+    if "text/event-stream" not in request.headers.get("Accept", ""):
+        return _json({
+            "ok": True,
+            "monitoring": _file_monitor.running if _file_monitor else False,
+            "stream": True,
+            "clients": _change_stream.client_count,
+        })
+
+    has_view_all = request_has_permission(request, _GALLERY_VIEW_ALL_PERM)
+    has_base = request_has_permission(request, _GALLERY_BASE_PERM)
+    if not has_view_all and not has_base:
+        return web.Response(status=403, text="Access denied")
+
+    resume = parse_resume_token(request.headers.get("Last-Event-ID"))
+    if resume is None and "since" in request.query:
+        try:
+            resume = (request.query.get("epoch", ""), int(request.query["since"]))
+        except ValueError:
+            resume = None
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # Don't let reverse proxies buffer the stream
+    })
+    await response.prepare(request)
+
+    wake = _change_stream.subscribe()
+    try:
+        await asyncio.to_thread(_ensure_catalog_loaded)
+        if resume is None:
+            generation = _catalog.generation
+            await response.write(format_sse(
+                {"generation": generation, "epoch": _catalog.epoch},
+                event="sync", event_id=format_resume_token(_catalog.epoch, generation),
+            ))
+        else:
+            epoch, generation = resume
+            if epoch and epoch != _catalog.epoch:
+                # Server restarted since the client's token; its view is stale
+                generation = _catalog.generation
+                await response.write(format_sse(
+                    {"ok": True, "reset": True, "generation": generation, "epoch": _catalog.epoch},
+                    event="reset", event_id=format_resume_token(_catalog.epoch, generation),
+                ))
+            else:
+                # Replay whatever the client missed while disconnected
+                wake.set()
+
+        while True:
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=_change_stream.heartbeat_interval)
+            except asyncio.TimeoutError:
+                await response.write(b": keepalive\n\n")
+                continue
+
+            # Let a burst of file events settle so it goes out as one message
+            await asyncio.sleep(_change_stream.coalesce_window)
+            wake.clear()
+
+            if generation == _catalog.generation:
+                continue
+            payload = _changes_payload(request, has_view_all, generation, None)
+            generation = payload["generation"]
+            event_id = format_resume_token(payload["epoch"], generation)
+            if payload["reset"]:
+                await response.write(format_sse(payload, event="reset", event_id=event_id))
+            elif payload["added"] or payload["modified"] or payload["removed"]:
+                await response.write(format_sse(payload, event="changes", event_id=event_id))
+    except ConnectionResetError:
+        pass  # Client went away
+    except Exception as e:
+        print(f"[Usgromana-Gallery] /watch stream error: {e}")
+    finally:
+        _change_stream.unsubscribe(wake)
+    return response
+
+
+@PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/scan-status")
+async def gallery_scan_status(request: web.Request) -> web.Response:
+    """Progress of the background scan and whether /list is still partial."""
+    return _json({
+        "ok": True,
+        "partial": _catalog_partial,
+        "catalog_images": len(_catalog),
+        "generation": _catalog.generation,
+        "scan": _background_scanner.status() if _background_scanner else None,
+    })
+
+
+@PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/metrics")
+async def gallery_metrics(request: web.Request) -> web.Response:
+    """Runtime counters for file monitoring, the catalog and the change stream."""
+    return _json({
+        "ok": True,
+        "file_events": _file_event_queue.stats(),
+        "poller": _file_monitor.poller.stats() if _file_monitor and _file_monitor.poller else None,
+        "catalog": {
+            "images": len(_catalog),
+            "generation": _catalog.generation,
+            "epoch": _catalog.epoch,
+        },
+        "stream": {
+            "clients": _change_stream.client_count,
+        },
+        "thumbnails": _thumbnail_service.stats(),
+        "thumbnail_cache": _thumb_collector.stats(),
+        "thumbnail_memory": _thumb_memory.stats(),
+        "exports": _export_manager.stats(),
+        "ratings_store": _ratings_store.stats(),
+        "metadata_store": _meta_store.stats(),
+        "metadata_index": _metadata_index.stats(),
+    })
 
 
 @PromptServer.instance.routes.post(f"{ROUTE_PREFIX}/settings")
 async def gallery_save_settings(request: web.Request) -> web.Response:
     """Save gallery settings to server."""
+    global _rendition_options
     try:
         body = await request.json()
         settings = body.get("settings", {})
@@ -1731,10 +2948,33 @@ async def gallery_save_settings(request: web.Request) -> web.Response:
                 if _file_monitor:
                     _file_monitor.update_extensions(_current_extensions)
         
+        # Rendition encoding or storage changed: pick it up on the next request
+        if any(key in settings for key in ("renditionFormat", "renditionQuality", "thumbnailStorage")):
+            _rendition_options = None
+        
+        # Cache budget changed (or a new root left the old cache behind): collect now
+        # (the UI posts every setting on each save, so compare values)
+        budget = _thumb_cache_budget_setting(merged)
+        root_changed = existing.get("rootGalleryFolder", "") != merged.get("rootGalleryFolder", "")
+        storage_changed = existing.get("thumbnailStorage", "files") != merged.get("thumbnailStorage", "files")
+        if budget != _thumb_collector.budget_bytes or root_changed or storage_changed:
+            _thumb_collector.budget_bytes = budget
+            _thumb_collector.request()
+        _thumb_memory.resize(_thumb_memory_budget_setting(merged))
+        _thumbnail_service.set_use_processes(bool(merged.get("thumbnailWorkerProcesses", False)))
+        if root_changed:
+            _thumb_memory.clear()
+        
         # Update polling mode if changed
+        if "pollingInterval" in settings and _file_monitor:
+            _file_monitor.update_poll_interval(_poll_interval_setting(settings))
         if "usePollingObserver" in settings and _file_monitor:
             _file_monitor.update_polling(bool(settings["usePollingObserver"]))
         
+        # Root folder or extensions changed: the catalog needs a fresh reconciliation
+        if ("rootGalleryFolder" in settings or "fileExtensions" in settings) and _background_scanner:
+            _background_scanner.start_scan()
+        
         return _json({"ok": True})
     except Exception as e:
         return _json({"ok": False, "error": str(e)}, status=500)
@@ -1758,106 +2998,148 @@ async def gallery_get_settings(request: web.Request) -> web.Response:
 async def gallery_batch_generate_thumbnails(request: web.Request) -> web.Response:
     """
     Pre-generate thumbnails for multiple images in the background.
-    Body: { "filenames": ["path1", "path2", ...] } or empty to generate all.
-    Returns immediately, thumbnails are generated asynchronously.
+    Body: { "filenames": ["path1", "path2", ...], "size": "thumb" } or empty to
+    generate all. size is a rendition tier (thumb / large / preview).
+    Returns immediately after queueing missing/outdated thumbnails at
+    background priority; follow progress via /thumbnails/status.
     """
     try:
         body = await request.json() if request.content_length else {}
         filenames = body.get("filenames", [])
+        spec = _rendition_spec_for(body.get("size") or "thumb")
+        if spec is None:
+            return _json({"ok": False, "error": "Unknown rendition size"}, status=400)
         
         # If no filenames provided, generate for all images
         if not filenames:
-            images = list_output_images(extensions=_current_extensions)
+            images = await asyncio.to_thread(_list_gallery_images)
             filenames = [img.relpath for img in images]
         
-        base_output = get_output_dir()
-        thumbs_dir = os.path.join(base_output, "_thumbs")
-        os.makedirs(thumbs_dir, exist_ok=True)
-        
-        generated = 0
-        skipped = 0
-        errors = []
-        
-        # Generate thumbnails synchronously but in batches to avoid blocking too long
-        # Use asyncio.to_thread for CPU-bound work to avoid blocking the event loop
-        import asyncio
+        base_output = get_gallery_root_dir()
+        pack = _active_thumb_pack()
         
-        def generate_thumb_sync(filename):
-            try:
+        def collect_stale():
+            pairs = []
+            fingerprints = []
+            for filename in filenames:
                 safe_path = _safe_join_output(filename)
                 if not safe_path:
-                    return None
-                
-                # Use same unique naming scheme as main thumbnail endpoint
-                import hashlib
-                if "/" in filename or "\\" in filename:
-                    relpath_hash = hashlib.md5(filename.encode('utf-8')).hexdigest()[:16]
-                    original_ext = os.path.splitext(os.path.basename(filename))[1] or ".png"
-                    thumb_name = f"{relpath_hash}{original_ext}"
-                else:
-                    thumb_name = os.path.basename(filename)
-                thumb_path = os.path.join(thumbs_dir, thumb_name)
-                
-                # Check if regeneration needed
-                needs_regen = (
-                    not os.path.isfile(thumb_path)
-                    or os.path.getmtime(thumb_path) < os.path.getmtime(safe_path)
-                )
-                
-                if needs_regen:
-                    with Image.open(safe_path) as im:
-                        # Use smaller size for faster generation and loading
-                        im.thumbnail((256, 256), Image.Resampling.LANCZOS)
-                        im.save(thumb_path, format="PNG", optimize=True)
-                    return "generated"
-                else:
-                    return "skipped"
-            except Exception as e:
-                return f"error: {str(e)}"
-        
-        # Process in batches of 5 to avoid blocking the event loop too long
-        batch_size = 5
-        for i in range(0, len(filenames), batch_size):
-            batch = filenames[i:i + batch_size]
-            # Run CPU-bound work in thread pool
-            # Use asyncio.to_thread if available (Python 3.9+), otherwise use loop.run_in_executor
-            if hasattr(asyncio, 'to_thread'):
-                results = await asyncio.gather(*[
-                    asyncio.to_thread(generate_thumb_sync, f) for f in batch
-                ], return_exceptions=True)
-            else:
-                # Fallback for Python < 3.9
-                loop = asyncio.get_event_loop()
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor(max_workers=batch_size) as executor:
-                    results = await asyncio.gather(*[
-                        loop.run_in_executor(executor, generate_thumb_sync, f) for f in batch
-                    ], return_exceptions=True)
-            
-            for result in results:
-                if result == "generated":
-                    generated += 1
-                elif result == "skipped":
-                    skipped += 1
-                elif isinstance(result, str) and result.startswith("error:"):
-                    errors.append(result)
-                elif isinstance(result, Exception):
-                    errors.append(str(result))
-            
-            # Small delay between batches to keep system responsive
-            await asyncio.sleep(0.05)
+                    continue
+                try:
+                    fingerprint = source_fingerprint(os.stat(safe_path))
+                except OSError:
+                    continue
+                fingerprints.append((_gallery_relpath(safe_path), fingerprint))
+                thumb_path = rendition_path_for(base_output, fingerprint, spec)
+                if pack is not None and pack.get(rendition_key(thumb_path)[0]) is not None:
+                    continue  # Already packed
+                pairs.append((safe_path, thumb_path, spec))
+            _bound_thumb_index().record_many(fingerprints)
+            return stale_thumbnails(pairs)
+        
+        # Stat-heavy for big galleries, so keep it off the event loop
+        stale = await asyncio.to_thread(collect_stale)
+        queued = _thumbnail_service.enqueue_background(stale)
         
         return _json({
             "ok": True,
-            "generated": generated,
-            "skipped": skipped,
+            "queued": queued,
+            "skipped": len(filenames) - len(stale),
             "total": len(filenames),
-            "errors": errors[:10]  # Limit error list
         })
     except Exception as e:
         return _json({"ok": False, "error": str(e)}, status=500)
 
 
+# Most thumbnails one /thumbnails/batch request may ask for
+_THUMBNAIL_BATCH_LIMIT = 100
+
+
+@PromptServer.instance.routes.post(f"{ROUTE_PREFIX}/thumbnails/batch")
+async def gallery_thumbnail_batch(request: web.Request) -> web.Response:
+    """
+    Many renditions in one round trip (a grid viewport's worth).
+    Body: { "filenames": ["path1", ...], "size": "thumb" } (at most
+    _THUMBNAIL_BATCH_LIMIT filenames). Responds with multipart/form-data in
+    which the part named "<i>" holds the rendition of filenames[i]. Images
+    that are missing, NSFW-blocked or failed to render are left out; clients
+    fall back to /image?size= for those.
+    """
+    try:
+        body = await request.json()
+    except Exception:
+        return _json({"ok": False, "error": "Invalid JSON body"}, status=400)
+    filenames = body.get("filenames")
+    if not isinstance(filenames, list) or not filenames:
+        return _json({"ok": False, "error": "Missing filenames"}, status=400)
+    if len(filenames) > _THUMBNAIL_BATCH_LIMIT:
+        return _json({"ok": False, "error": f"At most {_THUMBNAIL_BATCH_LIMIT} filenames per batch"}, status=400)
+    spec = _rendition_spec_for(body.get("size") or "thumb")
+    if spec is None:
+        return _json({"ok": False, "error": "Unknown rendition size"}, status=400)
+
+    # Path resolution may walk the tree for stale relpaths and the NSFW check
+    # reads image metadata; keep both off the loop
+    blocked = _nsfw_filter(request)
+
+    def allowed_path(name):
+        safe_path = _safe_join_output(name) if isinstance(name, str) and name else None
+        if safe_path is None or blocked(safe_path):
+            return None
+        return safe_path
+
+    paths = await asyncio.to_thread(lambda: [allowed_path(name) for name in filenames])
+
+    async def load(safe_path):
+        if safe_path is None:
+            return None
+        try:
+            return await _rendition_bytes(safe_path, spec)
+        except Exception as e:
+            print(f"[Usgromana-Gallery] Thumbnail error for '{safe_path}': {e}")
+            return None
+
+    results = await asyncio.gather(*(load(path) for path in paths))
+
+    writer = aiohttp.MultipartWriter("form-data")
+    for index, data in enumerate(results):
+        if data is None:
+            continue
+        part = writer.append(data, {"Content-Type": spec.content_type})
+        part.set_content_disposition("form-data", name=str(index), filename=f"{index}{spec.extension}")
+    return web.Response(body=writer, headers={"Cache-Control": "no-store"})
+
+
+@PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/thumbnails/status")
+async def gallery_thumbnail_status(request: web.Request) -> web.Response:
+    """Thumbnail service state: pool mode, queue depth by priority and warm-up progress."""
+    pack = _active_thumb_pack()
+    return _json({
+        "ok": True,
+        **_thumbnail_service.stats(),
+        "indexed": len(_thumb_index),
+        "pack": pack.stats() if pack is not None else None,
+    })
+
+
+@PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/thumbnails/gc")
+async def gallery_thumbnail_gc_status(request: web.Request) -> web.Response:
+    """Thumbnail cache size, budget and what the last cleanup reclaimed."""
+    return _json({"ok": True, **_thumb_collector.stats()})
+
+
+@PromptServer.instance.routes.post(f"{ROUTE_PREFIX}/thumbnails/gc")
+async def gallery_thumbnail_gc(request: web.Request) -> web.Response:
+    """Run a thumbnail cache cleanup now and report the space reclaimed (last_run)."""
+    try:
+        report = await asyncio.to_thread(_thumb_collector.collect)
+        if report is None:
+            return _json({"ok": False, "error": "Image catalog is still loading; try again shortly"}, status=503)
+        return _json({"ok": True, **_thumb_collector.stats()})
+    except Exception as e:
+        return _json({"ok": False, "error": str(e)}, status=500)
+
+
 @PromptServer.instance.routes.get(f"{ROUTE_PREFIX}/list-folder")
 async def gallery_list_folder(request: web.Request) -> web.Response:
     """
@@ -1895,6 +3177,15 @@ async def gallery_list_folder(request: web.Request) -> web.Response:
         if not os.path.isdir(target_dir):
             return _json({"ok": False, "error": "Directory not found"}, status=404)
         
+        # Directory fingerprint: entries added/removed change the directory mtime,
+        # image changes anywhere bump the catalog generation
+        etag = _make_etag(
+            os.path.abspath(target_dir), _file_fingerprint(target_dir),
+            _catalog.generation, sorted(_current_extensions),
+        )
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        
         folders = []
         files = []
         
@@ -1939,17 +3230,18 @@ async def gallery_list_folder(request: web.Request) -> web.Response:
                             "path": rel_path,
                             "size": stat.st_size,
                             "mtime": stat.st_mtime,
+                            "version": image_version(stat.st_size, stat.st_mtime),
                         })
             except (OSError, PermissionError):
                 # Skip entries we can't access
                 continue
         
-        return _json({
+        return _json_etag({
             "ok": True,
             "folders": folders,
             "files": files,
             "path": path,
-        })
+        }, etag)
     except Exception as e:
         return _json({"ok": False, "error": str(e)}, status=500)
 
@@ -2139,6 +3431,8 @@ async def gallery_rename_folder(request: web.Request) -> web.Response:
             return _json({"ok": False, "error": "A folder with that name already exists"}, status=409)
         
         os.rename(old_path, new_path)
+        _catalog_folder_changed(old_path)
+        _thumbs_moved(old_path, new_path, folder=True)
         
         return _json({"ok": True, "message": "Folder renamed successfully"})
     except Exception as e:
@@ -2179,6 +3473,8 @@ async def gallery_delete_folder(request: web.Request) -> web.Response:
         
         import shutil
         shutil.rmtree(target_path)
+        _catalog_folder_changed(target_path)
+        _thumbs_deleted(target_path, folder=True)
         
         return _json({"ok": True, "message": "Folder deleted successfully"})
     except Exception as e:
@@ -2203,23 +3499,10 @@ async def gallery_delete_file(request: web.Request) -> web.Response:
             return _json({"ok": False, "error": "File not found"}, status=404)
         
         os.remove(safe_path)
+        _catalog_remove(safe_path)
         
-        # Also try to delete thumbnail if it exists
-        try:
-            output_dir = get_gallery_root_dir()
-            thumbs_dir = os.path.join(output_dir, "_thumbs")
-            import hashlib
-            if "/" in path or "\\" in path:
-                relpath_hash = hashlib.md5(path.encode('utf-8')).hexdigest()[:16]
-                original_ext = os.path.splitext(os.path.basename(path))[1] or ".png"
-                thumb_name = f"{relpath_hash}{original_ext}"
-            else:
-                thumb_name = os.path.basename(path)
-            thumb_path = os.path.join(thumbs_dir, thumb_name)
-            if os.path.isfile(thumb_path):
-                os.remove(thumb_path)
-        except Exception:
-            pass  # Thumbnail deletion is optional
+        # Also delete its renditions (best effort)
+        _thumbs_deleted(safe_path)
         
         return _json({"ok": True, "message": "File deleted successfully"})
     except Exception as e:
@@ -2274,32 +3557,10 @@ async def gallery_move_file(request: web.Request) -> web.Response:
             return _json({"ok": False, "error": "A file with that name already exists in the target folder"}, status=409)
         
         os.rename(safe_source, target_path)
-        
-        # Also try to move thumbnail if it exists
-        try:
-            thumbs_dir = os.path.join(output_dir, "_thumbs")
-            import hashlib
-            if "/" in file_path or "\\" in file_path:
-                relpath_hash = hashlib.md5(file_path.encode('utf-8')).hexdigest()[:16]
-                original_ext = os.path.splitext(os.path.basename(file_path))[1] or ".png"
-                thumb_name = f"{relpath_hash}{original_ext}"
-            else:
-                thumb_name = os.path.basename(file_path)
-            old_thumb_path = os.path.join(thumbs_dir, thumb_name)
-            
-            # Calculate new relpath for thumbnail
-            new_relpath = os.path.relpath(target_path, output_dir).replace("\\", "/")
-            if "/" in new_relpath or "\\" in new_relpath:
-                new_relpath_hash = hashlib.md5(new_relpath.encode('utf-8')).hexdigest()[:16]
-                new_thumb_name = f"{new_relpath_hash}{original_ext}"
-            else:
-                new_thumb_name = filename
-            new_thumb_path = os.path.join(thumbs_dir, new_thumb_name)
-            
-            if os.path.isfile(old_thumb_path) and not os.path.exists(new_thumb_path):
-                os.rename(old_thumb_path, new_thumb_path)
-        except Exception:
-            pass  # Thumbnail move is optional
+        _catalog_remove(safe_source)
+        _catalog_add(target_path)
+        # Renditions are keyed by fingerprint, which a move keeps; just re-point the index
+        _thumbs_moved(safe_source, target_path)
         
         return _json({"ok": True, "message": "File moved successfully"})
     except Exception as e:
@@ -2369,6 +3630,8 @@ async def gallery_move_folder(request: web.Request) -> web.Response:
             return _json({"ok": False, "error": "A folder with that name already exists in the target location"}, status=409)
         
         os.rename(source_path, target_path)
+        _catalog_folder_changed(source_path)
+        _thumbs_moved(source_path, target_path, folder=True)
         
         return _json({"ok": True, "message": "Folder moved successfully"})
     except Exception as e:
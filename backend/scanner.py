@@ -4,54 +4,161 @@
 import os
 import threading
 import time
-from typing import List, Callable, Optional
-from .files import list_output_images, IMAGE_EXTENSIONS
+from typing import Any, List, Callable, Optional
+from .files import list_output_images, get_gallery_root_dir, IMAGE_EXTENSIONS
 
 
 class BackgroundScanner:
-    """Scans files in a background thread to avoid blocking startup."""
-    
-    def __init__(self, callback: Callable[[List], None], extensions: Optional[set[str]] = None):
+    """
+    Scans files in a background thread to avoid blocking startup.
+
+    If rescan_interval is set, the scan is repeated periodically so consumers
+    (e.g. the persistent catalog) stay reconciled with the disk.
+
+    If on_partial is set, it receives batches of images while a scan is still
+    running (at most every partial_interval seconds or partial_batch images),
+    so consumers can serve partial results instead of waiting for the end.
+
+    If start_marker is set, it is called as each scan starts (before the tree
+    is walked) and its result kept as last_scan_marker, so a consumer can tell
+    which of its records changed while the scan was running.
+    """
+
+    def __init__(self, callback: Callable[[List], None], extensions: Optional[set[str]] = None,
+                 rescan_interval: Optional[float] = None,
+                 on_partial: Optional[Callable[[List], None]] = None,
+                 partial_interval: float = 0.5, partial_batch: int = 2000,
+                 start_marker: Optional[Callable[[], Any]] = None):
         self.callback = callback
         self.extensions = extensions or IMAGE_EXTENSIONS
+        self.rescan_interval = rescan_interval
+        self.on_partial = on_partial
+        self.partial_interval = partial_interval
+        self.partial_batch = partial_batch
+        self.start_marker = start_marker
         self.scanning = False
+        self.last_scan_started: Optional[float] = None
+        self.last_scan_marker: Any = None
+        self.scan_root: Optional[str] = None  # Gallery root the current/last scan covers
+        self.last_scan_finished: Optional[float] = None
+        self.last_scan_duration: Optional[float] = None
+        self.last_scan_count: Optional[int] = None
+        self.last_error: Optional[str] = None
+        self.scan_count = 0
+        self.dirs_scanned = 0
+        self.images_found = 0
         self.thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
-    
+        self._rescan_event = threading.Event()
+        self._partial: List = []
+        self._partial_flushed_at = 0.0
+
     def start_scan(self):
         """Start scanning in background thread."""
-        if self.scanning:
+        if self.thread and self.thread.is_alive():
+            # Worker already running; wake it up for an early rescan
+            self.request_rescan()
             return
-        
+
         self.scanning = True
         self._stop_event.clear()
         self.thread = threading.Thread(target=self._scan_worker, daemon=True)
         self.thread.start()
         print("[Usgromana-Gallery] Background scan started")
-    
+
+    def request_rescan(self):
+        """Ask the running worker to rescan as soon as possible."""
+        self._rescan_event.set()
+
+    @property
+    def busy(self) -> bool:
+        """True while a scan is running or one has been requested."""
+        return self.scanning or self._rescan_event.is_set()
+
+    def _on_dir_scanned(self, images: List):
+        """Progress hook from list_output_images (runs on the scan thread)."""
+        self.dirs_scanned += 1
+        self.images_found += len(images)
+        if self.on_partial is None:
+            return
+        self._partial.extend(images)
+        now = time.monotonic()
+        if len(self._partial) >= self.partial_batch or now - self._partial_flushed_at >= self.partial_interval:
+            self._flush_partial()
+
+    def _flush_partial(self):
+        batch, self._partial = self._partial, []
+        self._partial_flushed_at = time.monotonic()
+        if batch and not self._stop_event.is_set():
+            try:
+                self.on_partial(batch)
+            except Exception as e:
+                print(f"[Usgromana-Gallery] Background scan partial results error: {e}")
+
+    def status(self) -> dict:
+        """Progress of the current scan (or summary of the last one)."""
+        return {
+            "scanning": self.scanning,
+            "root": self.scan_root,
+            "scans_completed": self.scan_count,
+            "started_at": self.last_scan_started,
+            "finished_at": self.last_scan_finished,
+            "dirs_scanned": self.dirs_scanned,
+            "images_found": self.images_found,
+            "last_duration": self.last_scan_duration,
+            "last_count": self.last_scan_count,
+            "last_error": self.last_error,
+        }
+
     def _scan_worker(self):
-        """Worker thread that performs the scan."""
-        try:
-            # Small delay to let ComfyUI finish initializing
-            time.sleep(0.5)
-            
-            if self._stop_event.is_set():
-                return
-            
-            images = list_output_images()
-            
-            if not self._stop_event.is_set():
-                self.callback(images)
-                print(f"[Usgromana-Gallery] Background scan completed: {len(images)} images")
-        except Exception as e:
-            print(f"[Usgromana-Gallery] Background scan error: {e}")
-        finally:
-            self.scanning = False
-    
+        """Worker thread that performs the scan (and periodic rescans)."""
+        # Small delay to let ComfyUI finish initializing
+        time.sleep(0.5)
+
+        while not self._stop_event.is_set():
+            self.scanning = True
+            self.last_scan_started = time.time()
+            self.scan_root = os.path.abspath(get_gallery_root_dir())
+            self.dirs_scanned = 0
+            self.images_found = 0
+            self._partial = []
+            self._partial_flushed_at = time.monotonic()
+            self._rescan_event.clear()
+            try:
+                self.last_scan_marker = self.start_marker() if self.start_marker else None
+                images = list_output_images(extensions=self.extensions, progress=self._on_dir_scanned)
+                self._flush_partial()
+
+                if not self._stop_event.is_set():
+                    self.callback(images)
+                    self.scan_count += 1
+                    self.last_scan_count = len(images)
+                    self.last_scan_duration = time.time() - self.last_scan_started
+                    self.last_error = None
+                    print(f"[Usgromana-Gallery] Background scan completed: {len(images)} images "
+                          f"in {self.last_scan_duration:.2f}s")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[Usgromana-Gallery] Background scan error: {e}")
+            finally:
+                self.scanning = False
+                self.last_scan_finished = time.time()
+
+            if not self.rescan_interval:
+                break
+
+            # Sleep until the next periodic rescan, an explicit request, or stop
+            deadline = time.monotonic() + self.rescan_interval
+            while not self._stop_event.is_set() and not self._rescan_event.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._rescan_event.wait(timeout=min(remaining, 1.0))
+
     def stop(self):
         """Stop the scanner."""
         self._stop_event.set()
+        self._rescan_event.set()
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=1.0)
         self.scanning = False
-
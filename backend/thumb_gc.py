@@ -0,0 +1,253 @@
+# ComfyUI-Usgromana-Gallery/backend/thumb_gc.py
+# Background garbage collection for the _thumbs rendition cache
+
+import os
+import shutil
+import threading
+import time
+from typing import Callable, List, Optional, Set, Tuple
+
+from .thumbnails import THUMBS_DIR_NAME, RENDITION_TIERS
+from .thumb_pack import PACKS_DIR_NAME, ThumbPack
+
+# Retry delay while the live fingerprints aren't available yet
+_NOT_READY_RETRY = 30.0
+
+# Files younger than this are never treated as orphans: their source may have
+# appeared after the live fingerprints were collected, or be mid-render.
+DEFAULT_GRACE_SECONDS = 600.0
+
+
+class ThumbnailCollector:
+    """
+    Keeps <root>/_thumbs from growing without bound.
+
+    Each pass removes orphans (renditions whose fingerprint no live image
+    has, pre-fingerprint thumbnails and abandoned temp files), then, if the
+    cache is still over budget_bytes, evicts least recently used renditions
+    until it is under low_water * budget_bytes. Renditions' mtime records
+    their last access (thumbnails.touch_rendition), so eviction order
+    survives restarts without a separate access log.
+
+    If pack() returns the active ThumbPack, its entries are collected the
+    same way (by their recorded last access) and mostly-dead packs are
+    compacted afterwards; if it returns None, a leftover packs directory
+    from an earlier pack-storage setting is deleted.
+
+    live_fingerprints(root) returns the set of fingerprints in use, or None
+    when that isn't known yet (e.g. the catalog is still being filled); the
+    pass is skipped rather than mistaking everything for an orphan.
+
+    Passes run on a daemon thread every `interval` seconds (retrying sooner
+    while skipped), or right away via request(); collect() can also be
+    called directly (blocking).
+    """
+
+    def __init__(self, live_fingerprints: Callable[[str], Optional[Set[str]]], root: Callable[[], str],
+                 budget_bytes: int = 0, interval: float = 3600.0, low_water: float = 0.9,
+                 grace: float = DEFAULT_GRACE_SECONDS, pack: Optional[Callable[[], Optional[ThumbPack]]] = None):
+        self.live_fingerprints = live_fingerprints
+        self.root = root
+        self.pack = pack
+        self.budget_bytes = budget_bytes  # 0 = no size limit (orphans are still removed)
+        self.interval = interval
+        self.low_water = low_water
+        self.grace = grace
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._request_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.runs = 0
+        self.running = False
+        self.cache_files = 0
+        self.cache_bytes = 0
+        self.reclaimed_bytes = 0  # Total since startup
+        self.last_run: Optional[dict] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._request_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def request(self):
+        """Run a pass as soon as possible (starting the worker if needed)."""
+        self._request_event.set()
+        self.start()
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            self._request_event.clear()
+            delay = self.interval
+            try:
+                if self.collect() is None:
+                    delay = min(self.interval, _NOT_READY_RETRY)
+            except Exception as e:
+                print(f"[Usgromana-Gallery] Thumbnail cache cleanup error: {e}")
+            self._request_event.wait(timeout=delay)
+
+    def _list_cache(self, thumbs_dir: str) -> List[Tuple[str, str, int, float]]:
+        """(path, fingerprint or "" for non-rendition files, size, mtime) for every cache file."""
+        files = []
+        try:
+            top = list(os.scandir(thumbs_dir))
+        except OSError:
+            return files
+        for entry in top:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in RENDITION_TIERS:
+                        continue
+                    with os.scandir(entry.path) as it:
+                        for child in it:
+                            if not child.is_file(follow_symlinks=False):
+                                continue
+                            st = child.stat()
+                            stem, ext = os.path.splitext(child.name)
+                            fingerprint = "" if ext == ".tmp" else stem
+                            files.append((child.path, fingerprint, st.st_size, st.st_mtime))
+                elif entry.is_file(follow_symlinks=False):
+                    # Flat _thumbs/<name> files predate tiered, fingerprint-named renditions
+                    st = entry.stat()
+                    files.append((entry.path, "", st.st_size, st.st_mtime))
+            except OSError:
+                continue
+        return files
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"[Usgromana-Gallery] Warning: Failed to remove cached thumbnail '{path}': {e}")
+            return False
+
+    def _discard(self, items: List[Tuple[int, str, str]], pack: Optional[ThumbPack]) -> Tuple[int, int, int]:
+        """
+        Remove (size, kind, ref) cache items. Returns (count removed, file bytes
+        freed, bytes that could not be removed). Pack entries free their space
+        later, in compact().
+        """
+        removed = freed = failed = 0
+        pack_keys = []
+        for size, kind, ref in items:
+            if kind == "pack":
+                pack_keys.append(ref)
+            elif self._remove(ref):
+                removed += 1
+                freed += size
+            else:
+                failed += size
+        if pack_keys and pack is not None:
+            pack.remove(pack_keys)
+            removed += len(pack_keys)
+        return removed, freed, failed
+
+    def collect(self) -> Optional[dict]:
+        """Run one pass now (blocking). Returns its report, or None if it was skipped."""
+        with self._run_lock:
+            self.running = True
+            try:
+                return self._collect()
+            finally:
+                self.running = False
+
+    def _collect(self) -> Optional[dict]:
+        root = os.path.abspath(self.root())
+        live = self.live_fingerprints(root)
+        if live is None:
+            return None
+
+        started = time.time()
+        cutoff = started - self.grace
+        thumbs_dir = os.path.join(root, THUMBS_DIR_NAME)
+        pack = self.pack() if self.pack is not None else None
+
+        # (last access, size, kind, path or pack key) for everything in the cache
+        items = [(mtime, size, "file", path, fingerprint)
+                 for path, fingerprint, size, mtime in self._list_cache(thumbs_dir)]
+        if pack is not None:
+            items.extend((entry.accessed, entry.length, "pack", key, entry.fingerprint)
+                         for key, entry in pack.entries())
+
+        orphans, kept = [], []
+        for accessed, size, kind, ref, fingerprint in items:
+            if accessed < cutoff and fingerprint not in live:
+                orphans.append((size, kind, ref))
+            else:
+                kept.append((accessed, size, kind, ref))
+
+        total = sum(size for _, size, _, _ in kept)
+        evict = []
+        if self.budget_bytes and total > self.budget_bytes:
+            target = self.budget_bytes * self.low_water
+            kept.sort()  # Least recently accessed first
+            for accessed, size, kind, ref in kept:
+                if total <= target:
+                    break
+                evict.append((size, kind, ref))
+                total -= size
+
+        removed_orphans, reclaimed, _ = self._discard(orphans, pack)
+        evicted, freed, failed = self._discard(evict, pack)
+        reclaimed += freed
+        total += failed
+
+        if pack is not None:
+            # Removed entries only free disk space once their pack is rewritten
+            reclaimed += pack.compact()
+        else:
+            packs_dir = os.path.join(thumbs_dir, PACKS_DIR_NAME)
+            if os.path.isdir(packs_dir):
+                reclaimed += self._dir_size(packs_dir)
+                shutil.rmtree(packs_dir, ignore_errors=True)
+
+        self.runs += 1
+        self.cache_files = len(items) - removed_orphans - evicted
+        self.cache_bytes = total
+        self.reclaimed_bytes += reclaimed
+        self.last_run = {
+            "finished_at": time.time(),
+            "duration": round(time.time() - started, 3),
+            "orphans_removed": removed_orphans,
+            "evicted": evicted,
+            "reclaimed_bytes": reclaimed,
+        }
+        if reclaimed:
+            print(f"[Usgromana-Gallery] Thumbnail cache cleanup: removed {removed_orphans} orphans, "
+                  f"evicted {evicted}, reclaimed {reclaimed / (1024 * 1024):.1f} MiB")
+        return self.last_run
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "budget_bytes": self.budget_bytes,
+            "cache_files": self.cache_files,
+            "cache_bytes": self.cache_bytes,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "last_run": self.last_run,
+        }
@@ -0,0 +1,195 @@
+# ComfyUI-Usgromana-Gallery/backend/thumb_index.py
+# Small persistent index of which source fingerprint each image's renditions use
+
+import os
+import sqlite3
+import threading
+from collections import Counter
+from typing import Iterable, List, Optional, Set, Tuple
+
+
+class ThumbIndex:
+    """
+    SQLite-backed map of image relpath -> source fingerprint.
+
+    Renditions are named after the source's fingerprint (see
+    thumbnails.source_fingerprint), so a moved or renamed image finds its
+    renditions without this index. The index answers the questions a
+    fingerprint can't once the source is gone: which renditions belonged to
+    a deleted file or folder, and whether another path (a hard link) still
+    uses them.
+
+    All rows are mirrored in memory, so lookups and repeated record() calls
+    for an unchanged image never touch the database.
+    """
+
+    SCHEMA_VERSION = "1"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.root: Optional[str] = None
+        self._lock = threading.RLock()
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._by_path: dict[str, str] = {}
+        self._refs: Counter = Counter()
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS thumb_info (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            row = self._conn.execute(
+                "SELECT value FROM thumb_info WHERE key = 'schema_version'"
+            ).fetchone()
+            if row and row[0] != self.SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS thumbs")
+                self._conn.execute("DELETE FROM thumb_info")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS thumbs (
+                    relpath     TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO thumb_info (key, value) VALUES ('schema_version', ?)",
+                (self.SCHEMA_VERSION,),
+            )
+
+    def bind_root(self, root: str):
+        """Use the index for a gallery root, discarding it if it was written for another root."""
+        root = os.path.abspath(root)
+        with self._lock:
+            if self.root == root:
+                return
+            with self._conn:
+                row = self._conn.execute("SELECT value FROM thumb_info WHERE key = 'root'").fetchone()
+                if not row or row[0] != root:
+                    self._conn.execute("DELETE FROM thumbs")
+                    self._conn.execute("INSERT OR REPLACE INTO thumb_info (key, value) VALUES ('root', ?)", (root,))
+            self._by_path = dict(self._conn.execute("SELECT relpath, fingerprint FROM thumbs"))
+            self._refs = Counter(self._by_path.values())
+            self.root = root
+
+    def __len__(self) -> int:
+        return len(self._by_path)
+
+    def fingerprint(self, relpath: str) -> Optional[str]:
+        with self._lock:
+            return self._by_path.get(relpath)
+
+    def fingerprints(self) -> Set[str]:
+        """Every fingerprint some indexed image still uses."""
+        with self._lock:
+            return set(self._refs)
+
+    def _set(self, relpath: str, fingerprint: str) -> bool:
+        previous = self._by_path.get(relpath)
+        if previous == fingerprint:
+            return False
+        if previous is not None:
+            self._release(previous)
+        self._by_path[relpath] = fingerprint
+        self._refs[fingerprint] += 1
+        return True
+
+    def _release(self, fingerprint: str) -> bool:
+        """Drop one reference; True if nothing uses the fingerprint any more."""
+        self._refs[fingerprint] -= 1
+        if self._refs[fingerprint] <= 0:
+            del self._refs[fingerprint]
+            return True
+        return False
+
+    def record(self, relpath: str, fingerprint: str):
+        """Note the fingerprint an image's renditions are currently stored under."""
+        self.record_many([(relpath, fingerprint)])
+
+    def record_many(self, items: Iterable[Tuple[str, str]]):
+        with self._lock:
+            changed = [(relpath, fp) for relpath, fp in items if self._set(relpath, fp)]
+            if changed:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO thumbs (relpath, fingerprint) VALUES (?, ?)", changed
+                    )
+
+    def forget(self, relpath: str) -> List[str]:
+        """
+        Drop an image (deleted). Returns its fingerprint if no other path
+        shares it, i.e. the renditions stored under it can be removed.
+        """
+        with self._lock:
+            fingerprint = self._by_path.pop(relpath, None)
+            if fingerprint is None:
+                return []
+            with self._conn:
+                self._conn.execute("DELETE FROM thumbs WHERE relpath = ?", (relpath,))
+            return [fingerprint] if self._release(fingerprint) else []
+
+    def forget_prefix(self, folder: str) -> List[str]:
+        """Drop every image under a deleted folder; returns fingerprints nothing else uses."""
+        prefix = folder.rstrip("/") + "/"
+        with self._lock:
+            relpaths = [relpath for relpath in self._by_path if relpath.startswith(prefix)]
+            unused = []
+            for relpath in relpaths:
+                fingerprint = self._by_path.pop(relpath)
+                if self._release(fingerprint):
+                    unused.append(fingerprint)
+            with self._conn:
+                self._conn.executemany("DELETE FROM thumbs WHERE relpath = ?", [(r,) for r in relpaths])
+            return unused
+
+    def retain(self, relpaths: Set[str]) -> int:
+        """Drop rows for images that no longer exist (e.g. deleted outside the gallery)."""
+        with self._lock:
+            gone = [relpath for relpath in self._by_path if relpath not in relpaths]
+            for relpath in gone:
+                self._release(self._by_path.pop(relpath))
+            if gone:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM thumbs WHERE relpath = ?", [(r,) for r in gone])
+            return len(gone)
+
+    def move(self, old_relpath: str, new_relpath: str):
+        """An image was moved or renamed; its renditions (same fingerprint) stay valid."""
+        with self._lock:
+            fingerprint = self._by_path.get(old_relpath)
+            if fingerprint is None:
+                return
+            self.forget(old_relpath)
+            self.record(new_relpath, fingerprint)
+
+    def move_prefix(self, old_folder: str, new_folder: str):
+        """A folder was moved or renamed: re-key every image below it."""
+        old_prefix = old_folder.rstrip("/") + "/"
+        new_prefix = new_folder.strip("/") + "/" if new_folder.strip("/") else ""
+        with self._lock:
+            moved = [(relpath, fp) for relpath, fp in self._by_path.items() if relpath.startswith(old_prefix)]
+            renamed = []
+            for relpath, fp in moved:
+                del self._by_path[relpath]
+                self._release(fp)
+            for relpath, fp in moved:
+                new_relpath = new_prefix + relpath[len(old_prefix):]
+                self._set(new_relpath, fp)
+                renamed.append((new_relpath, fp))
+            with self._conn:
+                self._conn.executemany("DELETE FROM thumbs WHERE relpath = ?", [(r,) for r, _ in moved])
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO thumbs (relpath, fingerprint) VALUES (?, ?)", renamed
+                )
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
@@ -0,0 +1,126 @@
+# ComfyUI-Usgromana-Gallery/backend/thumb_memory.py
+# Byte-bounded in-memory LRU of encoded renditions for hot grid thumbnails
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional
+
+DEFAULT_MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+# Entries bigger than this share of the budget are never cached (large previews
+# would otherwise flush hundreds of grid thumbnails)
+MAX_ENTRY_SHARE = 1 / 16
+
+
+class CachedRendition(NamedTuple):
+    data: bytes
+    content_type: str
+    fingerprint: str
+    touched: float  # Last time the hit was passed on to the disk cache's LRU clock
+
+
+class ThumbMemoryCache:
+    """
+    LRU of rendition bytes keyed by their cache path.
+
+    Rendition paths embed the source fingerprint (inode, size and mtime), so a
+    key is only ever looked up for an unchanged source: a rewritten image
+    resolves to a new path and misses. Hits are served without touching the
+    disk cache at all.
+
+    Entries are evicted least recently used first once max_bytes is exceeded;
+    max_bytes = 0 disables the cache.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedRendition]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cacheable(self, size: int) -> bool:
+        return 0 < size <= self.max_bytes * MAX_ENTRY_SHARE
+
+    def get(self, key: str) -> Optional[CachedRendition]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def mark_touched(self, key: str):
+        """The hit was recorded in the disk cache's LRU clock (see thumbnails.touch_rendition)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = entry._replace(touched=time.time())
+
+    def load(self, key: str, path: str, content_type: str, fingerprint: str) -> Optional[bytes]:
+        """Read a rendition file into the cache (blocking). None if it is too big to cache."""
+        try:
+            with open(path, "rb") as f:
+                if not self.cacheable(os.fstat(f.fileno()).st_size):
+                    return None
+                data = f.read()
+        except OSError:
+            return None
+        self.put(key, data, content_type, fingerprint)
+        return data
+
+    def put(self, key: str, data: bytes, content_type: str, fingerprint: str):
+        if not self.cacheable(len(data)):
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous.data)
+            self._entries[key] = CachedRendition(data, content_type, fingerprint, time.time())
+            self.bytes += len(data)
+            self._shrink()
+
+    def _shrink(self):
+        while self.bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.bytes -= len(entry.data)
+            self.evictions += 1
+
+    def resize(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._shrink()
+
+    def discard_fingerprints(self, fingerprints: Iterable[str]):
+        """Drop every tier/format of sources that were deleted."""
+        wanted = set(fingerprints)
+        if not wanted:
+            return
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.fingerprint in wanted]:
+                self.bytes -= len(self._entries.pop(key).data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,371 @@
+# ComfyUI-Usgromana-Gallery/backend/thumb_pack.py
+# Optional pack-file rendition store: append-only data files plus an offset index
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from aiohttp import web
+
+PACKS_DIR_NAME = "packs"
+DEFAULT_MAX_PACK_BYTES = 256 * 1024 * 1024
+# Packs whose dead (deleted/evicted) share exceeds this are rewritten by compact()
+DEFAULT_COMPACT_RATIO = 0.5
+# Last access is persisted at most this often per entry (matches thumbnails.ACCESS_RESOLUTION)
+_ACCESS_RESOLUTION = 3600.0
+
+
+class PackEntryUnavailable(OSError):
+    """The pack file is gone or shorter than the index says (e.g. after a crash)."""
+
+
+class PackEntry(NamedTuple):
+    pack: int
+    offset: int
+    length: int
+    content_type: str
+    fingerprint: str
+    accessed: float
+
+
+def _pack_name(number: int) -> str:
+    return f"pack-{number:05d}.dat"
+
+
+def rendition_key(thumb_path: str) -> Tuple[str, str]:
+    """(pack key, fingerprint) for a rendition path <root>/_thumbs/<tier>/<fingerprint><ext>."""
+    name = os.path.basename(thumb_path)
+    tier = os.path.basename(os.path.dirname(thumb_path))
+    return f"{tier}/{name}", os.path.splitext(name)[0]
+
+
+class ThumbPack:
+    """
+    Stores renditions as byte ranges of a few large append-only pack files
+    instead of one small file each, so the cache directory stays tiny to
+    list and back up, and a lookup is a dict hit instead of a path walk.
+
+    Keys are the rendition's path under _thumbs ("thumb/<fingerprint>.webp").
+    The offset index lives in SQLite next to the packs and is mirrored in
+    memory; get() reads the mirror without locking so the event loop never
+    waits on a writer. A new pack is started once the current one reaches
+    max_pack_bytes. Removed entries leave dead bytes behind until compact()
+    copies a pack's live entries forward and deletes it.
+
+    Appends are flushed but not fsynced: after a crash an index row may point
+    at bytes that never reached the disk. Renditions are a cache, so callers
+    treat an unreadable entry as missing.
+    """
+
+    SCHEMA_VERSION = "1"
+
+    def __init__(self, directory: str, max_pack_bytes: int = DEFAULT_MAX_PACK_BYTES):
+        self.directory = directory
+        self.max_pack_bytes = max_pack_bytes
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+        self._entries: dict[str, PackEntry] = {
+            key: PackEntry(*row)
+            for key, *row in self._conn.execute(
+                "SELECT key, pack, offset, length, content_type, fingerprint, accessed FROM entries"
+            )
+        }
+        existing = [int(name[5:10]) for name in os.listdir(directory)
+                    if name.startswith("pack-") and name.endswith(".dat") and name[5:10].isdigit()]
+        self._current = max(existing, default=1)
+        self._writer = None
+        self.appended = 0
+        self.compacted_packs = 0
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS pack_info (key TEXT PRIMARY KEY, value TEXT)")
+            row = self._conn.execute("SELECT value FROM pack_info WHERE key = 'schema_version'").fetchone()
+            if row and row[0] != self.SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS entries")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key          TEXT PRIMARY KEY,
+                    pack         INTEGER NOT NULL,
+                    offset       INTEGER NOT NULL,
+                    length       INTEGER NOT NULL,
+                    content_type TEXT NOT NULL,
+                    fingerprint  TEXT NOT NULL,
+                    accessed     REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_fingerprint ON entries (fingerprint)")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pack_info (key, value) VALUES ('schema_version', ?)", (self.SCHEMA_VERSION,)
+            )
+
+    def pack_path(self, number: int) -> str:
+        return os.path.join(self.directory, _pack_name(number))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[PackEntry]:
+        return self._entries.get(key)
+
+    def touch(self, key: str):
+        """Record an access for LRU eviction (persisted at most once per _ACCESS_RESOLUTION)."""
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is None or now - entry.accessed <= _ACCESS_RESOLUTION:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            self._entries[key] = entry._replace(accessed=now)
+            with self._conn:
+                self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+
+    def _roll_over(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._current += 1
+
+    def _append(self, data: bytes) -> Tuple[int, int]:
+        """Append to the current pack (rolling over when full). Caller holds the lock."""
+        if self._writer is None:
+            self._writer = open(self.pack_path(self._current), "ab")
+        # Appends land at the real end of file even if it was truncated behind our back
+        offset = os.fstat(self._writer.fileno()).st_size
+        if offset >= self.max_pack_bytes:
+            self._roll_over()
+            return self._append(data)
+        self._writer.write(data)
+        self._writer.flush()
+        return self._current, offset
+
+    def add(self, key: str, data: bytes, content_type: str, fingerprint: str) -> PackEntry:
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                return existing
+            pack, offset = self._append(data)
+            entry = PackEntry(pack, offset, len(data), content_type, fingerprint, time.time())
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, pack, offset, length, content_type, fingerprint, accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, *entry),
+                )
+            self._entries[key] = entry
+            self.appended += 1
+            return entry
+
+    def add_file(self, key: str, path: str, content_type: str, fingerprint: str) -> Optional[PackEntry]:
+        """
+        Move a freshly rendered rendition file into the pack (blocking).
+        Safe to call repeatedly: a key that is already packed is returned as is.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                except FileNotFoundError:
+                    return None
+                entry = self.add(key, data, content_type, fingerprint)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return entry
+
+    def remove(self, keys: Iterable[str]) -> int:
+        """Forget entries; their bytes stay in the pack until compact(). Returns bytes released."""
+        with self._lock:
+            released = 0
+            removed = []
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    released += entry.length
+                    removed.append((key,))
+            if removed:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM entries WHERE key = ?", removed)
+            return released
+
+    def remove_fingerprints(self, fingerprints: Iterable[str]) -> int:
+        """Forget every tier/format of the given sources (e.g. after they were deleted)."""
+        wanted = set(fingerprints)
+        if not wanted:
+            return 0
+        return self.remove([key for key, entry in list(self._entries.items()) if entry.fingerprint in wanted])
+
+    def read(self, entry: PackEntry) -> bytes:
+        """An entry's bytes (blocking); PackEntryUnavailable if they are gone."""
+        try:
+            data = _read_range(self.pack_path(entry.pack), entry.offset, entry.length)
+        except FileNotFoundError as e:
+            raise PackEntryUnavailable(str(e)) from e
+        if len(data) != entry.length:
+            raise PackEntryUnavailable(f"{self.pack_path(entry.pack)} is shorter than its index entry")
+        return data
+
+    def entries(self) -> List[Tuple[str, PackEntry]]:
+        return list(self._entries.items())
+
+    def _pack_usage(self) -> dict[int, int]:
+        """Live bytes per pack."""
+        usage: dict[int, int] = {}
+        for entry in self._entries.values():
+            usage[entry.pack] = usage.get(entry.pack, 0) + entry.length
+        return usage
+
+    def compact(self, min_dead_ratio: float = DEFAULT_COMPACT_RATIO) -> int:
+        """
+        Rewrite packs that are mostly dead (blocking). Live entries are copied
+        to a newer pack and the old file is deleted. Returns bytes freed.
+        """
+        freed = 0
+        with self._lock:
+            usage = self._pack_usage()
+            candidates = []
+            for name in os.listdir(self.directory):
+                if not (name.startswith("pack-") and name.endswith(".dat") and name[5:10].isdigit()):
+                    continue
+                number = int(name[5:10])
+                size = os.path.getsize(self.pack_path(number))
+                if size and (size - usage.get(number, 0)) / size >= min_dead_ratio:
+                    candidates.append((number, size))
+            if any(number == self._current for number, _ in candidates):
+                self._roll_over()  # Never copy a pack into itself
+
+            for number, size in candidates:
+                live = sorted(
+                    ((key, entry) for key, entry in self._entries.items() if entry.pack == number),
+                    key=lambda item: item[1].offset,
+                )
+                with open(self.pack_path(number), "rb") as src:
+                    moved = []
+                    for key, entry in live:
+                        src.seek(entry.offset)
+                        data = src.read(entry.length)
+                        if len(data) != entry.length:
+                            continue  # Truncated (e.g. lost in a crash); drop it
+                        pack, offset = self._append(data)
+                        moved.append((key, entry._replace(pack=pack, offset=offset)))
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE entries SET pack = ?, offset = ? WHERE key = ?",
+                        [(entry.pack, entry.offset, key) for key, entry in moved],
+                    )
+                    kept = {key for key, _ in moved}
+                    dropped = [(key,) for key, _ in live if key not in kept]
+                    self._conn.executemany("DELETE FROM entries WHERE key = ?", dropped)
+                for key, entry in moved:
+                    self._entries[key] = entry
+                for (key,) in dropped:
+                    self._entries.pop(key, None)
+                os.remove(self.pack_path(number))
+                freed += size - sum(entry.length for _, entry in moved)
+                self.compacted_packs += 1
+        return freed
+
+    def stats(self) -> dict:
+        usage = self._pack_usage()
+        total = 0
+        packs = 0
+        for name in os.listdir(self.directory):
+            if name.startswith("pack-") and name.endswith(".dat"):
+                packs += 1
+                try:
+                    total += os.path.getsize(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        live = sum(usage.values())
+        return {
+            "entries": len(self._entries),
+            "packs": packs,
+            "bytes": total,
+            "live_bytes": live,
+            "dead_bytes": max(total - live, 0),
+            "appended": self.appended,
+            "compacted_packs": self.compacted_packs,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+
+def _read_range(path: str, offset: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        if hasattr(os, "pread"):
+            return os.pread(f.fileno(), length, offset)
+        f.seek(offset)
+        return f.read(length)
+
+
+class PackSliceResponse(web.StreamResponse):
+    """
+    Serves one entry of a pack file: the byte range is handed to
+    loop.sendfile (zero-copy on Linux/macOS), falling back to a pread when
+    the transport can't sendfile (e.g. TLS without kernel support).
+
+    prepare() raises PackEntryUnavailable before any headers are sent if the
+    range can't be served, so handlers that prepare it themselves can fall
+    back to rendering the file again.
+    """
+
+    def __init__(self, path: str, entry: PackEntry, headers=None):
+        super().__init__(headers=headers)
+        self._path = path
+        self._entry = entry
+        self.content_type = entry.content_type
+        self.content_length = entry.length
+
+    async def prepare(self, request: web.BaseRequest):
+        if self.prepared:
+            return await super().prepare(request)
+        loop = asyncio.get_running_loop()
+        try:
+            fobj = await loop.run_in_executor(None, open, self._path, "rb")
+        except FileNotFoundError as e:
+            raise PackEntryUnavailable(str(e)) from e
+        try:
+            if os.fstat(fobj.fileno()).st_size < self._entry.offset + self._entry.length:
+                raise PackEntryUnavailable(f"{self._path} is shorter than its index entry")
+            writer = await super().prepare(request)
+            if request.method == "HEAD" or not self._entry.length:
+                return writer
+            transport = request.transport
+            if transport is None:
+                raise ConnectionResetError("Connection lost")
+            # The headers must be on the wire before sendfile writes past the writer
+            await writer.drain()
+            try:
+                await loop.sendfile(transport, fobj, self._entry.offset, self._entry.length)
+            except NotImplementedError:
+                data = await loop.run_in_executor(
+                    None, _read_range, self._path, self._entry.offset, self._entry.length
+                )
+                await writer.write(data)
+                await writer.drain()
+            await super().write_eof()
+            return writer
+        finally:
+            await loop.run_in_executor(None, fobj.close)
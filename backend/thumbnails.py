@@ -0,0 +1,482 @@
+# ComfyUI-Usgromana-Gallery/backend/thumbnails.py
+# Rendition (thumb / large / preview) naming, rendering and the prioritised render service
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+THUMBS_DIR_NAME = "_thumbs"
+THUMB_SIZE = 256
+
+# Rendition tiers served by /image?size=<tier>: longest side in pixels.
+# "large" matches the grid's lg thumbSize / high-DPI screens; "preview" is
+# what the details view shows instead of the (possibly huge) original.
+RENDITION_TIERS = {
+    "thumb": THUMB_SIZE,
+    "large": 512,
+    "preview": 1600,
+}
+
+# format -> (file extension, PIL format, content type)
+RENDITION_FORMATS = {
+    "webp": (".webp", "WEBP", "image/webp"),
+    "jpeg": (".jpg", "JPEG", "image/jpeg"),
+}
+DEFAULT_RENDITION_FORMAT = "webp"
+DEFAULT_RENDITION_QUALITY = 80
+
+# Decode at no less than REDUCING_GAP x the target size before the final
+# LANCZOS pass (JPEG DCT scaling / integer reduce), which keeps quality
+# indistinguishable from a full decode.
+REDUCING_GAP = 3.0
+
+# Per-job memory bound: sources whose (reduced) decode would need more than
+# this many bytes of pixel data are refused rather than taking down a worker.
+DEFAULT_MAX_DECODE_BYTES = 512 * 1024 * 1024
+
+
+class RenditionTooLarge(ValueError):
+    """The source image would exceed the per-job decode memory bound."""
+
+
+class RenditionSpec(NamedTuple):
+    tier: str
+    size: int
+    fmt: str
+    quality: int
+
+    @property
+    def extension(self) -> str:
+        return RENDITION_FORMATS[self.fmt][0]
+
+    @property
+    def content_type(self) -> str:
+        return RENDITION_FORMATS[self.fmt][2]
+
+# ThumbnailService priorities (lower runs first)
+PRIORITY_VISIBLE = 0      # Requested by the grid right now
+PRIORITY_BACKGROUND = 10  # Warm-up via /batch/generate-thumbnails
+
+
+def source_fingerprint(st: os.stat_result) -> str:
+    """
+    Cache key for a source image: inode, size and mtime_ns.
+
+    Renaming or moving a file within the filesystem keeps all three, so its
+    renditions are found again without re-rendering, while any rewrite
+    changes the key (a stale rendition is never served). Filesystems without
+    inode numbers report 0 and fall back to size + mtime alone.
+    """
+    key = f"{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.blake2b(key.encode("ascii"), digest_size=10).hexdigest()
+
+
+def rendition_spec(tier: str, fmt: Optional[str] = None, quality: Optional[int] = None) -> Optional[RenditionSpec]:
+    """Spec for a tier name, or None if the tier is unknown."""
+    size = RENDITION_TIERS.get(tier)
+    if size is None:
+        return None
+    if fmt not in RENDITION_FORMATS:
+        fmt = DEFAULT_RENDITION_FORMAT
+    try:
+        quality = min(max(int(quality), 1), 100)
+    except (TypeError, ValueError):
+        quality = DEFAULT_RENDITION_QUALITY
+    return RenditionSpec(tier, size, fmt, quality)
+
+
+def rendition_path_for(root: str, fingerprint: str, spec: RenditionSpec) -> str:
+    """Cached rendition location: <root>/_thumbs/<tier>/<fingerprint><ext>."""
+    return os.path.join(root, THUMBS_DIR_NAME, spec.tier, fingerprint + spec.extension)
+
+
+def rendition_paths(root: str, fingerprint: str) -> List[str]:
+    """Every rendition that may be cached under a fingerprint (all tiers and formats)."""
+    return [
+        os.path.join(root, THUMBS_DIR_NAME, tier, fingerprint + ext)
+        for tier in RENDITION_TIERS
+        for ext, _, _ in RENDITION_FORMATS.values()
+    ]
+
+
+def legacy_thumb_paths(root: str, relpath: str) -> List[str]:
+    """
+    Thumbnails written before fingerprint naming: _thumbs/<basename> for
+    root-level images, _thumbs/<md5(relpath)[:16]><ext> otherwise (root-level
+    images were sometimes hashed too), plus tiered files using the hash stem.
+    """
+    relpath_hash = hashlib.md5(relpath.encode("utf-8")).hexdigest()[:16]
+    original_ext = os.path.splitext(os.path.basename(relpath))[1] or ".png"
+    thumbs_dir = os.path.join(root, THUMBS_DIR_NAME)
+    paths = [os.path.join(thumbs_dir, relpath_hash + original_ext)]
+    if "/" not in relpath and "\\" not in relpath:
+        paths.append(os.path.join(thumbs_dir, os.path.basename(relpath)))
+    for tier in RENDITION_TIERS:
+        for ext, _, _ in RENDITION_FORMATS.values():
+            paths.append(os.path.join(thumbs_dir, tier, relpath_hash + ext))
+    return paths
+
+
+def remove_files(paths: Iterable[str]) -> List[str]:
+    """Delete cached renditions, ignoring ones that don't exist. Returns the removed paths."""
+    removed = []
+    for path in paths:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[Usgromana-Gallery] Warning: Failed to delete rendition '{path}': {e}")
+    return removed
+
+
+def rendition_exists(thumb_path: str) -> bool:
+    """Renditions are keyed by their source's fingerprint, so existing means current."""
+    return os.path.isfile(thumb_path)
+
+
+# A rendition's mtime is its last access (for LRU eviction); refreshed at most this often
+ACCESS_RESOLUTION = 3600.0
+
+
+def touch_rendition(thumb_path: str):
+    """Record a cache hit by bumping the rendition's mtime (throttled to ACCESS_RESOLUTION)."""
+    now = time.time()
+    try:
+        if now - os.stat(thumb_path).st_mtime > ACCESS_RESOLUTION:
+            os.utime(thumb_path, (now, now))
+    except OSError:
+        pass
+
+
+def _prepare_for_format(im: Image.Image, fmt: str) -> Image.Image:
+    """Convert to a mode the target encoder accepts (JPEG has no alpha)."""
+    has_alpha = im.mode in ("RGBA", "LA", "PA") or (im.mode == "P" and "transparency" in im.info)
+    if fmt == "jpeg":
+        if has_alpha:
+            rgba = im.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            return background
+        return im if im.mode == "RGB" else im.convert("RGB")
+    if has_alpha:
+        return im if im.mode == "RGBA" else im.convert("RGBA")
+    return im if im.mode == "RGB" else im.convert("RGB")
+
+
+def decoded_bytes(im: Image.Image) -> int:
+    """Pixel memory needed to load im at its current (possibly drafted) size."""
+    width, height = im.size
+    return width * height * max(len(im.getbands()), 1)
+
+
+def open_reduced(source_path: str, size: int,
+                 max_decode_bytes: Optional[int] = DEFAULT_MAX_DECODE_BYTES) -> Image.Image:
+    """
+    Open an image and configure the decoder for a box of size x size.
+
+    Nothing is decoded yet. JPEGs are switched to DCT-scaled decoding
+    (Image.draft: 1/2, 1/4 or 1/8 scale), so an 8K photo is decoded at
+    roughly 1K. Other formats decode at full size and are shrunk with
+    Image.reduce before resampling (see thumbnail's reducing_gap). Raises
+    RenditionTooLarge if the decode would exceed max_decode_bytes.
+    """
+    im = Image.open(source_path)
+    try:
+        # Ask for the aspect-fitted size: a square box would keep the short
+        # side of wide images needlessly large
+        scale = size * REDUCING_GAP / max(im.size)
+        if scale < 1:
+            im.draft(None, (max(int(im.size[0] * scale), 1), max(int(im.size[1] * scale), 1)))
+        if max_decode_bytes and decoded_bytes(im) > max_decode_bytes:
+            raise RenditionTooLarge(
+                f"{im.size[0]}x{im.size[1]} {im.mode} needs {decoded_bytes(im) // (1024 * 1024)} MiB to decode"
+            )
+    except Exception:
+        im.close()
+        raise
+    return im
+
+
+def render_rendition(source_path: str, dest_path: str, spec: RenditionSpec,
+                     max_decode_bytes: Optional[int] = DEFAULT_MAX_DECODE_BYTES):
+    """
+    Render a rendition to dest_path (blocking; run it off the event loop).
+    Written to a temp file and renamed into place so readers never see a
+    half-written file.
+
+    The source is decoded reduced (open_reduced) and shrunk before EXIF
+    rotation and mode conversion, so only the small image is ever copied.
+    """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    _, pil_format, _ = RENDITION_FORMATS[spec.fmt]
+    try:
+        with open_reduced(source_path, spec.size, max_decode_bytes) as im:
+            # The bounding box is square, so shrinking before rotating gives the same result
+            im.thumbnail((spec.size, spec.size), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+            im = ImageOps.exif_transpose(im)
+            im = _prepare_for_format(im, spec.fmt)
+            if spec.fmt == "jpeg":
+                im.save(tmp_path, format=pil_format, quality=spec.quality, progressive=spec.size > THUMB_SIZE)
+            else:
+                im.save(tmp_path, format=pil_format, quality=spec.quality, method=4)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def _ping() -> int:
+    """Warm-up task used to check that worker processes can run our code."""
+    return os.getpid()
+
+
+class _ThumbJob:
+    __slots__ = ("source_path", "thumb_path", "spec", "priority", "background", "future", "state", "executor")
+
+    def __init__(self, source_path: str, thumb_path: str, spec: RenditionSpec, priority: int,
+                 future: asyncio.Future):
+        self.source_path = source_path
+        self.thumb_path = thumb_path
+        self.spec = spec
+        self.priority = priority
+        self.background = priority >= PRIORITY_BACKGROUND  # Counted in warm-up progress
+        self.future = future
+        self.state = "queued"  # -> "running"
+        self.executor = None  # Pool the job was handed to
+
+
+class ThumbnailService:
+    """
+    Renders thumbnails in a worker pool, most urgent first.
+
+    Jobs wait in a priority heap and are handed to the pool only as workers
+    free up, so a thumbnail the grid is showing (PRIORITY_VISIBLE) overtakes
+    queued background warm-up (PRIORITY_BACKGROUND) instead of waiting
+    behind it. Jobs are single-flight per thumbnail path: later requests for
+    a queued or running thumbnail await the same future, and a visible
+    request promotes a queued background job.
+
+    Uses a thread pool by default. With use_processes it uses a
+    ProcessPoolExecutor instead, always with the "spawn" start method so
+    workers never fork the running ComfyUI server (its CUDA context, model
+    memory and threads); if the spawned workers can't import this module
+    (ComfyUI's custom node loader) the warm-up ping fails and it falls back
+    to threads. Must be used from the event loop thread.
+
+    Each job decodes at most max_decode_bytes of pixel data (see
+    open_reduced), so peak memory is bounded by roughly
+    max_workers * max_decode_bytes.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, use_processes: bool = False,
+                 ping_timeout: float = 15.0, max_decode_bytes: Optional[int] = DEFAULT_MAX_DECODE_BYTES):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.use_processes = use_processes
+        self.ping_timeout = ping_timeout
+        self.max_decode_bytes = max_decode_bytes
+        # Called as on_warmed(thumb_path, spec) on the loop thread after each successful
+        # background render (visible renders are handled by whoever awaited ensure())
+        self.on_warmed: Optional[Callable[[str, RenditionSpec], None]] = None
+        self.mode: Optional[str] = None  # "process" or "thread" once started
+        self._executor = None
+        self._starting: Optional[asyncio.Future] = None
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._jobs: dict[str, _ThumbJob] = {}
+        self._running = 0
+        self.rendered = 0
+        self.deduplicated = 0
+        self.promoted = 0
+        self.failed = 0
+        self.too_large = 0
+        self.background_total = 0
+        self.background_done = 0
+
+    async def _start(self):
+        while True:
+            use_processes = self.use_processes
+            executor = await self._create_pool(use_processes)
+            if self.use_processes == use_processes:
+                break
+            # Setting changed while the pool was starting; start the other kind
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = executor
+        print(f"[Usgromana-Gallery] Thumbnail service started ({self.mode} pool, {self.max_workers} workers)")
+        self._pump()
+
+    async def _create_pool(self, use_processes: bool):
+        loop = asyncio.get_running_loop()
+        executor = None
+        if use_processes:
+            pool = None
+            try:
+                pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                           mp_context=multiprocessing.get_context("spawn"))
+                await asyncio.wait_for(loop.run_in_executor(pool, _ping), timeout=self.ping_timeout)
+                executor, self.mode = pool, "process"
+            except Exception as e:
+                print(f"[Usgromana-Gallery] Thumbnail worker processes unavailable, using threads: {e!r}")
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="usg-thumb")
+            self.mode = "thread"
+        return executor
+
+    def set_use_processes(self, enabled: bool):
+        """
+        Switch between the process and thread pool. A running pool is retired
+        (its in-flight renders finish) and the new one starts on the next job.
+        Only jobs on the current pool count against max_workers, so for a
+        moment retired renders may run alongside a full new pool.
+        """
+        enabled = bool(enabled)
+        if enabled == self.use_processes:
+            return
+        self.use_processes = enabled
+        if self._executor is None:
+            return  # Not started, or _start() re-checks the flag once its pool is up
+        old, self._executor, self._starting = self._executor, None, None
+        self._running = 0
+        old.shutdown(wait=False)
+        if self._heap:
+            self._starting = asyncio.ensure_future(self._start())
+
+    def _submit(self, source_path: str, thumb_path: str, spec: RenditionSpec, priority: int) -> _ThumbJob:
+        """Get the job for thumb_path, queueing a new one (or promoting a queued one)."""
+        job = self._jobs.get(thumb_path)
+        if job is not None:
+            self.deduplicated += 1
+            if priority < job.priority and job.state == "queued":
+                if job.priority == PRIORITY_BACKGROUND:
+                    self.promoted += 1
+                job.priority = priority
+                heapq.heappush(self._heap, (priority, next(self._seq), job))
+                self._pump()
+            return job
+
+        loop = asyncio.get_running_loop()
+        job = _ThumbJob(source_path, thumb_path, spec, priority, loop.create_future())
+        self._jobs[thumb_path] = job
+        heapq.heappush(self._heap, (priority, next(self._seq), job))
+        if self._executor is None:
+            if self._starting is None:
+                self._starting = asyncio.ensure_future(self._start())
+        else:
+            self._pump()
+        return job
+
+    def _pump(self):
+        """Hand queued jobs to the pool while workers are free, most urgent first."""
+        if self._executor is None:
+            return  # Still starting; _start() pumps when the pool is ready
+        loop = asyncio.get_running_loop()
+        while self._heap and self._running < self.max_workers:
+            priority, _, job = heapq.heappop(self._heap)
+            if job.state != "queued" or priority != job.priority:
+                continue  # Stale entry left behind by a promotion
+            job.state = "running"
+            job.executor = self._executor
+            self._running += 1
+            work = loop.run_in_executor(self._executor, render_rendition, job.source_path, job.thumb_path,
+                                        job.spec, self.max_decode_bytes)
+            work.add_done_callback(lambda f, job=job: self._finished(job, f))
+
+    def _finished(self, job: _ThumbJob, work: asyncio.Future):
+        if job.executor is self._executor:
+            self._running -= 1  # Jobs on a retired pool no longer count
+        self._jobs.pop(job.thumb_path, None)
+        if job.background:
+            self.background_done += 1
+        if work.cancelled():
+            self.failed += 1
+            job.future.cancel()
+        elif work.exception() is not None:
+            self.failed += 1
+            if isinstance(work.exception(), RenditionTooLarge):
+                self.too_large += 1
+            job.future.set_exception(work.exception())
+            job.future.exception()  # Background jobs have no waiter; don't log "never retrieved"
+        else:
+            self.rendered += 1
+            job.future.set_result(True)
+            if job.background and self.on_warmed is not None:
+                try:
+                    self.on_warmed(job.thumb_path, job.spec)
+                except Exception as e:
+                    print(f"[Usgromana-Gallery] Rendition hook error: {e}")
+        self._pump()
+
+    async def ensure(self, source_path: str, thumb_path: str, spec: RenditionSpec,
+                     priority: int = PRIORITY_VISIBLE) -> bool:
+        """
+        Make sure thumb_path holds a current rendition of source_path.
+        Returns True if it had to be rendered (by this or a concurrent call).
+        """
+        if thumb_path not in self._jobs and rendition_exists(thumb_path):
+            return False
+        job = self._submit(source_path, thumb_path, spec, priority)
+        # Shield so one cancelled request (client went away) doesn't cancel the
+        # render other requests are waiting on
+        await asyncio.shield(job.future)
+        return True
+
+    def enqueue_background(self, items: Iterable[Tuple[str, str, RenditionSpec]]) -> int:
+        """
+        Queue (source_path, thumb_path, spec) items for background warm-up without
+        waiting. Callers should pass only stale thumbnails (see stale_thumbnails).
+        Returns the number of newly queued jobs.
+        """
+        if not any(job.background for job in self._jobs.values()):
+            # Previous warm-up finished; start progress from scratch
+            self.background_total = self.background_done = 0
+        queued = 0
+        for source_path, thumb_path, spec in items:
+            if thumb_path in self._jobs:
+                continue
+            self._submit(source_path, thumb_path, spec, PRIORITY_BACKGROUND)
+            queued += 1
+        self.background_total += queued
+        return queued
+
+    def stats(self) -> dict:
+        queued_visible = sum(1 for job in self._jobs.values()
+                             if job.state == "queued" and job.priority < PRIORITY_BACKGROUND)
+        queued_background = sum(1 for job in self._jobs.values()
+                                if job.state == "queued" and job.priority >= PRIORITY_BACKGROUND)
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "running": self._running,
+            "queued_visible": queued_visible,
+            "queued_background": queued_background,
+            "rendered": self.rendered,
+            "deduplicated": self.deduplicated,
+            "promoted": self.promoted,
+            "failed": self.failed,
+            "too_large": self.too_large,
+            "max_decode_bytes": self.max_decode_bytes,
+            "background": {
+                "total": self.background_total,
+                "done": self.background_done,
+            },
+        }
+
+
+def stale_thumbnails(items: Iterable[Tuple[str, str, RenditionSpec]]) -> List[Tuple[str, str, RenditionSpec]]:
+    """Filter (source_path, thumb_path, spec) items down to renditions not yet rendered (blocking)."""
+    return [item for item in items if not rendition_exists(item[1])]
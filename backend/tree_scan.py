@@ -0,0 +1,105 @@
+# ComfyUI-Usgromana-Gallery/backend/tree_scan.py
+# Parallel os.scandir directory tree scanner (no ComfyUI dependencies)
+
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+DEFAULT_SCAN_WORKERS = 8
+
+
+class ScanEntry(NamedTuple):
+    relpath: str  # Forward-slash path relative to the scan root
+    name: str
+    folder: str   # Relative directory ("" for the root)
+    size: int
+    mtime: float
+
+
+def default_skip_dir(name: str) -> bool:
+    """Directories never descended into: thumbnail caches and hidden dirs."""
+    return name == "_thumbs" or name.startswith(".")
+
+
+def _scan_dir(path: str, folder: str, include: Callable[[str], bool],
+              skip_dir: Callable[[str], bool]) -> Tuple[List[ScanEntry], List[Tuple[str, str]]]:
+    """List one directory: matching files with their stat data, plus subdirectories to visit."""
+    files: List[ScanEntry] = []
+    subdirs: List[Tuple[str, str]] = []
+    try:
+        it = os.scandir(path)
+    except OSError:
+        # Removed or unreadable since the parent was listed
+        return files, subdirs
+
+    with it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not skip_dir(entry.name):
+                        subdirs.append((entry.path, f"{folder}/{entry.name}" if folder else entry.name))
+                    continue
+                # Filter on the name first so non-image files never cost a stat
+                if not include(entry.name):
+                    continue
+                st = entry.stat()
+            except OSError:
+                # File disappeared between listing and stat; ignore
+                continue
+            files.append(ScanEntry(
+                relpath=f"{folder}/{entry.name}" if folder else entry.name,
+                name=entry.name,
+                folder=folder,
+                size=st.st_size,
+                mtime=st.st_mtime,
+            ))
+    return files, subdirs
+
+
+def scan_tree(root: str, include: Callable[[str], bool],
+              skip_dir: Callable[[str], bool] = default_skip_dir,
+              max_workers: Optional[int] = DEFAULT_SCAN_WORKERS,
+              on_dir: Optional[Callable[[List[ScanEntry]], None]] = None) -> List[ScanEntry]:
+    """
+    Recursively list files under root whose names pass include().
+
+    Uses os.scandir so directory type checks come from the listing itself,
+    prunes directories rejected by skip_dir() before descending, and spreads
+    directories across a thread pool (scandir/stat release the GIL, so slow
+    filesystems such as NFS overlap their round trips). Each directory is a
+    separate task, so deep and wide trees both balance across workers.
+
+    If on_dir is given it is called (on the calling thread) with the matching
+    files of each directory as soon as that directory has been listed, so
+    callers can publish partial results while the scan is still running.
+
+    Results are in no particular order.
+    """
+    if not os.path.isdir(root):
+        return []
+
+    if not max_workers or max_workers <= 1:
+        results: List[ScanEntry] = []
+        stack = [(root, "")]
+        while stack:
+            files, subdirs = _scan_dir(*stack.pop(), include, skip_dir)
+            results.extend(files)
+            if on_dir is not None:
+                on_dir(files)
+            stack.extend(subdirs)
+        return results
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="usg-scan") as pool:
+        pending = {pool.submit(_scan_dir, root, "", include, skip_dir)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                # Queue children first so workers stay busy while on_dir runs
+                for path, folder in subdirs:
+                    pending.add(pool.submit(_scan_dir, path, folder, include, skip_dir))
+                results.extend(files)
+                if on_dir is not None:
+                    on_dir(files)
+    return results
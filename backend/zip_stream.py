@@ -0,0 +1,137 @@
+# ComfyUI-Usgromana-Gallery/backend/zip_stream.py
+# Write gallery files into ZIP archives incrementally (streamed downloads and export files)
+
+import asyncio
+import io
+import os
+import threading
+import zipfile
+from typing import Callable, Iterable, Optional, Tuple
+
+from aiohttp import web
+
+# Formats that are already compressed: deflating them again costs CPU for ~0% gain
+STORED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+
+# Bytes gathered before a chunk is handed to the event loop (zipfile writes in 8 KiB pieces)
+_CHUNK_BYTES = 256 * 1024
+# Chunks that may wait for a slow client before the zip thread blocks
+_QUEUE_CHUNKS = 8
+
+
+class ZipAborted(Exception):
+    """The consumer went away (client disconnected, job cancelled)."""
+
+
+def compress_type_for(path: str) -> int:
+    ext = os.path.splitext(path)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def write_zip(fileobj, entries: Iterable[Tuple[str, str]],
+              progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    Write (path, arcname) entries to a ZIP archive on fileobj (blocking).
+    fileobj needn't be seekable. Files that vanished since they were listed
+    are skipped. progress(files_done, bytes_done) is called after each file.
+    Returns the number of files written.
+    """
+    written = 0
+    done_bytes = 0
+    with zipfile.ZipFile(fileobj, "w", allowZip64=True) as zf:
+        for path, arcname in entries:
+            try:
+                size = os.path.getsize(path)
+                zf.write(path, arcname, compress_type=compress_type_for(path))
+            except FileNotFoundError:
+                continue
+            written += 1
+            done_bytes += size
+            if progress is not None:
+                progress(written, done_bytes)
+    return written
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable file object handing fixed-size chunks to emit()."""
+
+    def __init__(self, emit: Callable[[bytes], None]):
+        super().__init__()
+        self._emit = emit
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        if len(self._buffer) >= _CHUNK_BYTES:
+            self._emit(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def close(self):
+        if not self.closed and self._buffer:
+            self._emit(bytes(self._buffer))
+            self._buffer.clear()
+        super().close()
+
+
+async def stream_zip(request: web.Request, entries: Iterable[Tuple[str, str]],
+                     download_name: str = "gallery_images.zip") -> web.StreamResponse:
+    """
+    Stream a ZIP of (path, arcname) entries as it is written: a worker thread
+    runs zipfile and hands chunks to the event loop through a small bounded
+    queue, so memory stays flat however large the selection is and the
+    client starts receiving data right away. If the client disconnects, the
+    worker stops at its next write.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_CHUNKS)
+    aborted = threading.Event()
+    done = object()
+
+    def emit(chunk: bytes):
+        if aborted.is_set():
+            raise ZipAborted()
+        asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+
+    def produce():
+        try:
+            with _ChunkWriter(emit) as out:
+                write_zip(out, entries)
+        except ZipAborted:
+            return
+        except Exception as e:
+            print(f"[Usgromana-Gallery] ZIP stream error: {e}")
+            outcome = e
+        else:
+            outcome = done
+        if not aborted.is_set():
+            asyncio.run_coroutine_threadsafe(queue.put(outcome), loop).result()
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "application/zip",
+        "Content-Disposition": f'attachment; filename="{download_name}"',
+    })
+    await response.prepare(request)
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is done:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk  # Drop the connection rather than end a truncated archive cleanly
+            await response.write(chunk)
+        await response.write_eof()
+    except BaseException:
+        # Client went away (or we were cancelled): let the worker finish quietly
+        aborted.set()
+        while not queue.empty():
+            queue.get_nowait()
+        raise
+    finally:
+        # The worker notices the abort at its next write; don't leave it behind
+        await asyncio.shield(producer)
+    return response
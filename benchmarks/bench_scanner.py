@@ -0,0 +1,163 @@
+# ComfyUI-Usgromana-Gallery/benchmarks/bench_scanner.py
+# Compare the old os.walk + os.stat scan with the parallel scandir tree scanner
+#
+# Usage:
+#   python benchmarks/bench_scanner.py                     # synthetic deep tree in a temp dir
+#   python benchmarks/bench_scanner.py --root /mnt/nfs/out # a real (e.g. network) output dir
+#
+#   python benchmarks/bench_scanner.py --latency-ms 0.5   # simulate a network filesystem
+#
+# Local disks with a warm page cache show little difference (thread overhead
+# can even make it slower); the parallel scanner pays off when each stat is a
+# round trip (NFS/SMB, cold caches).
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from tree_scan import scan_tree  # noqa: E402
+
+EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"}
+
+
+def _is_image(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in EXTENSIONS
+
+
+def walk_scan(root: str) -> int:
+    """The previous list_output_images loop: os.walk plus a separate os.stat per file."""
+    count = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        if "_thumbs" in dirpath:
+            continue
+        for fname in filenames:
+            if not _is_image(fname):
+                continue
+            try:
+                os.stat(os.path.join(dirpath, fname))
+            except FileNotFoundError:
+                continue
+            count += 1
+    return count
+
+
+def simulate_latency(seconds: float):
+    """Add a fixed delay to every directory listing and stat, like a network filesystem."""
+    real_scandir, real_stat = os.scandir, os.stat
+
+    class SlowEntry:
+        __slots__ = ("_entry",)
+
+        def __init__(self, entry):
+            self._entry = entry
+
+        def __getattr__(self, name):
+            return getattr(self._entry, name)
+
+        def stat(self, **kwargs):
+            time.sleep(seconds)
+            return self._entry.stat(**kwargs)
+
+    class SlowScandir:
+        def __init__(self, path="."):
+            time.sleep(seconds)
+            self._it = real_scandir(path)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._it.close()
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            return SlowEntry(next(self._it))
+
+        def close(self):
+            self._it.close()
+
+    def slow_stat(path, *args, **kwargs):
+        time.sleep(seconds)
+        return real_stat(path, *args, **kwargs)
+
+    os.scandir = SlowScandir
+    os.stat = slow_stat
+
+
+def build_tree(root: str, depth: int, fanout: int, files_per_dir: int) -> int:
+    """Create a synthetic output tree (plus _thumbs dirs the scanners should skip)."""
+    total = 0
+    level = [root]
+    for _ in range(depth + 1):
+        next_level = []
+        for directory in level:
+            os.makedirs(os.path.join(directory, "_thumbs"), exist_ok=True)
+            for i in range(files_per_dir):
+                with open(os.path.join(directory, f"img_{i:05d}.png"), "wb") as f:
+                    f.write(b"\0" * 64)
+                with open(os.path.join(directory, "_thumbs", f"img_{i:05d}.png"), "wb") as f:
+                    f.write(b"\0" * 16)
+                total += 1
+            for j in range(fanout):
+                child = os.path.join(directory, f"d{j}")
+                os.makedirs(child, exist_ok=True)
+                next_level.append(child)
+        level = next_level[:5000]
+    return total
+
+
+def timed(fn, repeat: int) -> tuple[float, int]:
+    times = []
+    result = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the gallery tree scanner")
+    parser.add_argument("--root", help="Scan an existing directory instead of a synthetic tree")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--files", type=int, default=40, help="Images per directory")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", default="1,4,8,16")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Simulated per-syscall latency (e.g. 0.5 for NFS)")
+    args = parser.parse_args()
+
+    tmp = None
+    root = args.root
+    if not root:
+        tmp = tempfile.mkdtemp(prefix="usg-bench-scan-")
+        root = tmp
+        created = build_tree(root, args.depth, args.fanout, args.files)
+        print(f"Synthetic tree: depth={args.depth} fanout={args.fanout} files/dir={args.files} -> {created} images")
+
+    if args.latency_ms:
+        simulate_latency(args.latency_ms / 1000.0)
+        print(f"Simulating {args.latency_ms} ms per listing/stat")
+
+    try:
+        baseline, count = timed(lambda: walk_scan(root), args.repeat)
+        print(f"{'os.walk + os.stat':<24} {baseline * 1000:9.1f} ms  ({count} images)")
+        for workers in (int(w) for w in args.workers.split(",")):
+            elapsed, count = timed(lambda: len(scan_tree(root, _is_image, max_workers=workers)), args.repeat)
+            print(f"{f'scan_tree workers={workers}':<24} {elapsed * 1000:9.1f} ms  ({count} images)  "
+                  f"x{baseline / elapsed:.2f}")
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
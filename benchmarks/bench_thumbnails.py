@@ -0,0 +1,126 @@
+# ComfyUI-Usgromana-Gallery/benchmarks/bench_thumbnails.py
+# Compare thumbnail rendering from a full decode with the reduced-decode path
+#
+# Usage:
+#   python benchmarks/bench_thumbnails.py                      # synthetic 8K JPEG and PNG
+#   python benchmarks/bench_thumbnails.py --width 3840 --height 2160
+#   python benchmarks/bench_thumbnails.py --image /path/to/upscale.png
+#
+# Each case runs in a fresh child process (fork) so peak memory can be read
+# from ru_maxrss; memory columns are only shown where the resource module
+# exists (not on Windows).
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageOps
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from thumbnails import THUMB_SIZE, render_rendition, rendition_spec  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def generate_thumb_sync(source: str, dest: str):
+    """The original /batch/generate-thumbnails body: PNG thumbnail, Pillow defaults."""
+    with Image.open(source) as im:
+        im.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.Resampling.LANCZOS)
+        im.save(dest, format="PNG", optimize=True)
+
+
+def full_decode(source: str, dest: str):
+    """Rendition path before reduced decoding: EXIF rotation forces a full decode (and copy)."""
+    with Image.open(source) as im:
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.Resampling.LANCZOS)
+        im.convert("RGB").save(dest, format="WEBP", quality=80, method=4)
+
+
+def reduced_decode(source: str, dest: str):
+    """Current render_rendition: draft / reduce before resampling."""
+    render_rendition(source, dest, rendition_spec("thumb", "webp", 80))
+
+
+CASES = [
+    ("generate_thumb_sync", generate_thumb_sync),
+    ("full decode", full_decode),
+    ("render_rendition", reduced_decode),
+]
+
+
+def _max_rss_mib() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _run_case(fn, source: str, dest: str, repeat: int, results):
+    start_rss = _max_rss_mib() if resource else 0.0
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(source, dest)
+        times.append(time.perf_counter() - start)
+    peak = (_max_rss_mib() - start_rss) if resource else None
+    results.put((statistics.median(times), peak))
+
+
+def run_case(fn, source: str, dest: str, repeat: int):
+    ctx = multiprocessing.get_context("fork") if hasattr(os, "fork") else multiprocessing.get_context()
+    results = ctx.Queue()
+    proc = ctx.Process(target=_run_case, args=(fn, source, dest, repeat, results))
+    proc.start()
+    outcome = results.get()
+    proc.join()
+    return outcome
+
+
+def make_source(directory: str, fmt: str, width: int, height: int) -> str:
+    """Noisy gradient so encoders and resamplers do realistic work."""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 64)
+    im = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    path = os.path.join(directory, f"source_{width}x{height}.{fmt.lower()}")
+    if fmt == "JPEG":
+        im.save(path, format="JPEG", quality=92)
+    else:
+        im.save(path, format=fmt)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark thumbnail decoding paths")
+    parser.add_argument("--image", action="append", help="Benchmark an existing image (repeatable)")
+    parser.add_argument("--width", type=int, default=7680)
+    parser.add_argument("--height", type=int, default=4320)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="usg-bench-thumb-")
+    try:
+        sources = args.image or [make_source(tmp, fmt, args.width, args.height) for fmt in ("JPEG", "PNG")]
+        for source in sources:
+            with Image.open(source) as im:
+                print(f"{os.path.basename(source)}: {im.format} {im.size[0]}x{im.size[1]} {im.mode}")
+            baseline = None
+            for name, fn in CASES:
+                dest = os.path.join(tmp, f"out_{name.replace(' ', '_')}")
+                elapsed, peak = run_case(fn, source, dest, args.repeat)
+                baseline = baseline or elapsed
+                memory = f"  peak +{peak:7.1f} MiB" if peak is not None else ""
+                print(f"  {name:<20} {elapsed * 1000:8.1f} ms{memory}  x{baseline / elapsed:.2f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
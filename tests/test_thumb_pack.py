@@ -0,0 +1,76 @@
+# ComfyUI-Usgromana-Gallery/tests/test_thumb_pack.py
+# Serves packed renditions over a real connection and checks the bytes on the wire
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.thumb_pack import PackSliceResponse, ThumbPack  # noqa: E402
+
+
+async def _raw_get(port: int, path: str) -> bytes:
+    """Issue a GET on a fresh connection and return everything the server sent."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return data
+
+
+class PackSliceResponseTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pack = ThumbPack(os.path.join(self.tmp.name, "packs"))
+        # Neighbouring entries make sure only the requested slice is sent
+        self.pack.add("thumb/aaa", b"A" * 1000, "image/webp", "aaa")
+        self.body = os.urandom(70000)
+        self.pack.add("thumb/bbb", self.body, "image/webp", "bbb")
+        self.pack.add("thumb/ccc", b"C" * 1000, "image/webp", "ccc")
+
+        async def handler(request):
+            entry = self.pack.get(request.match_info["key"].replace("-", "/"))
+            return PackSliceResponse(self.pack.pack_path(entry.pack), entry,
+                                     headers={"Cache-Control": "no-cache", "ETag": '"bbb"'})
+
+        app = web.Application()
+        app.router.add_get("/pack/{key}", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+        self.pack.close()
+        self.tmp.cleanup()
+
+    async def test_headers_precede_body(self):
+        raw = await _raw_get(self.port, "/pack/thumb-bbb")
+        head, sep, body = raw.partition(b"\r\n\r\n")
+        self.assertTrue(sep, "no end of headers in response")
+        lines = head.decode("latin-1").split("\r\n")
+        self.assertEqual(lines[0], "HTTP/1.1 200 OK")
+        headers = {name.lower(): value.strip() for name, _, value in (line.partition(":") for line in lines[1:])}
+        self.assertEqual(headers["content-type"], "image/webp")
+        self.assertEqual(headers["content-length"], str(len(self.body)))
+        self.assertEqual(headers["etag"], '"bbb"')
+        self.assertEqual(body, self.body)
+
+    async def test_sequential_requests(self):
+        for _ in range(3):
+            raw = await _raw_get(self.port, "/pack/thumb-aaa")
+            head, _, body = raw.partition(b"\r\n\r\n")
+            self.assertTrue(head.startswith(b"HTTP/1.1 200 OK"))
+            self.assertEqual(body, b"A" * 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
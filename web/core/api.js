@@ -1,7 +1,7 @@
 // ComfyUI-Usgromana-Gallery/web/core/api.js
 
 import { logger } from "./logger.js";
-import { API_BASE, API_ENDPOINTS } from "./constants.js";
+import { API_BASE, API_ENDPOINTS, PERFORMANCE } from "./constants.js";
 
 async function request(path, options = {}) {
     const url = `${API_BASE}${path}`;
@@ -27,11 +27,87 @@ async function request(path, options = {}) {
     return data;
 }
 
+// { rating_min: 3, model: ["a", "b"], tag: "x" } -> "rating_min=3&model=a&model=b&tag=x"
+function facetQuery(filters) {
+    if (!filters) return "";
+    const params = new URLSearchParams();
+    for (const [key, value] of Object.entries(filters)) {
+        for (const v of Array.isArray(value) ? value : [value]) {
+            if (v !== null && v !== undefined && v !== "" && v !== 0) params.append(key, String(v));
+        }
+    }
+    return params.toString();
+}
+
 export const galleryApi = {
     async listImages() {
+        const { images } = await this.listAll();
+        return images;
+    },
+
+    // Full listing plus the catalog sync token ({ generation, epoch }) it reflects
+    async listAll() {
         const data = await request(API_ENDPOINTS.LIST.replace(API_BASE, ""));
-        // expect { ok: true, images: [...] }
-        return data.images || [];
+        // expect { ok: true, images: [...], generation, epoch }
+        return {
+            images: data.images || [],
+            sync: { generation: data.generation, epoch: data.epoch },
+        };
+    },
+
+    // Delta sync: { reset, added, modified, removed, sync } since the given token.
+    // reset=true means the server can't answer from its change log; refetch everything.
+    async listChanges({ generation, epoch }) {
+        const data = await request(
+            `${API_ENDPOINTS.LIST.replace(API_BASE, "")}?since=${generation}&epoch=${encodeURIComponent(epoch || "")}`
+        );
+        return {
+            reset: !!data.reset,
+            added: data.added || [],
+            modified: data.modified || [],
+            removed: data.removed || [],
+            sync: { generation: data.generation, epoch: data.epoch },
+        };
+    },
+
+    // Keyset-paginated listing: returns { images, next } where `next` is the
+    // cursor to pass as `after` for the following page (null when done).
+    // `filters` narrows the list server-side (see facetQuery).
+    async listImagesPage({ after = null, limit = PERFORMANCE.LIST_PAGE_SIZE, filters = null } = {}) {
+        let path = `${API_ENDPOINTS.LIST.replace(API_BASE, "")}?limit=${limit}`;
+        if (after) path += `&after=${encodeURIComponent(after)}`;
+        const query = facetQuery(filters);
+        if (query) path += `&${query}`;
+        const data = await request(path);
+        return {
+            images: data.images || [],
+            next: data.next || null,
+            sync: { generation: data.generation, epoch: data.epoch },
+        };
+    },
+
+    // Ranked full-text search (names, tags, models, prompts): { images, next, total }.
+    // Pass `next` back as `after` for the following page.
+    async searchImages(q, { after = null, limit = PERFORMANCE.LIST_PAGE_SIZE, filters = null } = {}) {
+        let path = `/search?q=${encodeURIComponent(q)}&limit=${limit}`;
+        if (after) path += `&after=${encodeURIComponent(after)}`;
+        const query = facetQuery(filters);
+        if (query) path += `&${query}`;
+        const data = await request(path);
+        return { images: data.images || [], next: data.next || null, total: data.total || 0 };
+    },
+
+    // Facet value counts ({ rating, tags, model, sampler, scheduler, lora })
+    // over the images matching `filters`
+    async getFacets(filters = null) {
+        const query = facetQuery(filters);
+        const data = await request(`/facets${query ? `?${query}` : ""}`);
+        return { total: data.total || 0, facets: data.facets || {}, indexPending: data.index_pending || 0 };
+    },
+
+    async listFolders() {
+        const data = await request(API_ENDPOINTS.FOLDERS.replace(API_BASE, ""));
+        return data.folders || [];
     },
 
     async getMetadata(filename) {
@@ -75,6 +151,35 @@ export const galleryApi = {
         return data.monitoring || false;
     },
 
+    // Server-push change stream (Server-Sent Events). Handlers receive the same
+    // shape as listChanges(); the browser resumes via Last-Event-ID on reconnect.
+    // Returns the EventSource, or null if the browser has no EventSource.
+    openChangeStream(token, { onChanges, onReset, onSync, onError } = {}) {
+        if (typeof EventSource === "undefined") return null;
+
+        let url = API_ENDPOINTS.WATCH;
+        if (token) {
+            url += `?since=${token.generation}&epoch=${encodeURIComponent(token.epoch || "")}`;
+        }
+        const source = new EventSource(url, { withCredentials: true });
+
+        const toDelta = (ev) => {
+            const data = JSON.parse(ev.data);
+            return {
+                reset: !!data.reset,
+                added: data.added || [],
+                modified: data.modified || [],
+                removed: data.removed || [],
+                sync: { generation: data.generation, epoch: data.epoch },
+            };
+        };
+        source.addEventListener("changes", (ev) => onChanges?.(toDelta(ev)));
+        source.addEventListener("reset", (ev) => onReset?.(toDelta(ev)));
+        source.addEventListener("sync", (ev) => onSync?.(toDelta(ev).sync));
+        source.onerror = (ev) => onError?.(source, ev);
+        return source;
+    },
+
     async batchDelete(filenames) {
         return await request("/batch/delete", {
             method: "POST",
@@ -82,9 +187,79 @@ export const galleryApi = {
         });
     },
 
+    // The ZIP is streamed as it's built; navigating to this URL lets the browser
+    // save it straight to disk instead of holding it in memory
+    batchDownloadUrl(filenames) {
+        return `${API_BASE}/batch/download?filenames=${encodeURIComponent(filenames.join(","))}`;
+    },
+
+    // Background export: the archive is built server-side (progress via
+    // watchExport) and kept for a day, so the download can be resumed
+    async createExport(filenames, name = "") {
+        const data = await request("/exports", {
+            method: "POST",
+            body: JSON.stringify({ filenames, name }),
+        });
+        return data.job;
+    },
+
+    async getExport(id) {
+        const data = await request(`/exports?id=${encodeURIComponent(id)}`);
+        return data.job;
+    },
+
+    async cancelExport(id) {
+        return await request("/exports/cancel", {
+            method: "POST",
+            body: JSON.stringify({ id }),
+        });
+    },
+
+    exportDownloadUrl(id) {
+        return `${API_BASE}/exports/download?id=${encodeURIComponent(id)}`;
+    },
+
+    // Resolves with the finished job (state "done", "failed" or "cancelled");
+    // onProgress(job) is called as the archive is written.
+    watchExport(id, onProgress) {
+        return new Promise((resolve, reject) => {
+            const finish = (job) => {
+                onProgress?.(job);
+                resolve(job);
+            };
+            const poll = async () => {
+                try {
+                    const job = await this.getExport(id);
+                    if (["done", "failed", "cancelled"].includes(job.state)) return finish(job);
+                    onProgress?.(job);
+                    setTimeout(poll, PERFORMANCE.EXPORT_POLL_INTERVAL);
+                } catch (err) {
+                    reject(err);
+                }
+            };
+            if (typeof EventSource === "undefined") {
+                poll();
+                return;
+            }
+            const source = new EventSource(`${API_BASE}/exports/events?id=${encodeURIComponent(id)}`,
+                { withCredentials: true });
+            const terminal = (ev) => {
+                source.close();
+                finish(JSON.parse(ev.data));
+            };
+            source.addEventListener("progress", (ev) => onProgress?.(JSON.parse(ev.data)));
+            ["done", "failed", "cancelled"].forEach((name) => source.addEventListener(name, terminal));
+            source.onerror = () => {
+                // Stream dropped before the final event: carry on by polling
+                source.close();
+                poll();
+            };
+        });
+    },
+
     async batchDownload(filenames) {
         // Download as blob
-        const url = `${API_BASE}/batch/download?filenames=${encodeURIComponent(filenames.join(","))}`;
+        const url = this.batchDownloadUrl(filenames);
         const res = await fetch(url, { credentials: "same-origin" });
         if (!res.ok) throw new Error(`Download failed: ${res.status}`);
         return await res.blob();
@@ -105,6 +280,24 @@ export const galleryApi = {
         });
     },
 
+    // Many renditions in one round trip. Resolves to a Map of request index -> Blob;
+    // images the server left out (missing, blocked, failed) are absent from it.
+    async fetchThumbnails(filenames, size = "thumb") {
+        const res = await fetch(`${API_BASE}/thumbnails/batch`, {
+            method: "POST",
+            credentials: "same-origin",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ filenames, size }),
+        });
+        if (!res.ok) throw new Error(`Thumbnail batch failed: ${res.status}`);
+        const form = await res.formData();
+        const blobs = new Map();
+        for (const [name, value] of form.entries()) {
+            if (value instanceof Blob) blobs.set(Number(name), value);
+        }
+        return blobs;
+    },
+
     async batchGenerateThumbnails(filenames = []) {
         return await request("/batch/generate-thumbnails", {
             method: "POST",
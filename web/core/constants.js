@@ -15,6 +15,7 @@ export const ASSETS = {
 // API endpoints
 export const API_ENDPOINTS = {
     LIST: `${API_BASE}/list`,
+    FOLDERS: `${API_BASE}/folders`,
     IMAGE: `${API_BASE}/image`,
     META: `${API_BASE}/meta`,
     RATING: `${API_BASE}/rating`,
@@ -40,6 +41,18 @@ export const PERFORMANCE = {
     DEBOUNCE_DELAY: 300,
     ANCHOR_WATCH_INTERVAL: 1500,
     FILE_WATCH_POLL_INTERVAL: 2000, // Poll for file changes every 2 seconds
+    LIST_PAGE_SIZE: 200,            // Images per /list page (keyset pagination)
+    LIST_PAGE_PREFETCH_PX: 800,     // Fetch the next page when this close to the bottom
+    THUMBNAIL_BATCH_SIZE: 60,       // Grid thumbnails per /thumbnails/batch request (server max 100)
+    EXPORT_JOB_MIN_FILES: 50,       // Larger selections are zipped as a background export job
+    EXPORT_POLL_INTERVAL: 1000,     // Export progress polling when EventSource is unavailable
+};
+
+// Server-side rendition tiers (/image?size=<tier>): longest side in pixels
+export const RENDITIONS = {
+    thumb: 256,
+    large: 512,
+    preview: 1600,
 };
 
 // Storage keys
@@ -2,7 +2,7 @@
 
 import { galleryApi } from "./api.js";
 import { logger } from "./logger.js";
-import { setImages } from "./state.js";
+import { setImages, setSyncToken, getSyncToken, applyImageChanges, getLiveQueryRefresh } from "./state.js";
 import { ASSETS, PERFORMANCE } from "./constants.js";
 import { createManagedInterval } from "./utils.js";
 
@@ -40,7 +40,8 @@ async function loadImages(force = false) {
     }
     
     try {
-        const images = await galleryApi.listImages();
+        const { images, sync } = await galleryApi.listAll();
+        setSyncToken(sync);
         // Only reset visibleImages on initial load (force=true) or first load
         setImages(images, force || !loadedOnce);
         loadedOnce = true;
@@ -58,19 +59,97 @@ async function loadImages(force = false) {
 }
 
 // ---------------------------------------------------------
-// Real-time file monitoring (polling-based)
+// Real-time file monitoring (server push, polling fallback)
 // ---------------------------------------------------------
 let fileWatchInterval = null;
-let lastImageCount = 0;
+let changeStream = null;
+
+async function reloadAfterReset() {
+    const refresh = getLiveQueryRefresh();
+    if (refresh) {
+        // Showing search results: only a fresh token is needed, then re-run the query
+        const { sync } = await galleryApi.listImagesPage({ limit: 1 });
+        setSyncToken(sync);
+        refresh();
+        return;
+    }
+    const { images, sync } = await galleryApi.listAll();
+    setSyncToken(sync);
+    // Don't reset visibleImages - preserve grid's current filter/sort order
+    setImages(images, false);
+}
+
+// Apply a delta to the listing, or re-run the grid's query if it shows one
+function applyDelta(delta) {
+    const refresh = getLiveQueryRefresh();
+    if (refresh) {
+        if (delta.added?.length || delta.modified?.length || delta.removed?.length) refresh();
+        return;
+    }
+    // Grid will auto-update via state subscription
+    applyImageChanges(delta);
+}
+
+async function syncImageChanges() {
+    const token = getSyncToken();
+    if (!token) {
+        // Nothing loaded with a sync token yet; take a full snapshot
+        const { images, sync } = await galleryApi.listAll();
+        setSyncToken(sync);
+        setImages(images, false);
+        return;
+    }
+
+    const delta = await galleryApi.listChanges(token);
+    if (delta.reset) {
+        await reloadAfterReset();
+        return;
+    }
+
+    setSyncToken(delta.sync);
+    applyDelta(delta);
+}
+
+// Subscribe to the /watch event stream. Returns false if the browser can't,
+// in which case the caller falls back to polling.
+function startChangeStream() {
+    const source = galleryApi.openChangeStream(getSyncToken(), {
+        onChanges: (delta) => {
+            setSyncToken(delta.sync);
+            applyDelta(delta);
+        },
+        onReset: () => {
+            reloadAfterReset().catch((err) =>
+                logger.error("[UsgromanaGallery] Failed to reload gallery images", err)
+            );
+        },
+        onError: (src) => {
+            // EventSource retries transient drops on its own; CLOSED means the
+            // server refused the stream (old backend, proxy, permissions)
+            if (src.readyState !== EventSource.CLOSED) return;
+            stopFileWatching();
+            startPolling();
+        },
+    });
+    if (!source) return false;
+    changeStream = source;
+    return true;
+}
 
 function startFileWatching() {
-    if (fileWatchInterval) return;
+    if (fileWatchInterval || changeStream) return;
     
     const settings = getGallerySettings();
     if (!settings.enableRealTimeUpdates) {
         return; // User disabled real-time updates
     }
-    
+
+    if (!startChangeStream()) startPolling();
+}
+
+function startPolling() {
+    if (fileWatchInterval) return;
+
     // Poll for file changes periodically
     const managed = createManagedInterval(async () => {
         try {
@@ -84,18 +163,8 @@ function startFileWatching() {
                 return;
             }
 
-            const monitoring = await galleryApi.checkWatchStatus();
-            if (monitoring) {
-                // If monitoring is active, reload images to catch changes
-                // This is a simple polling approach; could be upgraded to WebSocket
-                const images = await galleryApi.listImages();
-                if (images.length !== lastImageCount) {
-                    lastImageCount = images.length;
-                    // Don't reset visibleImages - preserve grid's current filter/sort order
-                    setImages(images, false);
-                    // Grid will auto-update via state subscription
-                }
-            }
+            // Only fetch what changed since the last sync (usually a 304)
+            await syncImageChanges();
         } catch (err) {
             // Silently fail - monitoring might not be available
         }
@@ -106,6 +175,10 @@ function startFileWatching() {
 }
 
 function stopFileWatching() {
+    if (changeStream) {
+        changeStream.close();
+        changeStream = null;
+    }
     if (fileWatchInterval) {
         fileWatchInterval.stop();
         fileWatchInterval = null;
@@ -486,7 +559,7 @@ export async function initGalleryExtension() {
     // React to settings changes for file watching
     subscribeGallerySettings((settings) => {
         if (settings.enableRealTimeUpdates) {
-            if (!fileWatchInterval) startFileWatching();
+            if (!fileWatchInterval && !changeStream) startFileWatching();
         } else {
             stopFileWatching();
         }
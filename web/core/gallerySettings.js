@@ -28,6 +28,16 @@ const DEFAULT_SETTINGS = {
     // File monitoring
     fileExtensions: ".png,.jpg,.jpeg,.webp,.gif,.bmp", // Comma-separated list
     usePollingObserver: false, // Use polling instead of native file watcher
+    pollingInterval: 2, // Seconds between directory polls in polling mode
+
+    // Server-side renditions (grid thumbnails and details previews)
+    renditionFormat: "webp", // "webp" | "jpeg"
+    renditionQuality: 80,    // 1-100
+    detailsFullResolution: false, // Details view loads the original instead of the preview
+    thumbnailWorkerProcesses: false, // Render thumbnails in spawned worker processes instead of threads
+    thumbnailCacheMB: 2048,  // Disk budget for cached thumbnails (0 = unlimited)
+    thumbnailStorage: "files", // "files" (one file each) | "pack" (shared pack files)
+    thumbnailMemoryCacheMB: 64, // RAM kept for recently served thumbnails (0 = disabled)
     enableRealTimeUpdates: true, // Enable real-time file monitoring
     
     // Root gallery folder (empty = use default ComfyUI output directory)
@@ -10,6 +10,9 @@ const state = {
 
 const listeners = new Set();
 
+// Catalog sync token ({ generation, epoch }) of the last listing applied to state
+let syncToken = null;
+
 // --- Shared registries (grid produces; details consumes) ---
 const thumbRegistry = new Map(); // imageKey -> thumbUrl
 
@@ -71,6 +74,42 @@ export function setImages(images, resetVisible = false) {
     notify();
 }
 
+export function setSyncToken(token) {
+    syncToken = token && token.generation != null ? token : null;
+}
+
+export function getSyncToken() {
+    return syncToken;
+}
+
+// Set while state.images holds a server-side query result (search) rather than
+// the listing. Deltas can't patch such a result: which images match and their
+// order come from the server. Live updates call this to re-run the query instead.
+let liveQueryRefresh = null;
+
+export function setLiveQueryRefresh(fn) {
+    liveQueryRefresh = typeof fn === "function" ? fn : null;
+}
+
+export function getLiveQueryRefresh() {
+    return liveQueryRefresh;
+}
+
+/**
+ * Patch state.images with a /list?since= delta instead of replacing the list.
+ * Added/modified images go to the front (newest first). Returns true if anything changed.
+ */
+export function applyImageChanges({ added = [], modified = [], removed = [] } = {}) {
+    const keyOf = (img) => img.relpath || img.filename;
+    const touched = new Set([...removed, ...added.map(keyOf), ...modified.map(keyOf)]);
+    if (!touched.size) return false;
+
+    const kept = state.images.filter((img) => !touched.has(keyOf(img)));
+    const fresh = [...added, ...modified].sort((a, b) => (b.mtime || 0) - (a.mtime || 0));
+    setImages([...fresh, ...kept], false);
+    return true;
+}
+
 export function setVisibleImages(images) {
     state.visibleImages = Array.isArray(images) ? images : [];
     gridHasSetVisibleImages = true; // Mark that grid has set the order
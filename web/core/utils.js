@@ -1,6 +1,8 @@
 // ComfyUI-Usgromana-Gallery/web/core/utils.js
 // Shared utility functions
 
+import { API_ENDPOINTS } from "./constants.js";
+
 /**
  * Debounce function calls
  */
@@ -79,6 +81,18 @@ export function getImageKey(img) {
     return img.id || img.filename || img.relpath || null;
 }
 
+/**
+ * /image URL for a gallery image, optionally a rendition tier ("thumb", "large",
+ * "preview"). Carries the image's version so the browser can cache it for good.
+ */
+export function imageUrl(img, size = null) {
+    const rel = img.relpath || img.filename || "";
+    let url = `${API_ENDPOINTS.IMAGE}?filename=${encodeURIComponent(rel)}`;
+    if (img.version) url += `&v=${encodeURIComponent(img.version)}`;
+    if (size) url += `&size=${size}`;
+    return url;
+}
+
 /**
  * Safe JSON parse
  */
@@ -6,7 +6,8 @@ import { getImages, setImages, resetGridHasSetVisibleImagesFlag } from "../core/
 import { galleryApi } from "../core/api.js";
 import { fetchCurrentUser, canEditMetadata } from "../core/user.js";
 import { API_BASE, API_ENDPOINTS, PERFORMANCE } from "../core/constants.js";
-import { formatFileSize, formatDate, unloadImage } from "../core/utils.js";
+import { formatFileSize, formatDate, unloadImage, imageUrl } from "../core/utils.js";
+import { getGallerySettings } from "../core/gallerySettings.js";
 
 let modalEl = null;
 let cardEl = null;
@@ -40,6 +41,7 @@ let metaContent = null;
 let currentIndex = null;
 let currentFilteredIndex = null; // Track filtered index directly - never re-derive
 let currentImageUrl = null;
+let currentOriginalUrl = null; // Full-resolution URL (details may display a preview rendition)
 let currentImageInfo = null;
 let metadataVisible = false;
 let leftTargetIndex = null;
@@ -240,7 +242,8 @@ export function initDetails(_rootIgnored) {
     btnOpen = mkBtn("⌕", "Open image in new tab");
     btnOpen.onclick = (ev) => {
         ev.stopPropagation();
-        if (currentImageUrl) window.open(currentImageUrl, "_blank", "noopener,noreferrer");
+        const url = currentOriginalUrl || currentImageUrl;
+        if (url) window.open(url, "_blank", "noopener,noreferrer");
     };
 
     btnZoom = mkBtn("+", "Zoom and drag mode");
@@ -684,14 +687,17 @@ export async function showDetailsForIndex(index) {
     }
     // If currentFilteredIndex is already set and valid, trust it - don't recalculate
 
-    // MAIN IMAGE: full-res only here (no thumb fallbacks)
-    // Ensure we always use the full-size image, never thumbnails
+    // MAIN IMAGE: the ~1600px preview rendition (or full-res if the user opted in),
+    // never the small grid thumbnails
     // CRITICAL: Always use relpath (includes folder) to avoid URL collisions for same-named files in different folders
     const rel = imgInfo.relpath || imgInfo.filename || "";
     
     // ALWAYS reconstruct URL from relpath to ensure uniqueness and avoid collisions
     // Don't trust imgInfo.url as it might have been constructed from filename only
-    let newImageUrl = `${API_ENDPOINTS.IMAGE}?filename=${encodeURIComponent(rel)}`;
+    currentOriginalUrl = imageUrl({ relpath: rel, version: imgInfo.version });
+    let newImageUrl = getGallerySettings().detailsFullResolution
+        ? currentOriginalUrl
+        : `${currentOriginalUrl}&size=preview`;
     
     // Remove any size=thumb parameter if present (shouldn't happen, but safety check)
     if (newImageUrl.includes("size=thumb")) {
@@ -701,7 +707,7 @@ export async function showDetailsForIndex(index) {
     // Ensure we're not using a thumbnail URL (shouldn't happen, but safety check)
     if (newImageUrl.includes("_thumbs") || newImageUrl.includes("/thumb")) {
         // Reconstruct URL without thumb path - ALWAYS use relpath to ensure uniqueness
-        newImageUrl = `${API_ENDPOINTS.IMAGE}?filename=${encodeURIComponent(rel)}`;
+        newImageUrl = currentOriginalUrl;
     }
     
     // Check if URL is the same as previous (potential collision issue)
@@ -1077,7 +1083,7 @@ export async function showDetailsForIndex(index) {
         if (!prevThumb) {
             const rel = prev.relpath || prev.filename || "";
             if (rel) {
-                prevThumb = `${API_ENDPOINTS.IMAGE}?filename=${encodeURIComponent(rel)}&size=thumb`;
+                prevThumb = imageUrl({ relpath: rel, version: prev.version }, "thumb");
             }
         }
     }
@@ -1088,7 +1094,7 @@ export async function showDetailsForIndex(index) {
         if (!nextThumb) {
             const rel = next.relpath || next.filename || "";
             if (rel) {
-                nextThumb = `${API_ENDPOINTS.IMAGE}?filename=${encodeURIComponent(rel)}&size=thumb`;
+                nextThumb = imageUrl({ relpath: rel, version: next.version }, "thumb");
             }
         }
     }
@@ -1194,6 +1200,7 @@ export function hideDetails() {
 
     currentIndex = null;
     currentImageUrl = null;
+    currentOriginalUrl = null;
     currentImageInfo = null;
     
     // Reset zoom and drag state
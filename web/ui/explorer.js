@@ -1,7 +1,8 @@
 // ComfyUI-Usgromana-Gallery/web/ui/explorer.js
 
 import { galleryApi } from "../core/api.js";
-import { API_BASE, API_ENDPOINTS } from "../core/constants.js";
+import { API_BASE } from "../core/constants.js";
+import { imageUrl } from "../core/utils.js";
 import { getImages, setSelectedIndex } from "../core/state.js";
 import { showDetailsForIndex, setFolderFilter } from "./details.js";
 import { getCurrentTheme, subscribeTheme } from "../core/themeManager.js";
@@ -637,7 +638,7 @@ function createFileItem(file) {
         
         // Create thumbnail image
         const thumbImg = document.createElement("img");
-        const thumbUrl = `${API_ENDPOINTS.IMAGE}?filename=${encodeURIComponent(filePath)}&size=thumb`;
+        const thumbUrl = imageUrl({ relpath: filePath, version: file.version }, "thumb");
         thumbImg.src = thumbUrl;
         thumbImg.alt = fileName;
         thumbImg.style.objectFit = "cover";
@@ -10,6 +10,8 @@ import {
     getImageKey,
     getImages,
     resetGridHasSetVisibleImagesFlag,
+    setSyncToken,
+    setLiveQueryRefresh,
 } from "../core/state.js";
 import { showDetailsForIndex, clearFolderFilter } from "./details.js";
 import {
@@ -18,12 +20,13 @@ import {
     updateGallerySettings,
 } from "../core/gallerySettings.js";
 import { galleryApi } from "../core/api.js";
-import { API_BASE, API_ENDPOINTS, PERFORMANCE } from "../core/constants.js";
-import { debounce, unloadImage } from "../core/utils.js";
+import { API_BASE, API_ENDPOINTS, PERFORMANCE, RENDITIONS } from "../core/constants.js";
+import { debounce, unloadImage, imageUrl } from "../core/utils.js";
 import { subscribeTheme, getCurrentTheme } from "../core/themeManager.js"; 
 
 let rootEl = null;
 let gridContentEl = null;
+let scrollContainerEl = null;
 let loadingIndicatorEl = null;
 
 let lastState = null;
@@ -32,6 +35,10 @@ let ratingMap = new Map();
 let minRatingFilter = 0;
 let gallerySettings = getGallerySettings();
 let searchQuery = "";
+let searchActive = false;  // state.images holds server search results for searchQuery
+let searchSeq = 0;         // discards responses to superseded queries
+let listCursor = null;     // keyset cursor for the next /list page (null = all loaded)
+let pageLoading = false;
 let unsubscribeState = null;
 let unsubscribeSettings = null;
 
@@ -61,6 +68,7 @@ const debouncedRender = debounce(() => {
     }
     renderGridContent();
 }, PERFORMANCE.DEBOUNCE_DELAY);
+const debouncedSearch = debounce(() => runSearch(), PERFORMANCE.DEBOUNCE_DELAY);
 
 const USE_MASONRY_LAYOUT = false;
 
@@ -234,6 +242,7 @@ export function clearGridThumbnails() {
  *  - push into core state (which will trigger render via subscribe)
  */
 export async function reloadImagesAndRender() {
+    if (searchQuery.trim()) return runSearch();
     
     clearGridThumbnails();
     
@@ -248,7 +257,11 @@ export async function reloadImagesAndRender() {
     showLoadingIndicator();
 
     try {
-        const images = await galleryApi.listImages();
+        // Render the first page immediately; the rest is fetched as the user scrolls
+        listCursor = null;
+        const { images, next, sync } = await galleryApi.listImagesPage({ filters: listFilters() });
+        listCursor = next;
+        setSyncToken(sync);
         
         
         // On manual refresh, reset the flag so setImages can reset visibleImages
@@ -257,6 +270,7 @@ export async function reloadImagesAndRender() {
         // NOTE: Don't update lastImageCount here - let the subscription callback handle it
         // This prevents race conditions where lastImageCount is updated before subscription fires
         setImages(images, true);   // subscribe() → renderGridContent()
+        maybeLoadNextPage();
         
         // Pre-generate thumbnails in the background for faster loading
         // Don't await - let it run in background
@@ -271,6 +285,89 @@ export async function reloadImagesAndRender() {
     }
 }
 
+// While search results are shown, live updates re-run the search
+// (see setLiveQueryRefresh) instead of patching in non-matching images
+function setSearchActive(active) {
+    searchActive = active;
+    setLiveQueryRefresh(active ? debouncedSearch : null);
+}
+
+/**
+ * Replace the grid with the server's ranked matches for searchQuery (or go
+ * back to the plain listing once it is cleared). If the search request
+ * fails, the loaded images are filtered client-side instead.
+ */
+async function runSearch() {
+    const q = searchQuery.trim();
+    const seq = ++searchSeq;
+    if (!q) {
+        if (searchActive) {
+            setSearchActive(false);
+            await reloadImagesAndRender();
+        } else {
+            debouncedRender();
+        }
+        return;
+    }
+    try {
+        const { images, next } = await galleryApi.searchImages(q, { filters: listFilters() });
+        if (seq !== searchSeq) return;
+        setSearchActive(true);
+        listCursor = next;
+        clearGridThumbnails();
+        setImages(images, true);
+        maybeLoadNextPage();
+    } catch (err) {
+        if (seq !== searchSeq) return;
+        console.warn("[USG-Gallery] Search failed, filtering loaded images instead:", err);
+        setSearchActive(false);
+        renderGridContent();
+    }
+}
+
+/**
+ * Filters applied server-side, so pages only carry matching images
+ * (renderGridContent still re-checks images that arrive via live updates).
+ */
+function listFilters() {
+    return minRatingFilter > 0 ? { rating_min: minRatingFilter } : null;
+}
+
+/**
+ * Fetch the next /list page (if any) and append it to the core state.
+ */
+async function loadNextPage() {
+    if (!listCursor || pageLoading) return;
+    pageLoading = true;
+    try {
+        const options = { after: listCursor, filters: listFilters() };
+        const { images, next } = searchActive
+            ? await galleryApi.searchImages(searchQuery.trim(), options)
+            : await galleryApi.listImagesPage(options);
+        listCursor = next;
+        if (images.length) {
+            setImages([...getAllImagesRaw(), ...images], false);
+        }
+    } catch (err) {
+        console.warn("[USG-Gallery] Failed to load next page:", err);
+    } finally {
+        pageLoading = false;
+    }
+    maybeLoadNextPage();
+}
+
+/**
+ * Load another page when the grid is scrolled near the bottom
+ * (or doesn't fill the viewport yet).
+ */
+function maybeLoadNextPage() {
+    if (!listCursor || pageLoading || !scrollContainerEl) return;
+    const remaining = scrollContainerEl.scrollHeight - scrollContainerEl.scrollTop - scrollContainerEl.clientHeight;
+    if (remaining <= PERFORMANCE.LIST_PAGE_PREFETCH_PX) {
+        loadNextPage();
+    }
+}
+
 // ---------------------------------------------------------------------
 // Divider / grouping helpers
 // ---------------------------------------------------------------------
@@ -572,7 +669,7 @@ function buildStaticUI() {
     ["keydown","keyup","keypress"].forEach(evt => searchInput.addEventListener(evt, ev => ev.stopPropagation()));
     searchInput.addEventListener("input", () => {
         searchQuery = searchInput.value || "";
-        debouncedRender();
+        debouncedSearch();
     });
     filterBar.appendChild(searchInput);
 
@@ -619,21 +716,34 @@ function buildStaticUI() {
         marginLeft: "6px",
     });
     batchDownloadBtn.onclick = async () => {
-        if (selectedImages.size === 0) return;
+        if (selectedImages.size === 0 || batchDownloadBtn.disabled) return;
         const filenames = Array.from(selectedImages);
         try {
-            const blob = await galleryApi.batchDownload(filenames);
-            const url = URL.createObjectURL(blob);
             const a = document.createElement("a");
-            a.href = url;
+            if (filenames.length < PERFORMANCE.EXPORT_JOB_MIN_FILES) {
+                a.href = galleryApi.batchDownloadUrl(filenames);
+            } else {
+                // Large selections: build the archive server-side (no URL length
+                // limit, progress shown, download resumable), then fetch it
+                batchDownloadBtn.disabled = true;
+                batchDownloadBtn.textContent = "Preparing…";
+                const created = await galleryApi.createExport(filenames);
+                const job = await galleryApi.watchExport(created.id, (progress) => {
+                    const pct = progress.total_bytes ? Math.floor((progress.done_bytes / progress.total_bytes) * 100) : 0;
+                    batchDownloadBtn.textContent = `Preparing… ${pct}%`;
+                });
+                if (job.state !== "done") throw new Error(job.error || `export ${job.state}`);
+                a.href = galleryApi.exportDownloadUrl(job.id);
+            }
             a.download = "gallery_images.zip";
             a.click();
-            URL.revokeObjectURL(url);
             selectedImages.clear();
-            updateBatchButtons();
             renderGridContent();
         } catch (err) {
             alert("Download failed: " + err.message);
+        } finally {
+            batchDownloadBtn.disabled = false;
+            updateBatchButtons();
         }
     };
     filterBar.appendChild(batchDownloadBtn);
@@ -679,7 +789,7 @@ function buildStaticUI() {
         btn.onclick = () => {
             minRatingFilter = Number(btn.dataset.minRating || "0");
             updateFilterButtons();
-            renderGridContent();
+            reloadImagesAndRender();
         };
         filterBar.appendChild(btn);
     });
@@ -716,6 +826,8 @@ function buildStaticUI() {
     gridContentEl = document.createElement("div");
     gridContentEl.className = "usg-gallery-grid";
     scrollContainer.appendChild(gridContentEl);
+    scrollContainer.addEventListener("scroll", maybeLoadNextPage, { passive: true });
+    scrollContainerEl = scrollContainer;
     rootEl.appendChild(scrollContainer);
 
     // Create loading indicator
@@ -962,7 +1074,7 @@ function renderGridContent() {
     let filtered = allImages.filter((img) => {
         const rating = getRatingForImage(img);
         if (rating < minRatingFilter) return false;
-        if (searchQuery) {
+        if (searchQuery && !searchActive) {
             const q = searchQuery.toLowerCase();
             const fn = (img.filename || "").toLowerCase();
             const model = (img.model || img.model_name || "").toLowerCase();
@@ -981,10 +1093,10 @@ function renderGridContent() {
         return true;
     });
 
-    // Only apply grouping/sorting if filters are enabled
+    // Only apply grouping/sorting if filters are enabled; search results keep the server's rank order
     let groups;
     let flatList = [];
-    if (gallerySettings.showDividers) {
+    if (gallerySettings.showDividers && !searchActive) {
         groups = groupImagesForDividers(filtered, gallerySettings);
         groups.forEach((g) => g.items.forEach((img) => flatList.push(img)));
     } else {
@@ -1007,7 +1119,7 @@ function renderGridContent() {
 
     const baseThumbWidth = gallerySettings.thumbSize === "sm" ? 120 : gallerySettings.thumbSize === "lg" ? 220 : 160;
     // Only show dividers if filters are enabled AND a divider mode is selected
-    const showDividers = gallerySettings.showDividers && gallerySettings.dividerMode !== "none";
+    const showDividers = gallerySettings.showDividers && gallerySettings.dividerMode !== "none" && !searchActive;
     const layout = gallerySettings.dividerLayout || "inline";
     const pageMode = showDividers && layout === "page";
 
@@ -1200,6 +1312,76 @@ function createDividerElement(headerText, isPageHeader = false) {
 // Card creation
 // ---------------------------------------------------------------------
 
+// Smallest rendition tier that stays sharp at the card's on-screen width
+function gridRenditionTier() {
+    const baseThumbWidth = gallerySettings.thumbSize === "sm" ? 120 : gallerySettings.thumbSize === "lg" ? 220 : 160;
+    const pixels = baseThumbWidth * (window.devicePixelRatio || 1);
+    return pixels > RENDITIONS.thumb ? "large" : "thumb";
+}
+
+// Thumbnails that scroll into view within one frame are fetched together:
+// a viewport of cards is one /thumbnails/batch round trip instead of one
+// /image request each
+let pendingThumbnails = [];
+let thumbnailFlushScheduled = false;
+
+function requestGridThumbnail(rel, tier, imgEl, thumbUrl) {
+    pendingThumbnails.push({ rel, tier, imgEl, thumbUrl });
+    if (!thumbnailFlushScheduled) {
+        thumbnailFlushScheduled = true;
+        requestAnimationFrame(flushGridThumbnails);
+    }
+}
+
+function setThumbnailBlob(imgEl, blob) {
+    const url = URL.createObjectURL(blob);
+    // The decoded image outlives the URL; release the blob once it's loaded
+    const release = () => URL.revokeObjectURL(url);
+    imgEl.addEventListener("load", release, { once: true });
+    imgEl.addEventListener("error", release, { once: true });
+    imgEl.src = url;
+}
+
+// Batched thumbnails are not kept client-side: Cache Storage is per origin, not
+// per user, and would hand NSFW-blocked images to whoever opens the gallery
+// next. Drop the store earlier versions filled.
+const LEGACY_THUMBNAIL_CACHE_NAME = "usgromana-gallery-thumbnails-v1";
+if ("caches" in window) {
+    caches.delete(LEGACY_THUMBNAIL_CACHE_NAME).catch(() => {});
+}
+
+function flushGridThumbnails() {
+    thumbnailFlushScheduled = false;
+    const queued = pendingThumbnails.splice(0).filter((item) => item.imgEl.isConnected);
+    const byTier = new Map();
+    for (const item of queued) {
+        if (!byTier.has(item.tier)) byTier.set(item.tier, []);
+        byTier.get(item.tier).push(item);
+    }
+    for (const [tier, items] of byTier) {
+        for (let i = 0; i < items.length; i += PERFORMANCE.THUMBNAIL_BATCH_SIZE) {
+            const chunk = items.slice(i, i + PERFORMANCE.THUMBNAIL_BATCH_SIZE);
+            galleryApi
+                .fetchThumbnails(chunk.map((item) => item.rel), tier)
+                .then((blobs) => {
+                    chunk.forEach((item, index) => {
+                        const blob = blobs.get(index);
+                        if (!blob) {
+                            item.imgEl.src = item.thumbUrl; // Let /image report or retry it
+                            return;
+                        }
+                        setThumbnailBlob(item.imgEl, blob);
+                    });
+                })
+                .catch(() => {
+                    chunk.forEach((item) => {
+                        item.imgEl.src = item.thumbUrl;
+                    });
+                });
+        }
+    }
+}
+
 function createCard(img, index) {
     const card = document.createElement("div");
     card.className = "usg-gallery-card";
@@ -1229,12 +1411,12 @@ function createCard(img, index) {
     // Build safest thumbnail URL we can
     // Always use relpath if available to ensure correct thumbnail mapping
     const rel = img.relpath || img.filename || "";
+    const tier = gridRenditionTier();
     let thumbUrl =
         img.thumb_url ||
         (() => {
             if (rel) {
-                const encoded = encodeURIComponent(rel);
-                return `${API_ENDPOINTS.IMAGE}?filename=${encoded}&size=thumb`;
+                return imageUrl(img, tier);
             }
             return img.url || ""; // Fallback to full URL if no relpath
         })();
@@ -1259,10 +1441,8 @@ function createCard(img, index) {
         // Use will-change hint for large images
         imgEl.style.willChange = "contents";
         // Ensure we're using thumbnail, not full-size
-        if (!thumbUrl.includes("size=thumb") && !thumbUrl.includes("_thumbs")) {
-            const rel = img.relpath || img.filename || "";
-            const encoded = encodeURIComponent(rel);
-            thumbUrl = `${API_ENDPOINTS.IMAGE}?filename=${encoded}&size=thumb`;
+        if (!thumbUrl.includes("size=") && !thumbUrl.includes("_thumbs")) {
+            thumbUrl = imageUrl(img, tier);
         }
     }
 
@@ -1291,7 +1471,11 @@ function createCard(img, index) {
                 if (entry.isIntersecting) {
                     if (!imgEl.src) {
                         imageLoadProgress.visible++;
-                        imgEl.src = thumbUrl;
+                        if (rel && !img.thumb_url && thumbUrl.includes("size=")) {
+                            requestGridThumbnail(rel, tier, imgEl, thumbUrl);
+                        } else {
+                            imgEl.src = thumbUrl;
+                        }
                         updateLoadingProgress(
                             imageLoadProgress.loaded,
                             imageLoadProgress.total,
@@ -1461,7 +1645,7 @@ function createCard(img, index) {
                 // Build image URL - prefer relpath for accuracy
                 const rel = img.relpath || img.filename || "";
                 const imageUrl = img.url || 
-                    (rel ? `${API_ENDPOINTS.IMAGE}?filename=${encodeURIComponent(rel)}` : thumbUrl);
+                    (rel ? imageUrl(img) : thumbUrl);
                 
                 const payload = {
                     type: "usgromana-image",
@@ -411,6 +411,8 @@ function openSettingsModal(panel) {
         addToggle("Anchor Gallery pill to top bar", "anchorToManagerBar");
         addToggle("Enable real-time file updates", "enableRealTimeUpdates");
         addToggle("Use polling file observer", "usePollingObserver");
+        addToggle("Load full-resolution images in details", "detailsFullResolution");
+        addToggle("Render thumbnails in worker processes", "thumbnailWorkerProcesses");
         
         // Initialize checkbox states from current settings
         const toggles = form.querySelectorAll('input[type="checkbox"]');
@@ -423,7 +425,9 @@ function openSettingsModal(panel) {
                     (label.includes("rating") && k === "showRatingInGrid") ||
                     (label.includes("Anchor") && k === "anchorToManagerBar") ||
                     (label.includes("real-time") && k === "enableRealTimeUpdates") ||
-                    (label.includes("polling") && k === "usePollingObserver")
+                    (label.includes("polling") && k === "usePollingObserver") ||
+                    (label.includes("full-resolution") && k === "detailsFullResolution") ||
+                    (label.includes("worker processes") && k === "thumbnailWorkerProcesses")
                 );
             });
             if (key) cb.checked = Boolean(current[key]);
@@ -523,6 +527,190 @@ function openSettingsModal(panel) {
         extRow.appendChild(extInput);
         form.appendChild(extRow);
 
+        // Polling interval (only used with the polling file observer)
+        const pollRow = document.createElement("div");
+        Object.assign(pollRow.style, {
+            display: "flex",
+            alignItems: "center",
+            gap: "6px",
+            marginTop: "4px",
+        });
+        const pollLabel = document.createElement("span");
+        pollLabel.textContent = "Polling interval (seconds):";
+        const pollInput = document.createElement("input");
+        pollInput.type = "number";
+        pollInput.min = "0.5";
+        pollInput.max = "60";
+        pollInput.step = "0.5";
+        pollInput.value = current.pollingInterval ?? 2;
+        Object.assign(pollInput.style, {
+            padding: "4px 8px",
+            borderRadius: "6px",
+            border: `1px solid ${theme.inputBorder}`,
+            background: theme.inputBackground,
+            color: theme.inputText,
+            fontSize: "11px",
+            outline: "none",
+            width: "70px",
+        });
+        pollInput.onchange = () => {
+            const value = parseFloat(pollInput.value);
+            if (!Number.isFinite(value)) return;
+            updateGallerySettings({ pollingInterval: Math.min(Math.max(value, 0.5), 60) });
+        };
+        pollRow.appendChild(pollLabel);
+        pollRow.appendChild(pollInput);
+        form.appendChild(pollRow);
+
+        // Rendition encoding (thumbnails and details previews)
+        const renditionRow = document.createElement("div");
+        Object.assign(renditionRow.style, {
+            display: "flex",
+            alignItems: "center",
+            gap: "6px",
+            marginTop: "4px",
+        });
+        const renditionLabel = document.createElement("span");
+        renditionLabel.textContent = "Thumbnail format:";
+        const formatSelect = document.createElement("select");
+        [
+            ["webp", "WebP"],
+            ["jpeg", "JPEG"],
+        ].forEach(([value, label]) => {
+            const o = document.createElement("option");
+            o.value = value;
+            o.textContent = label;
+            formatSelect.appendChild(o);
+        });
+        formatSelect.value = current.renditionFormat || "webp";
+        formatSelect.onchange = () => {
+            updateGallerySettings({ renditionFormat: formatSelect.value });
+        };
+        const qualityLabel = document.createElement("span");
+        qualityLabel.textContent = "Quality:";
+        const qualityInput = document.createElement("input");
+        qualityInput.type = "number";
+        qualityInput.min = "1";
+        qualityInput.max = "100";
+        qualityInput.step = "1";
+        qualityInput.value = current.renditionQuality ?? 80;
+        Object.assign(qualityInput.style, {
+            padding: "4px 8px",
+            borderRadius: "6px",
+            border: `1px solid ${theme.inputBorder}`,
+            background: theme.inputBackground,
+            color: theme.inputText,
+            fontSize: "11px",
+            outline: "none",
+            width: "60px",
+        });
+        qualityInput.onchange = () => {
+            const value = parseInt(qualityInput.value, 10);
+            if (!Number.isFinite(value)) return;
+            updateGallerySettings({ renditionQuality: Math.min(Math.max(value, 1), 100) });
+        };
+        renditionRow.appendChild(renditionLabel);
+        renditionRow.appendChild(formatSelect);
+        renditionRow.appendChild(qualityLabel);
+        renditionRow.appendChild(qualityInput);
+        form.appendChild(renditionRow);
+
+        // Thumbnail cache budget (least recently viewed thumbnails are evicted beyond it)
+        const cacheRow = document.createElement("div");
+        Object.assign(cacheRow.style, {
+            display: "flex",
+            alignItems: "center",
+            gap: "6px",
+            marginTop: "4px",
+        });
+        const cacheLabel = document.createElement("span");
+        cacheLabel.textContent = "Thumbnail cache limit (MB, 0 = unlimited):";
+        const cacheInput = document.createElement("input");
+        cacheInput.type = "number";
+        cacheInput.min = "0";
+        cacheInput.step = "256";
+        cacheInput.value = current.thumbnailCacheMB ?? 2048;
+        Object.assign(cacheInput.style, {
+            padding: "4px 8px",
+            borderRadius: "6px",
+            border: `1px solid ${theme.inputBorder}`,
+            background: theme.inputBackground,
+            color: theme.inputText,
+            fontSize: "11px",
+            outline: "none",
+            width: "80px",
+        });
+        cacheInput.onchange = () => {
+            const value = parseInt(cacheInput.value, 10);
+            if (!Number.isFinite(value)) return;
+            updateGallerySettings({ thumbnailCacheMB: Math.max(value, 0) });
+        };
+        cacheRow.appendChild(cacheLabel);
+        cacheRow.appendChild(cacheInput);
+        form.appendChild(cacheRow);
+
+        // In-memory cache for recently served thumbnails
+        const memoryRow = document.createElement("div");
+        Object.assign(memoryRow.style, {
+            display: "flex",
+            alignItems: "center",
+            gap: "6px",
+            marginTop: "4px",
+        });
+        const memoryLabel = document.createElement("span");
+        memoryLabel.textContent = "Thumbnail memory cache (MB, 0 = off):";
+        const memoryInput = document.createElement("input");
+        memoryInput.type = "number";
+        memoryInput.min = "0";
+        memoryInput.step = "16";
+        memoryInput.value = current.thumbnailMemoryCacheMB ?? 64;
+        Object.assign(memoryInput.style, {
+            padding: "4px 8px",
+            borderRadius: "6px",
+            border: `1px solid ${theme.inputBorder}`,
+            background: theme.inputBackground,
+            color: theme.inputText,
+            fontSize: "11px",
+            outline: "none",
+            width: "80px",
+        });
+        memoryInput.onchange = () => {
+            const value = parseInt(memoryInput.value, 10);
+            if (!Number.isFinite(value)) return;
+            updateGallerySettings({ thumbnailMemoryCacheMB: Math.max(value, 0) });
+        };
+        memoryRow.appendChild(memoryLabel);
+        memoryRow.appendChild(memoryInput);
+        form.appendChild(memoryRow);
+
+        // Thumbnail storage: one file per thumbnail, or a few large pack files
+        const storageRow = document.createElement("div");
+        Object.assign(storageRow.style, {
+            display: "flex",
+            alignItems: "center",
+            gap: "6px",
+            marginTop: "4px",
+        });
+        const storageLabel = document.createElement("span");
+        storageLabel.textContent = "Thumbnail storage:";
+        const storageSelect = document.createElement("select");
+        [
+            ["files", "Files"],
+            ["pack", "Pack files"],
+        ].forEach(([value, label]) => {
+            const o = document.createElement("option");
+            o.value = value;
+            o.textContent = label;
+            storageSelect.appendChild(o);
+        });
+        storageSelect.value = current.thumbnailStorage || "files";
+        storageSelect.onchange = () => {
+            updateGallerySettings({ thumbnailStorage: storageSelect.value });
+        };
+        storageRow.appendChild(storageLabel);
+        storageRow.appendChild(storageSelect);
+        form.appendChild(storageRow);
+
         // Root gallery folder
         const rootFolderRow = document.createElement("div");
         Object.assign(rootFolderRow.style, {